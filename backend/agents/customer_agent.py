@@ -1,9 +1,22 @@
-import json
-import os
+import heapq
+import itertools
+import math
 from datetime import datetime, timezone
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 from geopy.distance import geodesic
+import config
 from services.watson_ai_service import WatsonAIService
+from services.basket_optimizer import BasketOptimizer
+from services.data_store import get_data_store
+from services.catalog import canonical_item_name
+from services.request_parser import get_request_parser
+
+# Weight of match_score (distance and missing items, lower is better) against the
+# AI score (higher is better) when ranking SmartBuy candidates
+_MATCH_SCORE_WEIGHT = 10
+
+# A SmartBuy candidate: (vendor, distance in km, inventory, inventory rollup)
+Candidate = Tuple[Dict[str, Any], float, Dict[str, Any], Any]
 
 class CustomerAgent:
     """
@@ -12,26 +25,10 @@ class CustomerAgent:
     """
     
     def __init__(self):
-        self.data_dir = "data"
-        self.vendors_file = os.path.join(self.data_dir, "vendors.json")
-        self.inventories_file = os.path.join(self.data_dir, "inventories.json")
-        self.requests_file = os.path.join(self.data_dir, "requests.json")
-        self.unmet_demand_file = os.path.join(self.data_dir, "unmet_demand.json")
+        # Shared in-memory repository for vendors and inventories
+        self.store = get_data_store()
         self.watson_ai = WatsonAIService()
-    
-    def _load_json_data(self, file_path: str) -> List[Dict]:
-        """Load JSON data from file"""
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except FileNotFoundError:
-            return []
-    
-    def _save_json_data(self, file_path: str, data: List[Dict]):
-        """Save JSON data to file"""
-        os.makedirs(os.path.dirname(file_path), exist_ok=True)
-        with open(file_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+        self.basket_optimizer = BasketOptimizer()
     
     def _extract_coordinates(self, customer_location: Any) -> tuple[float, float]:
         """Extract latitude and longitude from customer_location (handles both dict and CustomerLocation model)"""
@@ -49,110 +46,97 @@ class CustomerAgent:
         Parse natural language request to extract items and requirements
         Returns: structured request data
         """
-        # Simple rule-based parsing (can be replaced with LLM)
-        request_text = request_text.lower()
-        
-        # Extract quantities and units
-        import re
-        quantity_pattern = r'(\d+)\s*(kg|g|pieces?|bunches?)'
-        quantities = re.findall(quantity_pattern, request_text)
-        
-        # Extract common items
-        items = []
-        common_items = [
-            "banana", "apple", "tomato", "onion", "potato", "carrot", 
-            "coriander", "mint", "orange", "rose", "marigold", "mango", 
-            "cucumber", "sunflower", "grapes", "cauliflower", "almonds", "cashews"
+        parsed = get_request_parser().parse(request_text)
+        items = [
+            {
+                "name": item["name"],
+                "quantity": item["quantity"],
+                "unit": item["unit"]
+            }
+            for item in parsed["items"]
         ]
         
-        for item in common_items:
-            if item in request_text:
-                # Find matching quantity
-                quantity = "1 kg"  # Default
-                unit = "kg"
-                
-                for qty, unit_type in quantities:
-                    if unit_type in ["kg", "g"]:
-                        quantity = f"{qty} {unit_type}"
-                        unit = unit_type
-                    elif unit_type in ["pieces", "piece"]:
-                        quantity = f"{qty} pieces"
-                        unit = "piece"
-                    elif unit_type in ["bunches", "bunch"]:
-                        quantity = f"{qty} bunches"
-                        unit = "bunch"
-                
-                items.append({
-                    "name": item,
-                    "quantity": quantity,
-                    "unit": unit
-                })
-        
-        # Check if delivery is requested
-        delivery_requested = any(word in request_text for word in ["deliver", "delivery", "home", "house"])
-        
         return {
             "items": items,
-            "delivery_requested": delivery_requested,
-            "original_request": request_text,
+            "delivery_requested": "delivery" in parsed["intents"],
+            "original_request": parsed["original_request"],
             "parsed_successfully": len(items) > 0
         }
     
     def find_matching_vendors(self, items: List[Dict], customer_location: Any, 
-                            vendor_type: str = None) -> List[Dict[str, Any]]:
+                            vendor_type: str = None, radius_km: float = None) -> List[Dict[str, Any]]:
         """
-        Find vendors that match the requested items
+        Find vendors within radius_km that match the requested items
         Returns: ranked list of matching vendors
         """
-        vendors = self._load_json_data(self.vendors_file)
-        inventories = self._load_json_data(self.inventories_file)
+        # Top 3 matches by match score (best matches first)
+        matches = self._iter_matching_vendors(items, customer_location, vendor_type, radius_km)
+        return heapq.nsmallest(3, matches, key=lambda x: x["match_score"])
+    
+    def _smartbuy_radius(self, radius_km: float = None) -> float:
+        """SmartBuy search radius: the requested one, else config.SMARTBUY_RADIUS_KM (0 = no limit)"""
+        if radius_km is None:
+            radius_km = config.SMARTBUY_RADIUS_KM
+        return radius_km if radius_km and radius_km > 0 else math.inf
+    
+    def _collect_candidates(self, items: List[Dict], customer_location: Any,
+                            radius_km: float = None) -> List[Candidate]:
+        """
+        Active vendors within radius_km stocking at least one requested item, nearest first.
+        One spatial query serves both the vendor ranking and the basket optimizer.
+        """
+        radius_km = self._smartbuy_radius(radius_km)
+        lat, lng = self._extract_coordinates(customer_location)
+        requested_names = [canonical_item_name(item["name"]) for item in items]
         
-        matching_vendors = []
+        # Only vendors that stock at least one requested item are considered
+        candidate_ids = self.store.find_vendors_with_items(requested_names)
         
-        for vendor in vendors:
-            # Check vendor type if specified
-            if vendor_type and vendor["type"] != vendor_type:
-                continue
-            
+        candidates = []
+        for vendor, distance in self.store.find_vendors_within(lat, lng, radius_km, vendor_ids=candidate_ids):
             # Check if vendor is active
             if vendor["status"] != "active":
                 continue
             
             # Find vendor inventory
-            vendor_inventory = next((inv for inv in inventories if inv["vendor_id"] == vendor["vendor_id"]), None)
-            if not vendor_inventory:
+            vendor_inventory = self.store.get_inventory(vendor["vendor_id"])
+            rollup = self.store.get_inventory_rollup(vendor["vendor_id"])
+            if not vendor_inventory or rollup is None:
+                continue
+            candidates.append((vendor, distance, vendor_inventory, rollup))
+        return candidates
+    
+    def _iter_matching_vendors(self, items: List[Dict], customer_location: Any,
+                               vendor_type: str = None, radius_km: float = None,
+                               candidates: List[Candidate] = None) -> Iterator[Dict[str, Any]]:
+        """Active vendors within radius_km stocking at least one requested item, nearest first"""
+        if candidates is None:
+            candidates = self._collect_candidates(items, customer_location, radius_km)
+        requested_names = [canonical_item_name(item["name"]) for item in items]
+        
+        for vendor, distance, vendor_inventory, rollup in candidates:
+            # Check vendor type if specified
+            if vendor_type and vendor["type"] != vendor_type:
                 continue
             
-            # Check item availability
-            available_items = []
-            total_price = 0
-            
-            for requested_item in items:
-                for inventory_item in vendor_inventory["items"]:
-                    if inventory_item["name"] == requested_item["name"]:
-                        available_items.append({
-                            "name": inventory_item["name"],
-                            "quantity": inventory_item["quantity"],
-                            "price_per_unit": inventory_item["price_per_unit"],
-                            "unit": inventory_item["unit"]
-                        })
-                        total_price += inventory_item["price_per_unit"]
-                        break
+            # Check item availability from the rollup (first inventory entry per item name wins)
+            inventory_items, total_price = rollup.available(requested_names)
+            available_items = [
+                {
+                    "name": inventory_item["name"],
+                    "quantity": inventory_item["quantity"],
+                    "price_per_unit": inventory_item["price_per_unit"],
+                    "unit": inventory_item["unit"]
+                }
+                for inventory_item in inventory_items
+            ]
             
             # If vendor has at least one requested item
             if available_items:
-                # Calculate distance
-                vendor_location = vendor["location"]
-                lat, lng = self._extract_coordinates(customer_location)
-                distance = geodesic(
-                    (lat, lng),
-                    (vendor_location["latitude"], vendor_location["longitude"])
-                ).kilometers
-                
                 # Calculate match score (lower is better)
                 match_score = distance * 0.5 + (len(items) - len(available_items)) * 2
                 
-                matching_vendors.append({
+                yield {
                     "vendor_id": vendor["vendor_id"],
                     "name": vendor["name"],
                     "phone": vendor["phone"],
@@ -164,50 +148,143 @@ class CustomerAgent:
                     "total_price": total_price,
                     "match_score": match_score,
                     "image_url": vendor_inventory.get("image_url", "")
-                })
+                }
+    
+    def rank_vendors(self, parsed_request: Dict, customer_location: Any,
+                     limits: Dict[str, int], radius_km: float = None,
+                     candidates: List[Candidate] = None) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Best matching vendors of each type for a parsed request, in one pass: every
+        candidate is scored once (ai_score minus the weighted match_score) and kept
+        only while it is among the limits[type] best of its type.
+        Returns: vendor type -> vendors, best first, each with match_score, ai_score and score
+        """
+        heaps: Dict[str, List] = {vendor_type: [] for vendor_type in limits}
+        matches = self._iter_matching_vendors(parsed_request["items"], customer_location,
+                                              radius_km=radius_km, candidates=candidates)
+        for order, vendor in enumerate(matches):
+            heap = heaps.get(vendor["type"])
+            if heap is None or limits[vendor["type"]] <= 0:
+                continue
+            vendor["ai_score"] = self.watson_ai.score_vendor(parsed_request, vendor)
+            vendor["score"] = vendor["ai_score"] - _MATCH_SCORE_WEIGHT * vendor["match_score"]
+            # On equal score the nearer vendor (seen earlier) ranks higher
+            entry = (vendor["score"], -order, vendor)
+            if len(heap) < limits[vendor["type"]]:
+                heapq.heappush(heap, entry)
+            elif entry > heap[0]:
+                heapq.heapreplace(heap, entry)
+        return {vendor_type: [entry[2] for entry in sorted(heap, reverse=True)] for vendor_type, heap in heaps.items()}
+    
+    def _basket_radius(self, radius_km: float = None) -> float:
+        """Basket search radius: the SmartBuy radius, capped at config.BASKET_RADIUS_KM (0 = no cap)"""
+        radius_km = self._smartbuy_radius(radius_km)
+        if config.BASKET_RADIUS_KM and config.BASKET_RADIUS_KM > 0:
+            return min(radius_km, config.BASKET_RADIUS_KM)
+        return radius_km
+    
+    def optimize_basket(self, items: List[Dict], customer_location: Any, radius_km: float = None,
+                        candidates: List[Candidate] = None) -> Dict[str, Any]:
+        """
+        Cheapest way to buy the whole basket from active vendors within radius_km (capped at
+        config.BASKET_RADIUS_KM), possibly from several of them: item prices plus a stop and
+        distance penalty per vendor. candidates, when given, are the SmartBuy candidates
+        (nearest first) already collected for the request.
+        Returns: vendors to visit with the items to buy from each, and the basket totals
+        """
+        basket_radius_km = self._basket_radius(radius_km)
+        if candidates is None:
+            candidates = self._collect_candidates(items, customer_location, basket_radius_km)
+        else:
+            # Candidates come nearest first: keep the ones within the basket radius
+            candidates = list(itertools.takewhile(lambda candidate: candidate[1] <= basket_radius_km, candidates))
+        requested_names = [canonical_item_name(item["name"]) for item in items]
+        
+        vendors = {vendor["vendor_id"]: (vendor, rollup) for vendor, _, _, rollup in candidates}
+        plan = self.basket_optimizer.optimize(
+            requested_names,
+            [(vendor["vendor_id"], distance, rollup.prices) for vendor, distance, _, rollup in candidates],
+        )
         
-        # Sort by match score (best matches first)
-        matching_vendors.sort(key=lambda x: x["match_score"])
+        stops = []
+        for stop in plan["stops"]:
+            vendor, rollup = vendors[stop["key"]]
+            stops.append({
+                "vendor_id": vendor["vendor_id"],
+                "name": vendor["name"],
+                "phone": vendor["phone"],
+                "location": vendor["location"],
+                "type": vendor["type"],
+                "rating": vendor["rating"],
+                "distance": round(stop["distance_km"], 2),
+                "items": [
+                    {
+                        "name": rollup.items[name]["name"],
+                        "quantity": rollup.items[name]["quantity"],
+                        "price_per_unit": rollup.items[name]["price_per_unit"],
+                        "unit": rollup.items[name]["unit"]
+                    }
+                    for name in stop["items"]
+                ],
+                "subtotal": stop["item_cost"]
+            })
         
-        return matching_vendors[:3]  # Top 3 matches
+        return {
+            "vendors": stops,
+            "items_total": plan["item_cost"],
+            "stop_penalty": plan["stop_cost"],
+            "total_cost": plan["total_cost"],
+            "missing_items": plan["missing_items"],
+            "complete": not plan["missing_items"],
+            "timed_out": plan["timed_out"]
+        }
     
-    def process_smart_buy_request(self, request_text: str, customer_location: Any) -> Dict[str, Any]:
+    def process_smart_buy_request(self, request_text: str, customer_location: Any,
+                                  radius_km: float = None) -> Dict[str, Any]:
         """
         Process SmartBuy request using Watson AI and return vendor recommendations
+        from vendors within radius_km (default config.SMARTBUY_RADIUS_KM, 0 = no limit)
         """
         # Use Watson AI for enhanced parsing
         ai_result = self.watson_ai.process_smart_buy_request(request_text, customer_location)
-        
+        return self._recommend_vendors(ai_result, customer_location, radius_km)
+    
+    async def process_smart_buy_request_async(self, request_text: str, customer_location: Any,
+                                              radius_km: float = None) -> Dict[str, Any]:
+        """
+        process_smart_buy_request for async routes: the Watson call does not block the event loop
+        """
+        ai_result = await self.watson_ai.process_smart_buy_request_async(request_text, customer_location)
+        return self._recommend_vendors(ai_result, customer_location, radius_km)
+    
+    def _recommend_vendors(self, ai_result: Dict[str, Any], customer_location: Any,
+                           radius_km: float = None) -> Dict[str, Any]:
+        """Vendor recommendations for a parsed SmartBuy request"""
         if not ai_result["success"]:
             return ai_result
         
         parsed_request = ai_result["parsed_request"]
         
-        # Find all matching vendors regardless of type first
-        all_matching_vendors = self.find_matching_vendors(
-            parsed_request["items"], 
-            customer_location, 
-            None  # Don't filter by type initially
-        )
-        
-        # Separate by type
-        stationary_vendors = [v for v in all_matching_vendors if v.get("type") == "stationary"]
-        moving_vendors = [v for v in all_matching_vendors if v.get("type") == "moving"]
+        # One spatial query for both the recommendations and the basket
+        candidates = self._collect_candidates(parsed_request["items"], customer_location, radius_km)
         
-        # If delivery is requested, prioritize moving vendors
-        if parsed_request["delivery_requested"] and moving_vendors:
-            moving_vendors = moving_vendors[:2]
-        else:
-            moving_vendors = moving_vendors[:1]  # Show fewer moving vendors for pickup requests
-        
-        # Always show some stationary vendors for pickup
-        stationary_vendors = stationary_vendors[:2]
+        # Cheapest split of the whole basket across nearby vendors
+        basket = None
+        if config.BASKET_ENABLED and parsed_request["items"]:
+            basket = self.optimize_basket(parsed_request["items"], customer_location, radius_km,
+                                          candidates=candidates)
         
-        # Combine all vendors for AI-powered recommendations
-        all_vendors = stationary_vendors + moving_vendors
+        # If delivery is requested, prioritize moving vendors; always show some
+        # stationary vendors for pickup
+        ranked = self.rank_vendors(parsed_request, customer_location, {
+            "stationary": 2,
+            "moving": 2 if parsed_request["delivery_requested"] else 1,
+        }, radius_km, candidates=candidates)
+        stationary_vendors = ranked["stationary"]
+        moving_vendors = ranked["moving"]
         
-        # Get AI-powered vendor recommendations
-        ai_recommendations = self.watson_ai.get_vendor_recommendations(parsed_request, all_vendors)
+        # Top 3 across both types for the AI recommendations
+        ai_recommendations = heapq.nlargest(3, stationary_vendors + moving_vendors, key=lambda x: x["score"])
         
         # Generate AI-powered response
         ai_message = self.watson_ai.generate_ai_response(parsed_request, ai_recommendations)
@@ -218,14 +295,17 @@ class CustomerAgent:
             "request": parsed_request,
             "ai_confidence": ai_result.get("ai_confidence", 0.8),
             "recommendations": {
-                "stationary_vendors": stationary_vendors[:2],  # Top 2 stationary
-                "moving_vendors": moving_vendors[:2] if moving_vendors else [],
-                "ai_recommendations": ai_recommendations[:3]  # Top 3 AI recommendations
+                "stationary_vendors": stationary_vendors,  # Top 2 stationary
+                "moving_vendors": moving_vendors,
+                "ai_recommendations": ai_recommendations  # Top 3 AI recommendations
             },
             "message": ai_message,
             "processed_by": "Watson AI"
         }
         
+        if basket is not None:
+            response["basket"] = basket
+        
         # Track unmet demand if no vendors found
         if not stationary_vendors and not moving_vendors:
             self._track_unmet_demand(parsed_request["items"], customer_location)
@@ -261,8 +341,7 @@ class CustomerAgent:
         Send request to moving vendor for delivery
         Returns: request status and vendor response
         """
-        vendors = self._load_json_data(self.vendors_file)
-        vendor = next((v for v in vendors if v["vendor_id"] == vendor_id), None)
+        vendor = self.store.get_vendor(vendor_id)
         
         if not vendor:
             return {"success": False, "error": "Vendor not found"}
@@ -307,9 +386,7 @@ class CustomerAgent:
             }
             
             # Save request
-            requests = self._load_json_data(self.requests_file)
-            requests.append(request_data)
-            self._save_json_data(self.requests_file, requests)
+            self.store.add_request(request_data)
             
             return {
                 "success": True,
@@ -329,7 +406,8 @@ class CustomerAgent:
     
     def _track_unmet_demand(self, items: List[Dict], customer_location: Any):
         """Track unmet demand for analytics"""
-        unmet_demand = self._load_json_data(self.unmet_demand_file)
+        unmet_demand = self.store.get_unmet_demand()
+        lat, lng = self._extract_coordinates(customer_location)
         
         for item in items:
             # Find existing demand or create new
@@ -339,8 +417,7 @@ class CustomerAgent:
                 existing_demand["total_requests"] += 1
                 existing_demand["last_requested"] = datetime.now(timezone.utc).isoformat()
                 
-                                # Add location if not exists
-                lat, lng = self._extract_coordinates(customer_location)
+                # Add location if not exists
                 location_exists = any(
                     loc["latitude"] == lat and 
                     loc["longitude"] == lng 
@@ -368,8 +445,8 @@ class CustomerAgent:
                     "total_requests": 1,
                     "last_requested": datetime.now(timezone.utc).isoformat(),
                     "locations": [{
-                        "latitude": customer_location["latitude"],
-                        "longitude": customer_location["longitude"],
+                        "latitude": lat,
+                        "longitude": lng,
                         "request_count": 1
                     }],
                     "avg_max_price": 100,  # Default
@@ -377,123 +454,91 @@ class CustomerAgent:
                 }
                 unmet_demand.append(new_demand)
         
-        self._save_json_data(self.unmet_demand_file, unmet_demand)
+        self.store.save_unmet_demand(unmet_demand)
     
     def get_nearby_vendors(self, customer_location: Any, radius_km: float = 2.0) -> List[Dict[str, Any]]:
         """
         Get all vendors within specified radius
         """
-        vendors = self._load_json_data(self.vendors_file)
-        inventories = self._load_json_data(self.inventories_file)
+        lat, lng = self._extract_coordinates(customer_location)
         
         nearby_vendors = []
         
-        for vendor in vendors:
+        for vendor, distance in self.store.find_vendors_within(lat, lng, radius_km):
             if vendor["status"] != "active":
                 continue
             
-            vendor_location = vendor["location"]
-            lat, lng = self._extract_coordinates(customer_location)
-            distance = geodesic(
-                (lat, lng),
-                (vendor_location["latitude"], vendor_location["longitude"])
-            ).kilometers
+            # Get vendor inventory
+            vendor_inventory = self.store.get_inventory(vendor["vendor_id"])
             
-            if distance <= radius_km:
-                # Get vendor inventory
-                vendor_inventory = next((inv for inv in inventories if inv["vendor_id"] == vendor["vendor_id"]), None)
-                
-                vendor_info = {
-                    "vendor_id": vendor["vendor_id"],
-                    "name": vendor["name"],
-                    "phone": vendor["phone"],
-                    "location": vendor["location"],
-                    "type": vendor["type"],
-                    "rating": vendor["rating"],
-                    "total_ratings": vendor["total_ratings"],
-                    "distance": round(distance, 2),
-                    "image_url": vendor_inventory.get("image_url", "") if vendor_inventory else "",
-                    "total_items": vendor_inventory.get("total_items", 0) if vendor_inventory else 0,
-                    "inventory_items": vendor_inventory.get("items", []) if vendor_inventory else []
-                }
-                
-                nearby_vendors.append(vendor_info)
-        
-        # Sort by distance
-        nearby_vendors.sort(key=lambda x: x["distance"])
+            vendor_info = {
+                "vendor_id": vendor["vendor_id"],
+                "name": vendor["name"],
+                "phone": vendor["phone"],
+                "location": vendor["location"],
+                "type": vendor["type"],
+                "rating": vendor["rating"],
+                "total_ratings": vendor["total_ratings"],
+                "distance": round(distance, 2),
+                "image_url": vendor_inventory.get("image_url", "") if vendor_inventory else "",
+                "total_items": vendor_inventory.get("total_items", 0) if vendor_inventory else 0,
+                "inventory_items": vendor_inventory.get("items", []) if vendor_inventory else []
+            }
+            
+            nearby_vendors.append(vendor_info)
         
+        # Already sorted by distance by the spatial index
         return nearby_vendors
     
     def search_vendors(self, query: str, customer_location: Any, radius_km: float = 2.0) -> List[Dict[str, Any]]:
         """
         Search vendors by item name
         """
-        vendors = self._load_json_data(self.vendors_file)
-        inventories = self._load_json_data(self.inventories_file)
+        lat, lng = self._extract_coordinates(customer_location)
         
-        print(f"DEBUG: Search query: '{query}'")
-        print(f"DEBUG: Loaded {len(vendors)} vendors")
-        print(f"DEBUG: Loaded {len(inventories)} inventories")
+        # Item names containing the query, and the vendors that stock them
+        matched_names = self.store.search_items(query)
+        candidate_ids = set().union(*matched_names.values()) if matched_names else set()
         
         matching_vendors = []
-        query_lower = query.lower().strip()
         
-        for vendor in vendors:
+        for vendor, distance in self.store.find_vendors_within(lat, lng, radius_km, vendor_ids=candidate_ids):
             if vendor["status"] != "active":
                 continue
             
             # Get vendor inventory
-            vendor_inventory = next((inv for inv in inventories if inv["vendor_id"] == vendor["vendor_id"]), None)
-            if not vendor_inventory:
-                print(f"DEBUG: No inventory found for vendor {vendor['vendor_id']}")
+            vendor_inventory = self.store.get_inventory(vendor["vendor_id"])
+            rollup = self.store.get_inventory_rollup(vendor["vendor_id"])
+            if not vendor_inventory or rollup is None:
                 continue
             
-            # Check if any inventory item matches the search query
-            matching_items = []
-            for item in vendor_inventory["items"]:
-                if query_lower in item["name"].lower():
-                    matching_items.append(item)
-                    print(f"DEBUG: Found matching item '{item['name']}' for query '{query_lower}'")
+            # Every inventory entry whose name matched the query; the rollup gives their total price
+            if not any(name in rollup.items for name in matched_names):
+                continue
+            matching_items = [
+                item for item in vendor_inventory["items"]
+                if canonical_item_name(item.get("name", "")) in matched_names
+            ]
+            total_price = rollup.total_price(matched_names)
             
             if matching_items:
-                # Calculate distance
-                vendor_location = vendor["location"]
-                lat, lng = self._extract_coordinates(customer_location)
-                distance = geodesic(
-                    (lat, lng),
-                    (vendor_location["latitude"], vendor_location["longitude"])
-                ).kilometers
-                
-                print(f"DEBUG: Vendor {vendor['vendor_id']} has matching items, distance: {distance}km")
+                vendor_info = {
+                    "vendor_id": vendor["vendor_id"],
+                    "name": vendor["name"],
+                    "phone": vendor["phone"],
+                    "location": vendor["location"],
+                    "type": vendor["type"],
+                    "rating": vendor["rating"],
+                    "total_ratings": vendor["total_ratings"],
+                    "distance": round(distance, 2),
+                    "image_url": vendor_inventory.get("image_url", ""),
+                    "total_items": len(matching_items),
+                    "inventory_items": matching_items,
+                    "matching_items": matching_items,
+                    "total_price": total_price
+                }
                 
-                if distance <= radius_km:
-                    # Calculate total price for matching items
-                    total_price = sum(item["price_per_unit"] for item in matching_items)
-                    
-                    vendor_info = {
-                        "vendor_id": vendor["vendor_id"],
-                        "name": vendor["name"],
-                        "phone": vendor["phone"],
-                        "location": vendor["location"],
-                        "type": vendor["type"],
-                        "rating": vendor["rating"],
-                        "total_ratings": vendor["total_ratings"],
-                        "distance": round(distance, 2),
-                        "image_url": vendor_inventory.get("image_url", ""),
-                        "total_items": len(matching_items),
-                        "inventory_items": matching_items,
-                        "matching_items": matching_items,
-                        "total_price": total_price
-                    }
-                    
-                    matching_vendors.append(vendor_info)
-                    print(f"DEBUG: Added vendor {vendor['vendor_id']} to results")
-                else:
-                    print(f"DEBUG: Vendor {vendor['vendor_id']} too far: {distance}km > {radius_km}km")
-            else:
-                print(f"DEBUG: Vendor {vendor['vendor_id']} has no matching items for query '{query_lower}'")
-        
-        print(f"DEBUG: Total matching vendors found: {len(matching_vendors)}")
+                matching_vendors.append(vendor_info)
         
         # Sort by distance and rating
         matching_vendors.sort(key=lambda x: (x["distance"], -x["rating"]))
@@ -1,11 +1,17 @@
-import json
-import os
 from datetime import datetime, timezone
-from typing import List, Dict, Any, Optional
-from PIL import Image
+from typing import List, Dict, Any, Optional, BinaryIO
 import io
 import base64
 
+import config
+from services.data_store import get_data_store
+from services.image_preprocess import prepare_image, PreparedImage
+from services.image_quality import assess_image_quality
+from services.metrics import metrics
+from services.upload_archiver import get_upload_archiver
+
+DETECTION_MODES = ("single", "tiled")
+
 class VendorAgent:
     """
     Vendor Agent - Handles vendor onboarding, image analysis, and inventory management.
@@ -13,37 +19,15 @@ class VendorAgent:
     """
     
     def __init__(self):
-        self.data_dir = "data"
-        self.vendors_file = os.path.join(self.data_dir, "vendors.json")
-        self.inventories_file = os.path.join(self.data_dir, "inventories.json")
-        self.unmet_demand_file = os.path.join(self.data_dir, "unmet_demand.json")
-        
-    def _load_json_data(self, file_path: str) -> List[Dict]:
-        """Load JSON data from file"""
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except FileNotFoundError:
-            return []
-    
-    def _save_json_data(self, file_path: str, data: List[Dict]):
-        """Save JSON data to file"""
-        os.makedirs(os.path.dirname(file_path), exist_ok=True)
-        with open(file_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+        # Shared in-memory repository for vendors and inventories
+        self.store = get_data_store()
     
     def onboard_vendor(self, phone: str, name: str, location: Dict[str, float]) -> Dict[str, Any]:
         """
         Onboard a new vendor
         Returns: vendor_id and success status
         """
-        vendors = self._load_json_data(self.vendors_file)
-        
-        # Generate unique vendor ID
-        vendor_id = f"V{str(len(vendors) + 1).zfill(3)}"
-        
         new_vendor = {
-            "vendor_id": vendor_id,
             "name": name,
             "phone": phone,
             "location": location,
@@ -57,16 +41,16 @@ class VendorAgent:
             "last_active": datetime.now(timezone.utc).isoformat()
         }
         
-        vendors.append(new_vendor)
-        self._save_json_data(self.vendors_file, vendors)
+        # Store generates the unique vendor ID
+        vendor = self.store.add_vendor(new_vendor)
         
         return {
             "success": True,
-            "vendor_id": vendor_id,
+            "vendor_id": vendor["vendor_id"],
             "message": "Vendor onboarded successfully"
         }
     
-    def analyze_cart_image(self, image_data: str, vendor_id: str) -> Dict[str, Any]:
+    def analyze_cart_image(self, image_data: str, vendor_id: str, mode: str = None) -> Dict[str, Any]:
         """
         Analyze vendor cart image for item detection
         Returns: detected items list and analysis results
@@ -74,131 +58,144 @@ class VendorAgent:
         try:
             # Decode base64 image
             image_bytes = base64.b64decode(image_data.split(',')[1])
-            image = Image.open(io.BytesIO(image_bytes))
-            
-            # Check image quality (basic blur detection)
-            if self._is_image_blurry(image):
-                return {
-                    "success": False,
-                    "error": "Image is blurry. Please upload a clear image.",
-                    "items": []
-                }
-            
-            # Ensure uploads directory exists and save the uploaded image for later reference
-            os.makedirs("uploads", exist_ok=True)
-            saved_image_path = os.path.join("uploads", f"{vendor_id}_cart_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jpg")
-            image.save(saved_image_path, format="JPEG")
-
-            # Use the HF-backed detector to classify items with confidences
-            from services.yolo_detector import analyze_vendor_cart
-            # Pass the in-memory PIL image to avoid extra disk I/O during inference
-            detections = analyze_vendor_cart(image, top_k=3, min_confidence=0.3)
-            
-            # Convert to inventory format
-            inventory_items: List[Dict[str, Any]] = []
-            for det in detections:
-                inventory_items.append({
-                    "name": det.get("name", "unknown"),
-                    "quantity": "1 kg",
-                    "price_per_unit": 0,
-                    "unit": "kg",
-                    "freshness": "fresh",
-                    "detection_confidence": float(det.get("confidence", 0.0)),
-                })
-            
+            return self._analyze_image(io.BytesIO(image_bytes), vendor_id, mode)
+        except Exception as e:
             return {
-                "success": True,
-                "items": inventory_items,
-                "total_items": len(inventory_items),
-                "image_quality": "good",
-                "image_url": f"/uploads/{os.path.basename(saved_image_path)}"
+                "success": False,
+                "error": f"Image analysis failed: {str(e)}",
+                "items": []
             }
-            
+
+    def analyze_cart_image_file(self, image_file: BinaryIO, vendor_id: str, mode: str = None) -> Dict[str, Any]:
+        """
+        Analyze a vendor cart image read from a file object (multipart uploads)
+        Returns: detected items list and analysis results
+        """
+        try:
+            return self._analyze_image(image_file, vendor_id, mode)
         except Exception as e:
             return {
                 "success": False,
                 "error": f"Image analysis failed: {str(e)}",
                 "items": []
             }
+
+    def _analyze_image(self, image_file: BinaryIO, vendor_id: str, mode: str = None) -> Dict[str, Any]:
+        """
+        Decode at reduced resolution, quality check, save and detect items in a cart image.
+        mode is "single" (whole photo, top 3 items) or "tiled" (multi-item); defaults to config
+        """
+        mode = (mode or config.DETECTOR_MODE).lower()
+        if mode not in DETECTION_MODES:
+            return {
+                "success": False,
+                "error": f"Unknown detection mode '{mode}', expected one of {', '.join(DETECTION_MODES)}",
+                "items": []
+            }
+
+        prepared = prepare_image(image_file)
+        metrics.histogram("image_decode_ms").observe(prepared.decode_ms)
+        image = prepared.model_image
+
+        # Reject blurry, badly exposed or tiny photos before the model forward pass
+        quality = self._check_image_quality(prepared)
+        if not quality["ok"]:
+            return {
+                "success": False,
+                "error": quality["message"],
+                "quality_issue": quality["issue"],
+                "items": []
+            }
+
+        # Keep the photo for later reference; encoding and the disk write happen in the background
+        image_url = get_upload_archiver().submit(prepared.storage_image, prefix=f"{vendor_id}_cart")
+
+        # Use the HF-backed detector to classify items with confidences
+        from services.yolo_detector import analyze_vendor_cart, analyze_vendor_cart_tiled
+        if mode == "tiled":
+            # Crops come from the storage copy, which keeps enough detail per item
+            detections = analyze_vendor_cart_tiled(prepared.storage_image, min_confidence=0.3)
+        else:
+            # Pass the in-memory model-sized image to avoid extra disk I/O during inference
+            detections = analyze_vendor_cart(image, top_k=3, min_confidence=0.3)
+        
+        # Convert to inventory format
+        inventory_items: List[Dict[str, Any]] = []
+        for det in detections:
+            inventory_items.append({
+                "name": det.get("name", "unknown"),
+                "quantity": "1 kg",
+                "price_per_unit": 0,
+                "unit": "kg",
+                "freshness": "fresh",
+                "detection_confidence": float(det.get("confidence", 0.0)),
+            })
+        
+        return {
+            "success": True,
+            "items": inventory_items,
+            "total_items": len(inventory_items),
+            "image_quality": "good",
+            "image_url": image_url
+        }
     
-    def _is_image_blurry(self, image: Image.Image) -> bool:
+    def _check_image_quality(self, prepared: PreparedImage) -> Dict[str, Any]:
         """
-        Basic image blur detection
-        Returns: True if image appears blurry
+        Blur (Laplacian variance), exposure and size checks on a thumbnail
+        Returns: assess_image_quality() result
         """
-        # Simple edge detection for blur check
         try:
-            # Convert to grayscale
-            gray = image.convert('L')
-            
-            # Calculate variance of Laplacian (blur metric)
-            import numpy as np
-            laplacian = np.array(gray).var()
-            
-            # Threshold for blur detection (adjust as needed)
-            return laplacian < 100  # Lower values indicate more blur
-            
-        except:
-            # If blur detection fails, assume image is OK
-            return False
+            quality = assess_image_quality(prepared.model_image, prepared.original_size)
+        except Exception:
+            # If the quality check fails, assume the image is OK
+            return {"ok": True, "issue": None, "message": None, "metrics": {}}
+        metrics.histogram("image_quality_check_ms").observe(quality["metrics"]["check_ms"])
+        if not quality["ok"]:
+            metrics.counter(f"image_quality_rejected_{quality['issue']}_total").inc()
+        return quality
     
     def update_inventory(self, vendor_id: str, items: List[Dict], image_url: str = None) -> Dict[str, Any]:
         """
         Update vendor inventory with new items and prices
         """
-        inventories = self._load_json_data(self.inventories_file)
-        
-        # Find existing inventory or create new
-        existing_inv = None
-        for inv in inventories:
-            if inv["vendor_id"] == vendor_id:
-                existing_inv = inv
-                break
+        existing_inv = self.store.get_inventory(vendor_id)
         
+        # total_items and estimated_value are recomputed by the store on every write
         if existing_inv:
             # Update existing inventory
-            existing_inv["items"] = items
-            existing_inv["last_updated"] = datetime.now(timezone.utc).isoformat()
+            inventory_updates = {
+                "items": items,
+                "last_updated": datetime.now(timezone.utc).isoformat()
+            }
             if image_url:
-                existing_inv["image_url"] = image_url
+                inventory_updates["image_url"] = image_url
         else:
             # Create new inventory
-            new_inventory = {
-                "vendor_id": vendor_id,
+            inventory_updates = {
                 "last_updated": datetime.now(timezone.utc).isoformat(),
                 "image_url": image_url or f"/uploads/{vendor_id}_cart_{datetime.now().strftime('%Y%m%d')}.jpg",
-                "items": items,
-                "total_items": len(items),
-                "estimated_value": sum(item.get("price_per_unit", 0) for item in items)
+                "items": items
             }
-            inventories.append(new_inventory)
         
-        self._save_json_data(self.inventories_file, inventories)
+        inventory = self.store.upsert_inventory(vendor_id, inventory_updates)
         
         return {
             "success": True,
             "message": "Inventory updated successfully",
-            "total_items": len(items)
+            "total_items": inventory["total_items"],
+            "estimated_value": inventory["estimated_value"]
         }
     
     def update_vendor_status(self, vendor_id: str, status_updates: Dict[str, Any]) -> Dict[str, Any]:
         """
         Update vendor status (moving/stationary, open/closed, location)
         """
-        vendors = self._load_json_data(self.vendors_file)
-        
-        for vendor in vendors:
-            if vendor["vendor_id"] == vendor_id:
-                # Update allowed fields
-                allowed_fields = ["type", "status", "location", "operating_hours"]
-                for field in allowed_fields:
-                    if field in status_updates:
-                        vendor[field] = status_updates[field]
-                
-                vendor["last_active"] = datetime.now(timezone.utc).isoformat()
-                break
+        # Update allowed fields
+        allowed_fields = ["type", "status", "location", "operating_hours"]
+        vendor_updates = {field: status_updates[field] for field in allowed_fields if field in status_updates}
+        vendor_updates["last_active"] = datetime.now(timezone.utc).isoformat()
         
-        self._save_json_data(self.vendors_file, vendors)
+        self.store.update_vendor(vendor_id, vendor_updates)
         
         return {
             "success": True,
@@ -209,7 +206,7 @@ class VendorAgent:
         """
         Get suggestions for items to stock based on unmet demand
         """
-        unmet_demand = self._load_json_data(self.unmet_demand_file)
+        unmet_demand = self.store.get_unmet_demand()
         
         # Filter high priority items
         high_priority = [item for item in unmet_demand if item["priority"] == "high"]
@@ -223,16 +220,14 @@ class VendorAgent:
         """
         Get vendor performance analytics
         """
-        vendors = self._load_json_data(self.vendors_file)
-        inventories = self._load_json_data(self.inventories_file)
-        
-        vendor = next((v for v in vendors if v["vendor_id"] == vendor_id), None)
-        inventory = next((inv for inv in inventories if inv["vendor_id"] == vendor_id), None)
+        vendor = self.store.get_vendor(vendor_id)
+        inventory = self.store.get_inventory(vendor_id)
         
         if not vendor:
             return {"success": False, "error": "Vendor not found"}
         
         analytics = {
+            "success": True,
             "vendor_id": vendor_id,
             "name": vendor["name"],
             "rating": vendor["rating"],
@@ -242,9 +237,13 @@ class VendorAgent:
             "last_active": vendor["last_active"]
         }
         
-        if inventory:
-            analytics["current_items"] = inventory["total_items"]
-            analytics["estimated_value"] = inventory["estimated_value"]
-            analytics["last_inventory_update"] = inventory["last_updated"]
+        rollup = self.store.get_inventory_rollup(vendor_id)
+        if inventory and rollup is not None:
+            analytics["current_items"] = rollup.item_count
+            analytics["estimated_value"] = rollup.total_value
+            analytics["price_ranges"] = {
+                name: {"min": rollup.min_prices[name], "max": rollup.max_prices[name]} for name in rollup.items
+            }
+            analytics["last_inventory_update"] = inventory.get("last_updated")
         
         return analytics
@@ -1,14 +1,15 @@
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 from typing import List, Dict, Any, Optional
-import json
-import os
 from datetime import datetime
 
 from agents.customer_agent import CustomerAgent
+from services.data_store import get_data_store
+from services.geo_index import top_k_indices
 
 router = APIRouter(prefix="/customer", tags=["customer"])
 customer_agent = CustomerAgent()
+data_store = get_data_store()
 
 # Pydantic models
 class CustomerLocation(BaseModel):
@@ -19,6 +20,7 @@ class CustomerLocation(BaseModel):
 class SmartBuyRequest(BaseModel):
     request_text: str
     customer_location: CustomerLocation
+    radius_km: Optional[float] = None  # None: VENDEE_SMARTBUY_RADIUS_KM, 0: no limit
 
 class MovingVendorRequest(BaseModel):
     vendor_id: str
@@ -37,9 +39,10 @@ async def process_smart_buy(request: SmartBuyRequest):
     Process SmartBuy request and return vendor recommendations
     """
     try:
-        result = customer_agent.process_smart_buy_request(
+        result = await customer_agent.process_smart_buy_request_async(
             request_text=request.request_text,
-            customer_location=request.customer_location
+            customer_location=request.customer_location,
+            radius_km=request.radius_km
         )
         
         if result["success"]:
@@ -47,6 +50,7 @@ async def process_smart_buy(request: SmartBuyRequest):
                 "success": True,
                 "request": result["request"],
                 "recommendations": result["recommendations"],
+                "basket": result.get("basket"),
                 "message": result["message"],
                 "processed_at": datetime.now().isoformat()
             }
@@ -130,29 +134,12 @@ async def get_vendor_details(vendor_id: str):
     Get detailed vendor information including inventory
     """
     try:
-        # Load vendor data
-        vendor_file = os.path.join("backend/data", "vendors.json")
-        inventory_file = os.path.join("backend/data", "inventories_file.json")
-        
-        if not os.path.exists(vendor_file):
-            raise HTTPException(status_code=404, detail="Vendor data not found")
-        
-        with open(vendor_file, 'r', encoding='utf-8') as f:
-            vendors = json.load(f)
-        
-        vendor = next((v for v in vendors if v["vendor_id"] == vendor_id), None)
+        vendor = data_store.get_vendor(vendor_id)
         
         if not vendor:
             raise HTTPException(status_code=404, detail="Vendor not found")
         
-        # Load inventory data
-        vendor_inventory = None
-        inventory_file = os.path.join("backend/data", "inventories.json")
-        if os.path.exists(inventory_file):
-            with open(inventory_file, 'r', encoding='utf-8') as f:
-                inventories = json.load(f)
-            
-            vendor_inventory = next((inv for inv in inventories if inv["vendor_id"] == vendor_id), None)
+        vendor_inventory = data_store.get_inventory(vendor_id)
         
         # Prepare response
         vendor_details = {
@@ -185,39 +172,15 @@ async def rate_vendor(request: VendorRatingRequest):
     Rate a vendor (1.0 to 5.0 stars)
     """
     try:
-        # Load vendor data
-        vendor_file = os.path.join("backend/data", "vendors.json")
-        
-        if not os.path.exists(vendor_file):
-            raise HTTPException(status_code=404, detail="Vendor data not found")
-        
-        with open(vendor_file, 'r', encoding='utf-8') as f:
-            vendors = json.load(f)
-        
-        # Find vendor
-        vendor = next((v for v in vendors if v["vendor_id"] == request.vendor_id), None)
-        
-        if not vendor:
-            raise HTTPException(status_code=404, detail="Vendor not found")
-        
         # Validate rating
         if not 1.0 <= request.rating <= 5.0:
             raise HTTPException(status_code=400, detail="Rating must be between 1.0 and 5.0")
         
-        # Update vendor rating
-        current_rating = vendor["rating"]
-        current_count = vendor["total_ratings"]
-        
-        # Calculate new average rating
-        new_count = current_count + 1
-        new_rating = ((current_rating * current_count) + request.rating) / new_count
+        # Fold the rating into the average inside the store's write lock
+        vendor = data_store.add_vendor_rating(request.vendor_id, request.rating)
         
-        vendor["rating"] = round(new_rating, 1)
-        vendor["total_ratings"] = new_count
-        
-        # Save updated data
-        with open(vendor_file, 'w', encoding='utf-8') as f:
-            json.dump(vendors, f, indent=2, ensure_ascii=False)
+        if not vendor:
+            raise HTTPException(status_code=404, detail="Vendor not found")
         
         return {
             "success": True,
@@ -228,6 +191,8 @@ async def rate_vendor(request: VendorRatingRequest):
             "rated_at": datetime.now().isoformat()
         }
             
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Vendor rating error: {str(e)}")
 
@@ -248,11 +213,9 @@ async def get_vendor_leaderboard(location_lat: float, location_lng: float, radiu
             radius_km=radius_km
         )
         
-        # Sort by rating (highest first)
-        vendors.sort(key=lambda x: x["rating"], reverse=True)
-        
-        # Take top 10
-        top_vendors = vendors[:10]
+        # Top 10 by rating (highest first), selected without sorting every vendor
+        top_indices = top_k_indices([v["rating"] for v in vendors], 10, descending=True)
+        top_vendors = [vendors[i] for i in top_indices]
         
         return {
             "success": True,
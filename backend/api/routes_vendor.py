@@ -1,14 +1,18 @@
 from fastapi import APIRouter, HTTPException, UploadFile, File, Form
 from pydantic import BaseModel
 from typing import List, Dict, Any, Optional
-import json
-import os
 from datetime import datetime
 
+import config
 from agents.vendor_agent import VendorAgent
+from services.data_store import get_data_store
+from services.inference_pool import get_inference_executor, InferenceQueueFull
+from services.uploads import UploadTooLarge
 
 router = APIRouter(prefix="/vendor", tags=["vendor"])
 vendor_agent = VendorAgent()
+data_store = get_data_store()
+inference_executor = get_inference_executor()
 
 # Pydantic models
 class VendorOnboardRequest(BaseModel):
@@ -31,6 +35,7 @@ class VendorStatusUpdate(BaseModel):
 class CartImageAnalysisRequest(BaseModel):
     vendor_id: str
     image_data: str  # Base64 encoded image
+    mode: Optional[str] = None  # "single" or "tiled" (multi-item); server default when omitted
 
 @router.post("/onboard")
 async def onboard_vendor(request: VendorOnboardRequest):
@@ -63,33 +68,77 @@ async def onboard_vendor(request: VendorOnboardRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Onboarding error: {str(e)}")
 
+def _cart_analysis_response(result: Dict[str, Any]) -> Dict[str, Any]:
+    if result["success"]:
+        return {
+            "success": True,
+            "items": result["items"],
+            "total_items": result["total_items"],
+            "image_quality": result["image_quality"],
+            "image_url": result.get("image_url"),
+            "message": "Image analyzed successfully"
+        }
+    response = {
+        "success": False,
+        "error": result["error"],
+        "items": []
+    }
+    if result.get("quality_issue"):
+        response["quality_issue"] = result["quality_issue"]
+    return response
+
+def _inference_busy(e: InferenceQueueFull) -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail="Image analysis is busy. Please retry shortly.",
+        headers={"Retry-After": str(int(e.retry_after))}
+    )
+
 @router.post("/inventory/detect")
 async def analyze_cart_image(request: CartImageAnalysisRequest):
     """
     Analyze vendor cart image to detect items
     """
     try:
-        result = vendor_agent.analyze_cart_image(
+        # Decoding and model inference run on the bounded inference pool, off the event loop
+        result = await inference_executor.run(
+            vendor_agent.analyze_cart_image,
             image_data=request.image_data,
-            vendor_id=request.vendor_id
+            vendor_id=request.vendor_id,
+            mode=request.mode
         )
-        
-        if result["success"]:
-            return {
-                "success": True,
-                "items": result["items"],
-                "total_items": result["total_items"],
-                "image_quality": result["image_quality"],
-                "image_url": result.get("image_url"),
-                "message": "Image analyzed successfully"
-            }
-        else:
-            return {
-                "success": False,
-                "error": result["error"],
-                "items": []
-            }
+        return _cart_analysis_response(result)
             
+    except InferenceQueueFull as e:
+        raise _inference_busy(e)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Image analysis error: {str(e)}")
+
+@router.post("/inventory/detect/upload")
+async def analyze_cart_image_upload(
+    vendor_id: str = Form(...),
+    image: UploadFile = File(...),
+    mode: Optional[str] = Form(None)
+):
+    """
+    Analyze vendor cart image sent as multipart/form-data (no base64 overhead).
+    The body size is capped while it streams in (UploadLimitMiddleware); the image
+    is decoded straight from the spooled upload file.
+    """
+    if image.size is not None and image.size > config.UPLOAD_MAX_BYTES:
+        raise HTTPException(status_code=413, detail=str(UploadTooLarge(config.UPLOAD_MAX_BYTES)))
+
+    try:
+        result = await inference_executor.run(
+            vendor_agent.analyze_cart_image_file,
+            image_file=image.file,
+            vendor_id=vendor_id,
+            mode=mode
+        )
+        return _cart_analysis_response(result)
+
+    except InferenceQueueFull as e:
+        raise _inference_busy(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Image analysis error: {str(e)}")
 
@@ -170,6 +219,8 @@ async def get_vendor_analytics(vendor_id: str):
         else:
             raise HTTPException(status_code=404, detail=result.get("error", "Vendor not found"))
             
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Analytics error: {str(e)}")
 
@@ -196,15 +247,7 @@ async def get_vendor_inventory(vendor_id: str):
     Get current vendor inventory
     """
     try:
-        # Load inventory data
-        inventory_file = os.path.join("data", "inventories.json")
-        if not os.path.exists(inventory_file):
-            raise HTTPException(status_code=404, detail="Inventory data not found")
-        
-        with open(inventory_file, 'r', encoding='utf-8') as f:
-            inventories = json.load(f)
-        
-        vendor_inventory = next((inv for inv in inventories if inv["vendor_id"] == vendor_id), None)
+        vendor_inventory = data_store.get_inventory(vendor_id)
         
         if not vendor_inventory:
             return {
@@ -0,0 +1,174 @@
+"""
+Basket optimizer (services.basket_optimizer) on synthetic cities: vendors clustered
+around market areas, each stocking a random part of the catalog at prices spread
+around a per-item base price. For each request of --min-items to --max-items items
+the spatial candidates go through the optimizer as in SmartBuy: the query covers
+--radius-km (default VENDEE_SMARTBUY_RADIUS_KM, 0 = no limit) with --distance-mode
+distances, and the basket keeps the vendors within --basket-radius-km. Its cost is
+compared with the cheapest single vendor stocking the whole basket and, on a sample,
+with the exact optimum over a wider candidate set (subset DP).
+
+Run from backend/:
+    python -m benchmarks.bench_basket_optimizer --vendors 10000 --requests 300
+"""
+import argparse
+import itertools
+import math
+import random
+import time
+from typing import List, Tuple
+
+import numpy as np
+
+import config
+from services.basket_optimizer import BasketOptimizer
+from services.catalog import Catalog, load_catalog
+from services.geo_index import GeoGridIndex
+from services.inventory_rollup import InventoryRollup
+
+# City centre (Connaught Place) and half-width of the synthetic city, in km
+_CENTRE = (28.6315, 77.2167)
+_CITY_KM = 15.0
+_KM_PER_DEG_LAT = 110.57
+
+
+def offset(lat: float, lng: float, north_km: float, east_km: float) -> Tuple[float, float]:
+    return lat + north_km / _KM_PER_DEG_LAT, lng + east_km / (111.32 * math.cos(math.radians(lat)))
+
+
+def build_city(vendor_count: int, names: List[str], rng: random.Random):
+    """Vendors in market clusters plus scattered carts; returns (geo index, vendor id -> rollup)"""
+    base_prices = {name: rng.choice([10, 20, 30, 40, 60, 80, 120, 200]) for name in names}
+    markets = [(rng.uniform(-_CITY_KM, _CITY_KM), rng.uniform(-_CITY_KM, _CITY_KM)) for _ in range(40)]
+    index = GeoGridIndex(config.GEO_INDEX_CELL_KM, initial_capacity=vendor_count)
+    rollups = {}
+    for i in range(vendor_count):
+        if rng.random() < 0.7:
+            north, east = rng.choice(markets)
+            north, east = north + rng.gauss(0, 0.8), east + rng.gauss(0, 0.8)
+        else:
+            north, east = rng.uniform(-_CITY_KM, _CITY_KM), rng.uniform(-_CITY_KM, _CITY_KM)
+        vendor_id = f"V{i:05d}"
+        index.upsert(vendor_id, *offset(*_CENTRE, north, east))
+        stocked = rng.sample(names, rng.randint(3, 20))
+        rollups[vendor_id] = InventoryRollup([
+            {"name": name, "quantity": "10 kg", "unit": "kg",
+             "price_per_unit": round(base_prices[name] * rng.lognormvariate(0, 0.2))}
+            for name in stocked
+        ])
+    return index, rollups
+
+
+def best_single_vendor(optimizer: BasketOptimizer, items: List[str], candidates) -> float:
+    """Cheapest vendor stocking the whole basket, stop included (inf when there is none)"""
+    best = math.inf
+    for _, distance, prices in candidates:
+        if all(name in prices for name in items):
+            best = min(best, optimizer.stop_cost(distance) + sum(prices[name] for name in items))
+    return best
+
+
+def exact_cost(optimizer: BasketOptimizer, items: List[str], candidates) -> float:
+    """
+    Optimal cost over the candidates left by the optimizer's own pruning (with however
+    many offers per item it was built with): DP over subsets of covered items
+    """
+    offers, _ = optimizer._prune(items, candidates)
+    coverable = [name for name in items if any(name in prices for _, _, prices in offers.values())]
+    n = len(coverable)
+    size = 1 << n
+    # Disjoint (covered, added) subset pairs, reused for every vendor
+    masks = np.arange(size)
+    pairs = [(mask, sub) for mask in range(size) for sub in range(1, size) if not mask & sub]
+    covered_masks = np.array([pair[0] for pair in pairs], dtype=np.intp)
+    added_masks = np.array([pair[1] for pair in pairs], dtype=np.intp)
+    bits = (masks[:, None] >> np.arange(n)) & 1
+    dp = np.full(size, np.inf)
+    dp[0] = 0.0
+    for _, stop, prices in offers.values():
+        item_prices = np.array([prices.get(name, np.inf) for name in coverable])
+        sub_cost = stop + np.where(bits == 1, item_prices, 0.0).sum(axis=1)
+        values = dp[covered_masks] + sub_cost[added_masks]
+        updated = dp.copy()
+        np.minimum.at(updated, covered_masks | added_masks, values)
+        dp = updated
+    return float(dp[size - 1])
+
+
+def percentile(values: List[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the SmartBuy basket optimizer on a synthetic city")
+    parser.add_argument("--vendors", type=int, default=10000)
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--min-items", type=int, default=5)
+    parser.add_argument("--max-items", type=int, default=10)
+    parser.add_argument("--radius-km", type=float, default=config.SMARTBUY_RADIUS_KM, help="0 = no limit")
+    parser.add_argument("--basket-radius-km", type=float, default=config.BASKET_RADIUS_KM, help="0 = --radius-km")
+    parser.add_argument("--distance-mode", default=config.DISTANCE_MODE)
+    parser.add_argument("--time-limit-ms", type=float, default=config.BASKET_TIME_LIMIT_MS)
+    parser.add_argument("--exact-requests", type=int, default=30, help="Requests also solved exactly")
+    parser.add_argument("--exact-offers", type=int, default=24, help="Offers per item kept for the exact solve")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    catalog = Catalog(load_catalog())
+    names = [item["name"] for item in catalog.items]
+
+    started_at = time.perf_counter()
+    index, rollups = build_city(args.vendors, names, rng)
+    build_s = time.perf_counter() - started_at
+
+    radius_km = args.radius_km if args.radius_km > 0 else math.inf
+    basket_radius_km = min(radius_km, args.basket_radius_km) if args.basket_radius_km > 0 else radius_km
+    optimizer = BasketOptimizer(time_limit_ms=args.time_limit_ms)
+    reference = BasketOptimizer(offers_per_item=args.exact_offers)
+    query_ms, optimize_ms, candidate_counts, stops, timeouts = [], [], [], [], 0
+    single_ratios, no_single, exact_gaps = [], 0, []
+    for request in range(args.requests):
+        items = rng.sample(names, rng.randint(args.min_items, args.max_items))
+        lat, lng = offset(*_CENTRE, rng.uniform(-_CITY_KM, _CITY_KM), rng.uniform(-_CITY_KM, _CITY_KM))
+
+        started_at = time.perf_counter()
+        matches = index.query_radius(lat, lng, radius_km, mode=args.distance_mode)
+        query_ms.append((time.perf_counter() - started_at) * 1000)
+        # Nearest first: keep the vendors within the basket radius
+        candidates = [(vendor_id, distance, rollups[vendor_id].prices) for vendor_id, distance
+                      in itertools.takewhile(lambda match: match[1] <= basket_radius_km, matches)]
+
+        plan = optimizer.optimize(items, candidates)
+        optimize_ms.append(plan["elapsed_ms"])
+        candidate_counts.append(len(candidates))
+        stops.append(len(plan["stops"]))
+        timeouts += plan["timed_out"]
+
+        if not plan["missing_items"]:
+            single = best_single_vendor(optimizer, items, candidates)
+            if math.isinf(single):
+                no_single += 1
+            else:
+                single_ratios.append(plan["total_cost"] / single)
+            if request < args.exact_requests:
+                exact = exact_cost(reference, items, candidates)
+                exact_gaps.append(plan["total_cost"] / exact - 1)
+
+    print(f"{args.vendors} vendors (city built in {build_s:.1f} s), {args.requests} requests of "
+          f"{args.min_items}-{args.max_items} items, radius {radius_km:g} km ({args.distance_mode}), "
+          f"basket radius {basket_radius_km:g} km, time limit {args.time_limit_ms:g} ms")
+    print(f"candidates per request: mean {np.mean(candidate_counts):.0f}  spatial query p50 {percentile(query_ms, 0.5):.1f} ms")
+    print(f"optimizer:    p50 {percentile(optimize_ms, 0.5):6.2f} ms  p95 {percentile(optimize_ms, 0.95):6.2f} ms  "
+          f"max {max(optimize_ms):6.2f} ms  timed out {timeouts}  stops mean {np.mean(stops):.2f}")
+    if single_ratios:
+        print(f"vs cheapest single vendor: {np.mean(single_ratios):.1%} of its cost on average "
+              f"({no_single} baskets no single vendor could fill)")
+    if exact_gaps:
+        print(f"vs exact optimum ({args.exact_offers} offers/item, {len(exact_gaps)} requests): "
+              f"mean gap {np.mean(exact_gaps):.2%}  max gap {max(exact_gaps):.2%}  optimal in {sum(g < 1e-9 for g in exact_gaps)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Compare the cart image inference engines on a folder of images.
+
+Reports per-image latency (p50/p95), batched throughput and how often each
+engine's top-3 labels agree with the PyTorch pipeline.
+
+Run from backend/:
+    python -m benchmarks.bench_detector_engines --images path/to/images --engines pytorch,quantized,onnx
+"""
+import argparse
+import os
+import statistics
+import time
+from typing import List, Dict
+
+from PIL import Image
+
+from services import yolo_detector
+
+_IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp", ".bmp")
+
+
+def load_images(folder: str, limit: int = None) -> List[Image.Image]:
+    paths = sorted(
+        os.path.join(folder, name) for name in os.listdir(folder)
+        if name.lower().endswith(_IMAGE_EXTENSIONS)
+    )[:limit]
+    return [Image.open(path).convert("RGB") for path in paths]
+
+
+def _percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def _top_labels(results: List[List[Dict]], k: int) -> List[List[str]]:
+    return [[res["label"] for res in image_results[:k]] for image_results in results]
+
+
+def bench_engine(engine: str, images: List[Image.Image], batch_size: int, repeats: int) -> Dict:
+    import torch
+
+    started_at = time.perf_counter()
+    classifier = yolo_detector._build_pipeline(-1, engine=engine)
+    load_s = time.perf_counter() - started_at
+
+    with torch.inference_mode():
+        classifier(images[:1], top_k=3, batch_size=1)  # warmup
+
+        latencies_ms = []
+        results = []
+        for image in images:
+            started_at = time.perf_counter()
+            output = classifier([image], top_k=3, batch_size=1)
+            results.append(yolo_detector._normalize_batch_results(output, 1)[0])
+            latencies_ms.append((time.perf_counter() - started_at) * 1000)
+
+        started_at = time.perf_counter()
+        for _ in range(repeats):
+            classifier(images, top_k=3, batch_size=batch_size)
+        throughput = repeats * len(images) / (time.perf_counter() - started_at)
+
+    return {
+        "engine": engine,
+        "load_s": load_s,
+        "p50_ms": statistics.median(latencies_ms),
+        "p95_ms": _percentile(latencies_ms, 0.95),
+        "images_per_s": throughput,
+        "top3": _top_labels(results, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark cart image inference engines")
+    parser.add_argument("--images", required=True, help="Folder of cart images")
+    parser.add_argument("--engines", default=",".join(yolo_detector.DETECTOR_ENGINES))
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--repeats", type=int, default=3, help="Passes over the folder for throughput")
+    parser.add_argument("--limit", type=int, default=None, help="Use at most this many images")
+    args = parser.parse_args()
+
+    images = load_images(args.images, args.limit)
+    if not images:
+        parser.error(f"No images found in {args.images}")
+
+    engines = [engine.strip() for engine in args.engines.split(",") if engine.strip()]
+    reports = [bench_engine(engine, images, args.batch_size, args.repeats) for engine in engines]
+
+    # Agreement is measured against the first engine, normally the PyTorch baseline
+    baseline = reports[0]["top3"]
+    print(f"{len(images)} images, batch size {args.batch_size}, baseline '{reports[0]['engine']}'")
+    print(f"{'engine':<10} {'load s':>7} {'p50 ms':>8} {'p95 ms':>8} {'img/s':>8} {'top1 =':>7} {'top3 overlap':>13}")
+    for report in reports:
+        top1 = sum(a[:1] == b[:1] for a, b in zip(report["top3"], baseline)) / len(images)
+        overlap = sum(len(set(a) & set(b)) / max(1, len(b)) for a, b in zip(report["top3"], baseline)) / len(images)
+        print(
+            f"{report['engine']:<10} {report['load_s']:>7.2f} {report['p50_ms']:>8.1f} {report['p95_ms']:>8.1f} "
+            f"{report['images_per_s']:>8.1f} {top1:>7.1%} {overlap:>13.1%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Lookup latency of the symmetric-delete fuzzy matcher (services.fuzzy_matcher)
+against computing the edit distance to every name, over the catalog vocabulary
+plus generated inventory names, with misspelled queries.
+
+Run from backend/:
+    python -m benchmarks.bench_fuzzy_matcher --names 5000 --queries 2000
+"""
+import argparse
+import random
+import string
+import time
+from typing import List
+
+from services.catalog import Catalog, load_catalog
+from services.fuzzy_matcher import FuzzyMatcher, allowed_distance, edit_distance
+
+
+def misspell(word: str, rng: random.Random) -> str:
+    """One random insertion, deletion, substitution or transposition after the first letter"""
+    i = rng.randrange(1, len(word))
+    edit = rng.choice(["insert", "delete", "substitute", "transpose"])
+    if edit == "insert":
+        return word[:i] + rng.choice(string.ascii_lowercase) + word[i:]
+    if edit == "delete":
+        return word[:i] + word[i + 1:]
+    if edit == "substitute":
+        return word[:i] + rng.choice(string.ascii_lowercase) + word[i + 1:]
+    if i + 1 < len(word):
+        return word[:i] + word[i + 1] + word[i] + word[i + 2:]
+    return word
+
+
+def brute_force(names: List[str], word: str) -> List[str]:
+    limit = allowed_distance(word)
+    return [name for name in names if name[0] == word[0] and edit_distance(word, name, limit) <= limit]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark typo-tolerant item lookups")
+    parser.add_argument("--names", type=int, default=5000, help="Generated inventory names on top of the catalog")
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    catalog = Catalog(load_catalog())
+    names = sorted({form for item in catalog.items for form in catalog.surface_forms(item)})
+    names += ["".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(5, 12))) for _ in range(args.names)]
+
+    started_at = time.perf_counter()
+    matcher = FuzzyMatcher(names)
+    build_ms = (time.perf_counter() - started_at) * 1000
+
+    queries = [misspell(rng.choice(names), rng) for _ in range(args.queries)]
+
+    started_at = time.perf_counter()
+    indexed = [{term for term, _ in matcher.lookup(query)} for query in queries]
+    indexed_ms = (time.perf_counter() - started_at) * 1000 / len(queries)
+
+    started_at = time.perf_counter()
+    scanned = [set(brute_force(names, query)) for query in queries]
+    scanned_ms = (time.perf_counter() - started_at) * 1000 / len(queries)
+
+    agree = sum(a == b for a, b in zip(indexed, scanned))
+    print(f"{len(names)} names, {len(queries)} misspelled queries (index built in {build_ms:.0f} ms)")
+    print(f"symmetric delete: {indexed_ms:.3f} ms/lookup")
+    print(f"full scan:        {scanned_ms:.3f} ms/lookup  ({scanned_ms / indexed_ms:.0f}x slower)")
+    # Differences: a misspelling that is itself a name only returns that exact name
+    print(f"same matches:     {agree / len(queries):.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Compare full-resolution decoding of cart uploads with the reduced-resolution
+preprocessing pipeline (services.image_preprocess).
+
+For each image, reports decode + preprocess time and the peak memory growth of
+the process while handling one upload. Each measurement runs in a fresh forked
+child because Pillow allocates pixel buffers outside the Python heap.
+
+Run from backend/:
+    python -m benchmarks.bench_image_preprocess --images path/to/photos
+Without --images a synthetic 12 MP JPEG is used.
+"""
+import argparse
+import io
+import multiprocessing
+import os
+import resource
+import statistics
+import time
+from typing import Callable, List
+
+import numpy as np
+from PIL import Image
+
+import config
+from services.image_preprocess import prepare_image
+
+_IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp")
+
+
+def legacy_path(data: bytes):
+    """What analyze_cart_image did before: full decode, full grayscale copy, full-size JPEG"""
+    image = Image.open(io.BytesIO(data))
+    np.array(image.convert("L")).var()
+    image.save(io.BytesIO(), format="JPEG")
+    image.convert("RGB")
+
+
+def reduced_path(data: bytes):
+    prepared = prepare_image(io.BytesIO(data))
+    np.array(prepared.model_image.convert("L")).var()
+    prepared.storage_image.save(io.BytesIO(), format="JPEG", quality=config.UPLOAD_JPEG_QUALITY)
+
+
+def _measure(fn: Callable[[bytes], None], data: bytes, results):
+    baseline_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    started_at = time.perf_counter()
+    fn(data)
+    elapsed_ms = (time.perf_counter() - started_at) * 1000
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    results.put((elapsed_ms, (peak_kb - baseline_kb) / 1024))
+
+
+def measure(fn: Callable[[bytes], None], data: bytes):
+    """Run fn(data) in a forked child. Returns: (elapsed ms, peak RSS growth in MB)"""
+    ctx = multiprocessing.get_context("fork")
+    results = ctx.Queue()
+    process = ctx.Process(target=_measure, args=(fn, data, results))
+    process.start()
+    result = results.get()
+    process.join()
+    return result
+
+
+def synthetic_jpeg(width: int = 4000, height: int = 3000) -> bytes:
+    # Smooth gradients plus noise, so the JPEG compresses like a photo rather than random data
+    y, x = np.mgrid[0:height, 0:width]
+    base = np.stack([(x * 255 // width), (y * 255 // height), ((x + y) * 255 // (width + height))], axis=-1)
+    noise = np.random.default_rng(0).integers(0, 24, size=base.shape)
+    buffer = io.BytesIO()
+    Image.fromarray(np.clip(base + noise, 0, 255).astype(np.uint8)).save(buffer, format="JPEG", quality=90)
+    return buffer.getvalue()
+
+
+def load_uploads(folder: str) -> List[bytes]:
+    uploads = []
+    for name in sorted(os.listdir(folder)):
+        if name.lower().endswith(_IMAGE_EXTENSIONS):
+            with open(os.path.join(folder, name), "rb") as f:
+                uploads.append(f.read())
+    return uploads
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark cart image decoding and preprocessing")
+    parser.add_argument("--images", help="Folder of photos (default: one synthetic 12 MP JPEG)")
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    uploads = load_uploads(args.images) if args.images else [synthetic_jpeg()]
+    if not uploads:
+        parser.error(f"No images found in {args.images}")
+
+    print(f"{len(uploads)} upload(s), {args.repeats} repeat(s) each")
+    print(f"{'pipeline':<10} {'median ms':>10} {'max ms':>8} {'peak MB':>8}")
+    for name, fn in (("legacy", legacy_path), ("reduced", reduced_path)):
+        times, peaks = [], []
+        for data in uploads:
+            for _ in range(args.repeats):
+                elapsed_ms, peak_mb = measure(fn, data)
+                times.append(elapsed_ms)
+                peaks.append(peak_mb)
+        print(f"{name:<10} {statistics.median(times):>10.1f} {max(times):>8.1f} {statistics.median(peaks):>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Throughput of the SmartBuy request parser (services.request_parser) against the
+rule-based parser it replaced, on a generated corpus of sample requests.
+
+Run from backend/:
+    python -m benchmarks.bench_smartbuy_parser --requests 20000
+"""
+import argparse
+import random
+import time
+from typing import Dict, Any, List
+
+from services.catalog import Catalog, load_catalog
+from services.request_parser import RequestParser
+
+_TEMPLATES = [
+    "I need {q1} {i1} and {q2} {i2}",
+    "{i1} {q1}, {i2} {q2} delivered to my home",
+    "Looking for fresh {i1} and {i2} asap",
+    "can you bring {q1} {i1}, {q2} {i2} and some {i3}",
+    "Where can I find cheap {i1}?",
+    "{q1} {i1} urgently please, also {i2}",
+    "want organic {i1} {q1} and {i2} {q2} on a budget",
+    "hello, do you have {i1}",
+]
+_QUANTITIES = ["1 kg", "2kg", "500 g", "3 pieces", "2 bunches", "a dozen", "1 pack", "4"]
+
+
+def legacy_parse(request_text: str) -> Dict[str, Any]:
+    """The previous WatsonAIService._enhanced_parsing, kept verbatim for comparison"""
+    request_text = request_text.lower().strip()
+    item_patterns = {
+        "fruits": ["banana", "apple", "orange", "mango", "grapes", "strawberry", "pineapple"],
+        "vegetables": ["tomato", "onion", "potato", "carrot", "cucumber", "cauliflower", "broccoli"],
+        "herbs": ["coriander", "mint", "basil", "parsley", "rosemary"],
+        "flowers": ["rose", "marigold", "sunflower", "lily", "tulip"],
+        "nuts": ["almonds", "cashews", "walnuts", "pistachios"],
+        "grains": ["rice", "wheat", "pulses", "lentils"]
+    }
+    import re
+    quantity_pattern = r'(\d+)\s*(kg|g|pieces?|bunches?|dozens?|packs?)'
+    quantities = re.findall(quantity_pattern, request_text)
+    items = []
+    total_confidence = 0
+    item_count = 0
+    for category, category_items in item_patterns.items():
+        for item in category_items:
+            if item in request_text:
+                quantity = "1 kg"
+                unit = "kg"
+                for qty, unit_type in quantities:
+                    if unit_type in ["kg", "g"]:
+                        quantity = f"{qty} {unit_type}"
+                        unit = unit_type
+                    elif unit_type in ["pieces", "piece"]:
+                        quantity = f"{qty} pieces"
+                        unit = "piece"
+                    elif unit_type in ["bunches", "bunch"]:
+                        quantity = f"{qty} bunches"
+                        unit = "bunch"
+                    elif unit_type in ["dozens", "dozen"]:
+                        quantity = f"{qty} dozen"
+                        unit = "dozen"
+                    elif unit_type in ["packs", "pack"]:
+                        quantity = f"{qty} packs"
+                        unit = "pack"
+                confidence = 0.9
+                if any(word in request_text for word in ["fresh", "organic", "local"]):
+                    confidence += 0.1
+                if any(word in request_text for word in ["cheap", "expensive", "budget"]):
+                    confidence += 0.05
+                items.append({"name": item, "quantity": quantity, "unit": unit, "category": category,
+                              "confidence": min(confidence, 1.0)})
+                total_confidence += confidence
+                item_count += 1
+    delivery_requested = any(word in request_text for word in ["deliver", "delivery", "home", "house", "doorstep", "bring"])
+    is_urgent = any(word in request_text for word in ["urgent", "asap", "quick", "fast", "immediate"])
+    budget_constraint = any(word in request_text for word in ["cheap", "affordable", "budget", "economical", "low price"])
+    return {
+        "items": items,
+        "delivery_requested": delivery_requested,
+        "is_urgent": is_urgent,
+        "budget_constraint": budget_constraint,
+        "original_request": request_text,
+        "parsed_successfully": len(items) > 0,
+        "confidence": total_confidence / item_count if item_count else 0,
+        "total_items": len(items)
+    }
+
+
+def build_corpus(names: List[str], size: int, seed: int = 7) -> List[str]:
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(size):
+        i1, i2, i3 = rng.sample(names, 3)
+        corpus.append(rng.choice(_TEMPLATES).format(
+            i1=i1 + rng.choice(["", "s"]), i2=i2, i3=i3,
+            q1=rng.choice(_QUANTITIES), q2=rng.choice(_QUANTITIES),
+        ))
+    return corpus
+
+
+def throughput(parse, corpus: List[str], repeats: int) -> float:
+    started_at = time.perf_counter()
+    for _ in range(repeats):
+        for text in corpus:
+            parse(text)
+    return repeats * len(corpus) / (time.perf_counter() - started_at)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark SmartBuy request parsing")
+    parser.add_argument("--requests", type=int, default=20000, help="Corpus size")
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    catalog = Catalog(load_catalog())
+    request_parser = RequestParser(catalog)
+    corpus = build_corpus([item["name"] for item in catalog.items], args.requests)
+
+    legacy_rate = throughput(legacy_parse, corpus, args.repeats)
+    new_rate = throughput(request_parser.parse, corpus, args.repeats)
+
+    same_items = sum(
+        {item["name"] for item in legacy_parse(text)["items"]} == {item["name"] for item in request_parser.parse(text)["items"]}
+        for text in corpus
+    )
+    print(f"{len(corpus)} requests x {args.repeats}")
+    print(f"legacy parser: {legacy_rate:>10,.0f} req/s")
+    print(f"trie parser:   {new_rate:>10,.0f} req/s  ({new_rate / legacy_rate:.1f}x)")
+    print(f"same item set: {same_items / len(corpus):.1%} (differences: catalog items unknown to the legacy list, "
+          f"substring false positives such as 'apple' in 'pineapple')")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Latency of remote SmartBuy parsing against the local Watson stub
+(benchmarks/watson_stub.py, started here in a subprocess): a blocking requests.post
+per call, as an async route would have done it, against the pooled async client
+with a concurrency limit and single-flight coalescing of repeated prompts. All
+requests arrive at once; latencies are measured from their arrival.
+
+Run from backend/:
+    python -m benchmarks.bench_watson_client --requests 200 --distinct 40 --latency-ms 150
+"""
+import argparse
+import asyncio
+import json
+import random
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+from typing import List
+
+import requests
+
+import config
+from services.watson_client import WatsonClient, WatsonUnavailable
+
+_PHRASES = [
+    "{q} kg tomatoes", "onion potato delivery", "need {q} dozen bananas", "fresh coriander {q} bunches",
+    "{q} kg apples and mangoes", "cheap rice {q} kg", "rose bunch urgently", "{q} kg carrots and peas",
+]
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_stub(port: int, latency_ms: float, jitter_ms: float) -> subprocess.Popen:
+    process = subprocess.Popen([
+        sys.executable, "-m", "benchmarks.watson_stub", "--port", str(port),
+        "--latency-ms", str(latency_ms), "--jitter-ms", str(jitter_ms), "--seed", "7",
+    ])
+    deadline = time.monotonic() + 15
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/stats", timeout=0.5)
+            return process
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError("Watson stub did not start")
+
+
+def stub_calls(port: int) -> int:
+    return json.load(urllib.request.urlopen(f"http://127.0.0.1:{port}/stats"))["calls"]
+
+
+def percentile(values: List[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def build_prompts(count: int, distinct: int, seed: int = 7) -> List[str]:
+    rng = random.Random(seed)
+    pool = [rng.choice(_PHRASES).format(q=rng.randint(1, 5)) + f" #{i}" for i in range(distinct)]
+    return [rng.choice(pool) for _ in range(count)]
+
+
+async def run_blocking(url: str, prompts: List[str]) -> List[float]:
+    """Each call blocks the event loop, so concurrent requests run one after another"""
+    latencies = []
+    started_at = time.perf_counter()
+
+    async def one(prompt: str):
+        requests.post(url, json={"input": prompt}, timeout=config.WATSON_TIMEOUT_S).raise_for_status()
+        latencies.append((time.perf_counter() - started_at) * 1000)
+
+    await asyncio.gather(*(one(prompt) for prompt in prompts))
+    return latencies
+
+
+async def run_async(client: WatsonClient, prompts: List[str], timeout_s: float):
+    latencies, failures = [], 0
+    started_at = time.perf_counter()
+
+    async def one(prompt: str):
+        nonlocal failures
+        try:
+            await client.parse(prompt, timeout_s)
+        except WatsonUnavailable:
+            failures += 1
+        latencies.append((time.perf_counter() - started_at) * 1000)
+
+    await asyncio.gather(*(one(prompt) for prompt in prompts))
+    await client.aclose()
+    return latencies, failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the async Watson client against the local stub")
+    parser.add_argument("--requests", type=int, default=200, help="Concurrent SmartBuy requests")
+    parser.add_argument("--distinct", type=int, default=40, help="Distinct phrasings among them")
+    parser.add_argument("--latency-ms", type=float, default=150.0)
+    parser.add_argument("--jitter-ms", type=float, default=50.0)
+    parser.add_argument("--concurrency", type=int, default=config.WATSON_MAX_CONCURRENCY)
+    parser.add_argument("--timeout-s", type=float, default=config.WATSON_TIMEOUT_S)
+    args = parser.parse_args()
+
+    port = free_port()
+    stub = start_stub(port, args.latency_ms, args.jitter_ms)
+    base_url = f"http://127.0.0.1:{port}"
+    prompts = build_prompts(args.requests, args.distinct)
+    try:
+        started_at = time.perf_counter()
+        blocking = asyncio.run(run_blocking(base_url + config.WATSON_PARSE_PATH, prompts))
+        blocking_wall = time.perf_counter() - started_at
+        calls_before = stub_calls(port)
+
+        client = WatsonClient(base_url=base_url, api_key="", timeout_s=args.timeout_s, max_concurrency=args.concurrency)
+        started_at = time.perf_counter()
+        pooled, failures = asyncio.run(run_async(client, prompts, args.timeout_s))
+        pooled_wall = time.perf_counter() - started_at
+        remote_calls = stub_calls(port) - calls_before
+    finally:
+        stub.terminate()
+        stub.wait()
+
+    print(f"{len(prompts)} concurrent requests, {args.distinct} distinct, stub latency {args.latency_ms:g}±{args.jitter_ms:g} ms")
+    print(f"blocking requests: wall {blocking_wall:6.2f} s  p50 {percentile(blocking, 0.5):7.1f} ms  "
+          f"p95 {percentile(blocking, 0.95):7.1f} ms  remote calls {len(prompts)}")
+    print(f"async client:      wall {pooled_wall:6.2f} s  p50 {percentile(pooled, 0.5):7.1f} ms  "
+          f"p95 {percentile(pooled, 0.95):7.1f} ms  remote calls {remote_calls}  timeouts/errors {failures}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Local stand-in for the Watson Orchestrate SmartBuy parse endpoint, for latency and
+failure tests of services.watson_client. Answers POST <parse path> {"input": text}
+with the local parser's result after a configurable delay.
+
+Run from backend/:
+    python -m benchmarks.watson_stub --port 8787 --latency-ms 150 --jitter-ms 50
+then start the API with
+    VENDEE_WATSON_ENABLED=true VENDEE_WATSON_URL=http://127.0.0.1:8787
+"""
+import argparse
+import asyncio
+import random
+
+import uvicorn
+from fastapi import FastAPI, HTTPException
+from pydantic import BaseModel
+
+import config
+from services.watson_ai_service import WatsonAIService
+
+
+class ParseRequest(BaseModel):
+    input: str
+
+
+def create_app(latency_ms: float = 0.0, jitter_ms: float = 0.0, error_rate: float = 0.0, seed: int = None) -> FastAPI:
+    app = FastAPI(title="Watson Orchestrate stub")
+    rng = random.Random(seed)
+    service = WatsonAIService()
+    stats = {"calls": 0}
+
+    @app.post(config.WATSON_PARSE_PATH)
+    async def parse(request: ParseRequest):
+        stats["calls"] += 1
+        await asyncio.sleep(max(0.0, latency_ms + rng.uniform(-jitter_ms, jitter_ms)) / 1000)
+        if rng.random() < error_rate:
+            raise HTTPException(status_code=503, detail="Injected failure")
+        parsed = service._enhanced_parsing(request.input)
+        return {
+            "items": parsed["items"],
+            "delivery_requested": parsed["delivery_requested"],
+            "is_urgent": parsed["is_urgent"],
+            "budget_constraint": parsed["budget_constraint"],
+            "confidence": parsed["confidence"],
+        }
+
+    @app.get("/stats")
+    async def get_stats():
+        return stats
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Watson Orchestrate parse endpoint stub")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8787)
+    parser.add_argument("--latency-ms", type=float, default=150.0)
+    parser.add_argument("--jitter-ms", type=float, default=50.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of calls answered with HTTP 503")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+    app = create_app(args.latency_ms, args.jitter_ms, args.error_rate, args.seed)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
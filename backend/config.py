@@ -0,0 +1,187 @@
+"""
+Runtime configuration for the Vendee backend.
+All settings can be overridden through environment variables.
+"""
+import os
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+# Directory holding vendors.json, inventories.json, requests.json, unmet_demand.json
+DATA_DIR = os.getenv("VENDEE_DATA_DIR", "data")
+
+# Minimum seconds between on-disk change checks of the data files
+STORE_REFRESH_INTERVAL_S = _env_float("VENDEE_STORE_REFRESH_INTERVAL_S", 1.0)
+
+# Storage backend for vendors/inventories/requests: "json" or "sqlite"
+STORAGE_BACKEND = os.getenv("VENDEE_STORAGE_BACKEND", "json")
+
+# SQLite database file used when STORAGE_BACKEND is "sqlite"
+SQLITE_PATH = os.getenv("VENDEE_SQLITE_PATH", os.path.join(DATA_DIR, "vendee.db"))
+
+# Grid cell size of the spatial index over vendor locations
+GEO_INDEX_CELL_KM = _env_float("VENDEE_GEO_INDEX_CELL_KM", 1.0)
+
+# Default SmartBuy search radius around the customer; 0 means no limit. Requests can
+# set their own radius_km
+SMARTBUY_RADIUS_KM = _env_float("VENDEE_SMARTBUY_RADIUS_KM", 0.0)
+
+# Distance computation for vendor search: "exact" (geodesic on haversine survivors)
+# or "fast" (vectorized haversine only, within ~0.6% of geodesic)
+DISTANCE_MODE = os.getenv("VENDEE_DISTANCE_MODE", "exact")
+
+# Image inference executor: concurrent workers, extra queued jobs before
+# rejecting with 503, and the Retry-After hint sent to clients.
+# Workers block while their image waits in a detector batch, so keep
+# INFERENCE_WORKERS >= DETECTOR_MAX_BATCH_SIZE for batching to fill up.
+INFERENCE_WORKERS = int(_env_float("VENDEE_INFERENCE_WORKERS", 8))
+INFERENCE_QUEUE_DEPTH = int(_env_float("VENDEE_INFERENCE_QUEUE_DEPTH", 8))
+INFERENCE_RETRY_AFTER_S = _env_float("VENDEE_INFERENCE_RETRY_AFTER_S", 5.0)
+
+# Dynamic micro-batching of cart image classification: concurrent requests are
+# collected for up to DETECTOR_MAX_BATCH_WAIT_MS or DETECTOR_MAX_BATCH_SIZE images
+DETECTOR_BATCHING = _env_bool("VENDEE_DETECTOR_BATCHING", True)
+DETECTOR_MAX_BATCH_SIZE = int(_env_float("VENDEE_DETECTOR_MAX_BATCH_SIZE", 8))
+DETECTOR_MAX_BATCH_WAIT_MS = _env_float("VENDEE_DETECTOR_MAX_BATCH_WAIT_MS", 10.0)
+
+# Load and warm up the cart image model at server startup instead of on the first upload,
+# and how long shutdown waits for a load still in progress
+DETECTOR_EAGER_LOAD = _env_bool("VENDEE_DETECTOR_EAGER_LOAD", True)
+DETECTOR_SHUTDOWN_WAIT_S = _env_float("VENDEE_DETECTOR_SHUTDOWN_WAIT_S", 10.0)
+
+# GPU circuit breaker: consecutive device failures before routing inference to CPU,
+# and seconds before the GPU is probed again
+DETECTOR_BREAKER_FAILURE_THRESHOLD = int(_env_float("VENDEE_DETECTOR_BREAKER_FAILURE_THRESHOLD", 3))
+DETECTOR_BREAKER_COOLDOWN_S = _env_float("VENDEE_DETECTOR_BREAKER_COOLDOWN_S", 30.0)
+
+# Cart image inference engine: "pytorch" (default, uses the GPU when present),
+# "quantized" (dynamic int8 PyTorch on CPU) or "onnx" (ONNX Runtime on CPU;
+# needs onnxruntime and onnx, the model is exported to DETECTOR_ONNX_PATH on first load)
+DETECTOR_ENGINE = os.getenv("VENDEE_DETECTOR_ENGINE", "pytorch").lower()
+DETECTOR_ONNX_PATH = os.getenv("VENDEE_DETECTOR_ONNX_PATH", os.path.join("models", "fruit_detector.onnx"))
+# ONNX Runtime intra-op threads; 0 lets ONNX Runtime choose
+DETECTOR_ONNX_THREADS = int(_env_float("VENDEE_DETECTOR_ONNX_THREADS", 0))
+
+# Cache of cart image detections keyed by decoded-pixel hash, so only identical photos hit.
+# Perceptual matching is opt-in: with it, photos whose 64-bit dHash differs in at most
+# DETECTION_CACHE_MAX_DISTANCE bits (max 7) also hit, at the risk of reusing the labels
+# of a different but similar-looking cart. DETECTION_CACHE_PATH enables persistence to a
+# JSON file across restarts; the file is rewritten at most every
+# DETECTION_CACHE_FLUSH_INTERVAL_S and on shutdown.
+DETECTION_CACHE_ENABLED = _env_bool("VENDEE_DETECTION_CACHE", True)
+DETECTION_CACHE_MAX_ENTRIES = int(_env_float("VENDEE_DETECTION_CACHE_MAX_ENTRIES", 1024))
+DETECTION_CACHE_TTL_S = _env_float("VENDEE_DETECTION_CACHE_TTL_S", 24 * 3600.0)
+DETECTION_CACHE_PERCEPTUAL = _env_bool("VENDEE_DETECTION_CACHE_PERCEPTUAL", False)
+DETECTION_CACHE_MAX_DISTANCE = int(_env_float("VENDEE_DETECTION_CACHE_MAX_DISTANCE", 4))
+DETECTION_CACHE_PATH = os.getenv("VENDEE_DETECTION_CACHE_PATH", "")
+DETECTION_CACHE_FLUSH_INTERVAL_S = _env_float("VENDEE_DETECTION_CACHE_FLUSH_INTERVAL_S", 30.0)
+
+# Multipart cart image uploads: maximum image size (the form parser spools file parts
+# over 1 MB to a temporary file)
+UPLOAD_MAX_BYTES = int(_env_float("VENDEE_UPLOAD_MAX_MB", 10) * 1024 * 1024)
+
+# Cart image preprocessing: uploads are decoded at reduced resolution. The model gets an
+# image whose shortest side is at most PREPROCESS_MODEL_SIZE; the copy saved to uploads/
+# has its longest side capped at PREPROCESS_STORAGE_MAX_SIDE
+PREPROCESS_MODEL_SIZE = int(_env_float("VENDEE_PREPROCESS_MODEL_SIZE", 256))
+PREPROCESS_STORAGE_MAX_SIDE = int(_env_float("VENDEE_PREPROCESS_STORAGE_MAX_SIDE", 1600))
+UPLOAD_JPEG_QUALITY = int(_env_float("VENDEE_UPLOAD_JPEG_QUALITY", 85))
+
+# Cart photo quality gate, evaluated on a grayscale thumbnail before inference.
+# Blur is the variance of the Laplacian; exposure uses mean brightness (0-255) and
+# the fraction of near-black / near-white pixels
+QUALITY_THUMBNAIL_SIZE = int(_env_float("VENDEE_QUALITY_THUMBNAIL_SIZE", 256))
+QUALITY_BLUR_THRESHOLD = _env_float("VENDEE_QUALITY_BLUR_THRESHOLD", 100.0)
+QUALITY_MIN_BRIGHTNESS = _env_float("VENDEE_QUALITY_MIN_BRIGHTNESS", 35.0)
+QUALITY_MAX_BRIGHTNESS = _env_float("VENDEE_QUALITY_MAX_BRIGHTNESS", 225.0)
+QUALITY_MAX_CLIPPED_FRACTION = _env_float("VENDEE_QUALITY_MAX_CLIPPED_FRACTION", 0.5)
+QUALITY_MIN_SIDE = int(_env_float("VENDEE_QUALITY_MIN_SIDE", 224))
+
+# Uploaded cart photos are written by a background archiver. When UPLOAD_MAX_BACKLOG
+# images are already waiting, the request writes its own image. UPLOAD_FSYNC is "none"
+# (leave flushing to the OS) or "always" (fsync every file and the directory).
+# Files older than UPLOAD_RETENTION_DAYS are deleted every UPLOAD_CLEANUP_INTERVAL_S
+# (0 disables retention), except photos an inventory's image_url still points to.
+UPLOADS_DIR = os.getenv("VENDEE_UPLOADS_DIR", "uploads")
+UPLOAD_MAX_BACKLOG = int(_env_float("VENDEE_UPLOAD_MAX_BACKLOG", 16))
+UPLOAD_FSYNC = os.getenv("VENDEE_UPLOAD_FSYNC", "none").lower()
+UPLOAD_WEBP = _env_bool("VENDEE_UPLOAD_WEBP", False)
+UPLOAD_THUMBNAIL_SIZE = int(_env_float("VENDEE_UPLOAD_THUMBNAIL_SIZE", 0))
+UPLOAD_RETENTION_DAYS = _env_float("VENDEE_UPLOAD_RETENTION_DAYS", 30.0)
+UPLOAD_CLEANUP_INTERVAL_S = _env_float("VENDEE_UPLOAD_CLEANUP_INTERVAL_S", 3600.0)
+UPLOAD_SHUTDOWN_FLUSH_S = _env_float("VENDEE_UPLOAD_SHUTDOWN_FLUSH_S", 10.0)
+
+# Cart detection mode: "single" classifies the whole photo (top 3 items); "tiled" also
+# classifies a DETECTOR_TILE_GRID x DETECTOR_TILE_GRID grid of overlapping crops in one
+# batch and merges the labels. The grid shrinks when the measured cost per crop would
+# push a request past DETECTOR_TILE_BUDGET_MS (0 = no budget)
+DETECTOR_MODE = os.getenv("VENDEE_DETECTOR_MODE", "single").lower()
+DETECTOR_TILE_GRID = int(_env_float("VENDEE_DETECTOR_TILE_GRID", 3))
+DETECTOR_TILE_OVERLAP = _env_float("VENDEE_DETECTOR_TILE_OVERLAP", 0.25)
+DETECTOR_TILE_TOP_K = int(_env_float("VENDEE_DETECTOR_TILE_TOP_K", 3))
+DETECTOR_TILE_MAX_ITEMS = int(_env_float("VENDEE_DETECTOR_TILE_MAX_ITEMS", 15))
+DETECTOR_TILE_BUDGET_MS = _env_float("VENDEE_DETECTOR_TILE_BUDGET_MS", 1500.0)
+
+# Typo-tolerant item matching for search and SmartBuy ("tomatos", "bananna"). Words
+# shorter than FUZZY_MIN_LENGTH must match exactly; longer words may be one edit off,
+# and two from FUZZY_TWO_EDIT_LENGTH characters on
+FUZZY_MATCH_ENABLED = _env_bool("VENDEE_FUZZY_MATCH_ENABLED", True)
+FUZZY_MIN_LENGTH = int(_env_float("VENDEE_FUZZY_MIN_LENGTH", 5))
+FUZZY_TWO_EDIT_LENGTH = int(_env_float("VENDEE_FUZZY_TWO_EDIT_LENGTH", 9))
+
+# SmartBuy parse results keyed by normalized request text (lowercase, collapsed
+# whitespace), shared by all requests; vendor matching is never cached
+SMARTBUY_PARSE_CACHE_ENABLED = _env_bool("VENDEE_SMARTBUY_PARSE_CACHE", True)
+SMARTBUY_PARSE_CACHE_MAX_ENTRIES = int(_env_float("VENDEE_SMARTBUY_PARSE_CACHE_MAX_ENTRIES", 2048))
+SMARTBUY_PARSE_CACHE_TTL_S = _env_float("VENDEE_SMARTBUY_PARSE_CACHE_TTL_S", 3600.0)
+
+# Remote SmartBuy parsing through Watson Orchestrate (off by default; the local parser
+# is used). Calls share one keep-alive connection pool of WATSON_MAX_CONNECTIONS, at
+# most WATSON_MAX_CONCURRENCY run at once, identical in-flight prompts share one call,
+# and a call not answered within WATSON_TIMEOUT_S falls back to the local parser.
+WATSON_ENABLED = _env_bool("VENDEE_WATSON_ENABLED", False)
+WATSON_URL = os.getenv(
+    "VENDEE_WATSON_URL",
+    "https://api.ap-south-1.dl.watson-orchestrate.ibm.com/instances/20250808-1247-0789-30cc-fbe921fd0899",
+)
+WATSON_API_KEY = os.getenv("VENDEE_WATSON_API_KEY", "")
+WATSON_PARSE_PATH = os.getenv("VENDEE_WATSON_PARSE_PATH", "/v1/smartbuy/parse")
+WATSON_TIMEOUT_S = _env_float("VENDEE_WATSON_TIMEOUT_S", 2.0)
+WATSON_CONNECT_TIMEOUT_S = _env_float("VENDEE_WATSON_CONNECT_TIMEOUT_S", 1.0)
+WATSON_MAX_CONNECTIONS = int(_env_float("VENDEE_WATSON_MAX_CONNECTIONS", 20))
+WATSON_MAX_CONCURRENCY = int(_env_float("VENDEE_WATSON_MAX_CONCURRENCY", 10))
+WATSON_KEEPALIVE_S = _env_float("VENDEE_WATSON_KEEPALIVE_S", 30.0)
+
+# How a remote Watson parse is used: "fallback" waits up to WATSON_TIMEOUT_S for Watson
+# and parses locally on failure; "hedged" parses locally right away, races Watson
+# against SMARTBUY_PARSE_BUDGET_MS and answers with whichever result is available
+# (Watson's when it arrives in time). Late Watson answers still fill the parse cache.
+WATSON_MODE = os.getenv("VENDEE_WATSON_MODE", "fallback").lower()
+SMARTBUY_PARSE_BUDGET_MS = _env_float("VENDEE_SMARTBUY_PARSE_BUDGET_MS", 300.0)
+
+# SmartBuy basket optimizer: splits a request across nearby vendors, minimising the item
+# prices plus BASKET_STOP_PENALTY (rupees) per vendor visited and BASKET_KM_PENALTY per km
+# to each of them. Only vendors within BASKET_RADIUS_KM are candidates (0 = the SmartBuy
+# radius); they are pruned to the BASKET_OFFERS_PER_ITEM best offers per item, and the search
+# returns its best basket so far BASKET_TIME_LIMIT_MS after the candidates were collected.
+# Prices below BASKET_MIN_PRICE (0, placeholders like 0.01) or missing are treated as
+# unknown and never bought.
+BASKET_ENABLED = _env_bool("VENDEE_BASKET_ENABLED", True)
+BASKET_STOP_PENALTY = _env_float("VENDEE_BASKET_STOP_PENALTY", 20.0)
+BASKET_KM_PENALTY = _env_float("VENDEE_BASKET_KM_PENALTY", 5.0)
+BASKET_RADIUS_KM = _env_float("VENDEE_BASKET_RADIUS_KM", 10.0)
+BASKET_OFFERS_PER_ITEM = int(_env_float("VENDEE_BASKET_OFFERS_PER_ITEM", 8))
+BASKET_TIME_LIMIT_MS = _env_float("VENDEE_BASKET_TIME_LIMIT_MS", 50.0)
+BASKET_MIN_PRICE = _env_float("VENDEE_BASKET_MIN_PRICE", 1.0)
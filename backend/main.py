@@ -1,10 +1,25 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
+import asyncio
+import logging
 import os
+from typing import Optional
 
 from api.routes_vendor import router as vendor_router
 from api.routes_customer import router as customer_router
+import config
+from services.metrics import metrics
+from services import yolo_detector
+from services.upload_archiver import get_upload_archiver
+from services.uploads import UploadLimitMiddleware
+from services.request_parser import get_request_parser
+from services.watson_client import get_watson_client
+
+logger = logging.getLogger(__name__)
+
+# Background model load started at startup; awaited (or cancelled) on shutdown
+_model_load: Optional[asyncio.Future] = None
 
 # Create FastAPI app
 app = FastAPI(
@@ -22,10 +37,67 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Cap multipart upload bodies while they stream in, before the form is parsed
+app.add_middleware(UploadLimitMiddleware)
+
 # Include routers
 app.include_router(vendor_router)
 app.include_router(customer_router)
 
+@app.on_event("startup")
+async def load_detector_model():
+    """Load and warm up the cart image model in the background so the first upload does not pay for it"""
+    global _model_load
+    if config.DETECTOR_EAGER_LOAD:
+        loop = asyncio.get_running_loop()
+        _model_load = loop.run_in_executor(None, yolo_detector.load_model)
+        _model_load.add_done_callback(_log_model_load_failure)
+
+def _log_model_load_failure(future: asyncio.Future):
+    # model_status() already carries the error for /health; this makes it visible in the logs
+    if not future.cancelled() and future.exception() is not None:
+        logger.error("Cart image model failed to load at startup", exc_info=future.exception())
+
+@app.on_event("startup")
+async def load_catalog():
+    """Compile the product catalog and its aliases once, before the first SmartBuy request"""
+    get_request_parser()
+
+@app.on_event("startup")
+async def start_upload_archiver():
+    """Start the background writer (and its retention cleanup) for uploaded cart photos"""
+    get_upload_archiver().start()
+
+@app.on_event("shutdown")
+async def stop_detector_model_load():
+    """Wait briefly for a startup model load still in progress, then stop waiting on it"""
+    if _model_load is None or _model_load.done():
+        return
+    try:
+        await asyncio.wait_for(asyncio.shield(_model_load), config.DETECTOR_SHUTDOWN_WAIT_S)
+    except asyncio.TimeoutError:
+        # Cancels the load if it has not started; a load already running finishes in its thread
+        _model_load.cancel()
+    except Exception:
+        pass  # Already logged by _log_model_load_failure
+
+@app.on_event("shutdown")
+async def flush_upload_archiver():
+    """Write queued cart photos before the process exits"""
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(None, get_upload_archiver().flush, config.UPLOAD_SHUTDOWN_FLUSH_S)
+
+@app.on_event("shutdown")
+async def flush_detection_cache():
+    """Write pending cart image detections to the persisted cache file"""
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(None, yolo_detector.flush_detection_cache)
+
+@app.on_event("shutdown")
+async def close_watson_client():
+    """Close the pooled Watson Orchestrate connections"""
+    await get_watson_client().aclose()
+
 # Health check endpoint
 @app.get("/")
 async def root():
@@ -42,16 +114,24 @@ async def root():
 
 @app.get("/health")
 async def health_check():
+    model = yolo_detector.model_status()
     return {
         "status": "healthy",
+        "ready": model["ready"],
+        "model": model,
         "timestamp": "2024-01-20T10:00:00Z"
     }
 
+@app.get("/metrics")
+async def get_metrics():
+    """Process-wide performance metrics"""
+    return metrics.snapshot()
+
 # Create uploads directory if it doesn't exist
-os.makedirs("uploads", exist_ok=True)
+os.makedirs(config.UPLOADS_DIR, exist_ok=True)
 
 # Mount static files for uploads
-app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
+app.mount("/uploads", StaticFiles(directory=config.UPLOADS_DIR), name="uploads")
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,309 @@
+import heapq
+import math
+import time
+from typing import List, Dict, Any, Iterable, Tuple, Hashable
+
+import config
+from services.metrics import metrics
+
+# A candidate vendor: (key, distance in km, canonical item name -> price)
+Candidate = Tuple[Hashable, float, Dict[str, float]]
+
+# Cost improvements smaller than this are treated as ties
+_EPSILON = 1e-9
+
+# Candidates scanned between two deadline checks while pruning
+_DEADLINE_CHECK_EVERY = 16
+
+# Share of the time limit pruning may use, so the cover and local search always get the rest
+_PRUNE_SHARE = 0.6
+
+
+class BasketOptimizer:
+    """
+    Splits a basket across vendors: picks the vendors that together stock every
+    requested item (that anyone stocks) while minimising the price of the items plus,
+    per vendor visited, stop_penalty + km_penalty * its distance from the customer.
+
+    Weighted greedy set cover: the candidates are pruned to the offers_per_item best
+    offers for each item plus the best whole-basket vendors, then the vendor with the
+    lowest cost per newly covered item is taken until everything is covered. Local
+    search follows (reassign items to the cheapest chosen vendor, add a vendor when it
+    pays for its stop, drop vendors that no longer do). Both phases stop at the time
+    limit (pruning stops at _PRUNE_SHARE of it, skipping the farthest candidates);
+    items left uncovered then go to their cheapest single offer. Offers without
+    a usable price (missing, non-numeric or below min_price) are ignored.
+    """
+
+    def __init__(self, stop_penalty: float = None, km_penalty: float = None,
+                 offers_per_item: int = None, time_limit_ms: float = None, min_price: float = None):
+        self.stop_penalty = config.BASKET_STOP_PENALTY if stop_penalty is None else stop_penalty
+        self.km_penalty = config.BASKET_KM_PENALTY if km_penalty is None else km_penalty
+        self.offers_per_item = offers_per_item or config.BASKET_OFFERS_PER_ITEM
+        self.time_limit_ms = config.BASKET_TIME_LIMIT_MS if time_limit_ms is None else time_limit_ms
+        self.min_price = config.BASKET_MIN_PRICE if min_price is None else min_price
+        self._elapsed_ms = metrics.histogram("basket_optimizer_ms")
+        self._timeouts = metrics.counter("basket_optimizer_timeouts_total")
+
+    def stop_cost(self, distance_km: float) -> float:
+        """Penalty for visiting one vendor at this distance"""
+        return self.stop_penalty + self.km_penalty * distance_km
+
+    def optimize(self, item_names: Iterable[str], candidates: Iterable[Candidate]) -> Dict[str, Any]:
+        """
+        Cheapest set of vendors covering the requested canonical item names
+        Returns: stops (key, distance_km, items, item_cost, stop_cost; nearest first),
+        assignment (item -> key), item_cost, stop_cost, total_cost, missing_items,
+        candidates (vendors left after pruning), timed_out, elapsed_ms
+        """
+        started_at = time.perf_counter()
+        deadline = started_at + self.time_limit_ms / 1000
+        items = list(dict.fromkeys(item_names))
+
+        pruned, scanned_all = self._prune(items, candidates, started_at + _PRUNE_SHARE * (deadline - started_at))
+        stocked = {name for _, _, prices in pruned.values() for name in prices}
+        coverable = [name for name in items if name in stocked]
+        missing_items = [name for name in items if name not in stocked]
+
+        # assignment: item -> key of the vendor it is bought from
+        assignment = self._greedy_cover(coverable, pruned, deadline)
+        timed_out = not scanned_all or len(assignment) < len(coverable)
+        if len(assignment) < len(coverable):
+            self._complete(assignment, coverable, pruned, deadline)
+        elif not self._improve(assignment, pruned, deadline):
+            timed_out = True
+
+        result = self._result(items, assignment, pruned, missing_items)
+        result["timed_out"] = timed_out
+        result["elapsed_ms"] = round((time.perf_counter() - started_at) * 1000, 3)
+        self._elapsed_ms.observe(result["elapsed_ms"])
+        if timed_out:
+            self._timeouts.inc()
+        return result
+
+    def _prune(self, items: List[str], candidates: Iterable[Candidate],
+               deadline: float = math.inf) -> Tuple[Dict[Hashable, Tuple[float, float, Dict[str, float]]], bool]:
+        """
+        Keep, per item, the offers_per_item vendors where buying it alone is cheapest,
+        and the offers_per_item vendors with the lowest cost per item over the whole basket.
+        Candidates come nearest first; past the deadline the remaining ones are skipped.
+        Offers without a usable price (see _usable_prices) do not count as stocked.
+        Returns: (key -> (distance_km, stop cost, usable prices of the requested items it stocks),
+        whether every candidate was considered)
+        """
+        per_item: Dict[str, List] = {name: [] for name in items}
+        per_basket: List = []
+        # Only candidates that entered a list are remembered, which keeps allocations
+        # (and garbage collection pauses) down on large candidate sets
+        entered = {}
+        complete = True
+        for order, (key, distance_km, prices) in enumerate(candidates):
+            if not order % _DEADLINE_CHECK_EVERY and order and time.perf_counter() >= deadline:
+                complete = False
+                break
+            stocked = self._usable_prices(items, prices)
+            if not stocked:
+                continue
+            stop = self.stop_cost(distance_km)
+            pushed = False
+            for name, price in stocked.items():
+                pushed |= self._push(per_item[name], (-(price + stop), -order, key))
+            pushed |= self._push(per_basket, (-(stop + sum(stocked.values())) / len(stocked), -order, key))
+            if pushed:
+                entered[key] = (distance_km, stop, stocked)
+        kept = {entry[2] for heap in per_item.values() for entry in heap}
+        kept.update(entry[2] for entry in per_basket)
+        offers = {key: offer for key, offer in entered.items() if key in kept}
+        return offers, complete
+
+    def _usable_prices(self, items: List[str], prices: Dict[str, Any]) -> Dict[str, float]:
+        """
+        Prices of the requested items that are real: finite numbers of at least min_price
+        (missing, 0 or placeholder prices like 0.01 mean unknown)
+        """
+        min_price = max(self.min_price, _EPSILON)
+        usable = {}
+        for name in items:
+            price = prices.get(name)
+            if isinstance(price, (int, float)) and not isinstance(price, bool) and min_price <= price < math.inf:
+                usable[name] = price
+        return usable
+
+    def _push(self, heap: List, entry: Tuple) -> bool:
+        """
+        Bounded max-heap on cost (entries hold negated costs; earlier candidates win ties)
+        Returns: True if the entry was kept
+        """
+        if len(heap) < self.offers_per_item:
+            heapq.heappush(heap, entry)
+        elif entry > heap[0]:
+            heapq.heapreplace(heap, entry)
+        else:
+            return False
+        return True
+
+    def _greedy_cover(self, items: List[str], offers: Dict, deadline: float) -> Dict[str, Hashable]:
+        """Take the vendor with the lowest (stop + item prices) per newly covered item until all are covered"""
+        uncovered = set(items)
+        active = dict(offers)
+        assignment = {}
+        while uncovered and time.perf_counter() < deadline:
+            best_key, best_ratio = None, None
+            for key, (_, stop, prices) in list(active.items()):
+                covered = [name for name in prices if name in uncovered]
+                if not covered:
+                    # Prune vendors with nothing left to contribute
+                    del active[key]
+                    continue
+                ratio = (stop + sum(prices[name] for name in covered)) / len(covered)
+                if best_ratio is None or ratio < best_ratio - _EPSILON:
+                    best_key, best_ratio = key, ratio
+            if best_key is None:
+                break
+            for name in active.pop(best_key)[2]:
+                if name in uncovered:
+                    assignment[name] = best_key
+                    uncovered.discard(name)
+        return assignment
+
+    def _complete(self, assignment: Dict[str, Hashable], items: List[str], offers: Dict, deadline: float):
+        """
+        Buy each still uncovered item at its cheapest single offer (when out of time).
+        Past the deadline, a vendor already chosen that stocks the item is preferred
+        over paying for another stop.
+        """
+        chosen = set(assignment.values())
+        for name in items:
+            if name in assignment:
+                continue
+            options = [key for key, (_, _, prices) in offers.items() if name in prices]
+            if time.perf_counter() >= deadline:
+                options = [key for key in options if key in chosen] or options
+            assignment[name] = min(
+                options,
+                key=lambda key: offers[key][2][name] + (0 if key in chosen else offers[key][1]),
+            )
+            chosen.add(assignment[name])
+
+    def _improve(self, assignment: Dict[str, Hashable], offers: Dict, deadline: float) -> bool:
+        """
+        Local search on a complete assignment, in place
+        Returns: False when the time limit cut it short
+        """
+        improved = True
+        while improved:
+            if time.perf_counter() >= deadline:
+                return False
+            self._reassign(assignment, offers)
+            improved = self._drop_stops(assignment, offers)
+            chosen = set(assignment.values())
+            for key, (_, stop, prices) in offers.items():
+                if time.perf_counter() >= deadline:
+                    return False
+                if key not in chosen and self._add_stop(assignment, offers, key, stop, prices):
+                    improved = True
+                    break
+        return True
+
+    def _reassign(self, assignment: Dict[str, Hashable], offers: Dict):
+        """Buy every item from the chosen vendor selling it cheapest"""
+        chosen = set(assignment.values())
+        for name, key in assignment.items():
+            for other in chosen:
+                price = offers[other][2].get(name)
+                if price is not None and price < offers[key][2][name] - _EPSILON:
+                    key = other
+            assignment[name] = key
+
+    def _drop_stops(self, assignment: Dict[str, Hashable], offers: Dict) -> bool:
+        """Remove chosen vendors whose items are cheaper, stop included, at other chosen vendors"""
+        dropped = False
+        # Most expensive stops first
+        for key in sorted(set(assignment.values()), key=lambda key: -offers[key][1]):
+            others = set(assignment.values()) - {key}
+            if not others:
+                break
+            moves = {}
+            delta = -offers[key][1]
+            for name in [name for name, owner in assignment.items() if owner == key]:
+                options = [(offers[other][2][name], other) for other in others if name in offers[other][2]]
+                if not options:
+                    break
+                price, other = min(options, key=lambda option: option[0])
+                moves[name] = other
+                delta += price - offers[key][2][name]
+            else:
+                if delta < -_EPSILON:
+                    assignment.update(moves)
+                    dropped = True
+        return dropped
+
+    def _add_stop(self, assignment: Dict[str, Hashable], offers: Dict, key: Hashable,
+                  stop: float, prices: Dict[str, float]) -> bool:
+        """
+        Add a vendor when what it saves pays for its stop: its cheaper items, all the
+        items of a chosen vendor it can replace entirely (saving that stop too), or its
+        cheaper items together with the chosen vendors that become droppable
+        Returns: True if the vendor was added
+        """
+        by_owner: Dict[Hashable, List[str]] = {}
+        for name, owner in assignment.items():
+            by_owner.setdefault(owner, []).append(name)
+        delta = stop
+        moved = []
+        for owner, names in by_owner.items():
+            owner_prices = offers[owner][2]
+            cheaper = [name for name in names if name in prices and prices[name] < owner_prices[name] - _EPSILON]
+            partial = sum(owner_prices[name] - prices[name] for name in cheaper)
+            if all(name in prices for name in names):
+                full = offers[owner][1] + sum(owner_prices[name] - prices[name] for name in names)
+                if full > partial:
+                    delta -= full
+                    moved.extend(names)
+                    continue
+            delta -= partial
+            moved.extend(cheaper)
+        if delta < -_EPSILON:
+            for name in moved:
+                assignment[name] = key
+            return True
+
+        trial = dict(assignment)
+        for name, owner in assignment.items():
+            if name in prices and prices[name] < offers[owner][2][name] - _EPSILON:
+                trial[name] = key
+        if key not in trial.values() or not self._drop_stops(trial, offers):
+            return False
+        if self._cost(trial, offers) >= self._cost(assignment, offers) - _EPSILON:
+            return False
+        assignment.update(trial)
+        return True
+
+    def _cost(self, assignment: Dict[str, Hashable], offers: Dict) -> float:
+        """Item prices plus one stop per vendor used"""
+        return (sum(offers[key][2][name] for name, key in assignment.items())
+                + sum(offers[key][1] for key in set(assignment.values())))
+
+    def _result(self, items: List[str], assignment: Dict[str, Hashable], offers: Dict,
+                missing_items: List[str]) -> Dict[str, Any]:
+        stops = {}
+        for name in items:
+            key = assignment.get(name)
+            if key is None:
+                continue
+            distance_km, stop, prices = offers[key]
+            if key not in stops:
+                stops[key] = {"key": key, "distance_km": distance_km, "items": [], "item_cost": 0, "stop_cost": stop}
+            stops[key]["items"].append(name)
+            stops[key]["item_cost"] += prices[name]
+        item_cost = sum(stop["item_cost"] for stop in stops.values())
+        stop_cost = sum(stop["stop_cost"] for stop in stops.values())
+        return {
+            "stops": sorted(stops.values(), key=lambda stop: stop["distance_km"]),
+            "assignment": {name: assignment[name] for name in items if name in assignment},
+            "item_cost": round(item_cost, 2),
+            "stop_cost": round(stop_cost, 2),
+            "total_cost": round(item_cost + stop_cost, 2),
+            "missing_items": missing_items,
+            "candidates": len(offers),
+        }
@@ -0,0 +1,129 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, List, Optional, Tuple
+
+from services.metrics import metrics
+
+_MISSING = object()
+
+
+class LRUCache:
+    """
+    Thread-safe LRU cache with size and optional TTL eviction.
+    Expired entries are dropped lazily when read and when the cache is full.
+    When a name is given, hits, misses, evictions, size and hit rate are
+    exported to the metrics registry as <name>_*.
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        ttl_s: Optional[float] = None,
+        name: str = None,
+        on_evict: Callable[[Hashable, Any], None] = None,
+    ):
+        self.max_entries = max(1, int(max_entries))
+        self.ttl_s = ttl_s if ttl_s and ttl_s > 0 else None
+        self.on_evict = on_evict
+        self._entries: "OrderedDict[Hashable, Tuple[Any, Optional[float]]]" = OrderedDict()
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self._name = name
+        if name:
+            self._hits = metrics.counter(f"{name}_hits_total")
+            self._misses = metrics.counter(f"{name}_misses_total")
+            self._evictions = metrics.counter(f"{name}_evictions_total")
+            self._size = metrics.gauge(f"{name}_size")
+            self._hit_rate = metrics.gauge(f"{name}_hit_rate")
+
+    def _evict(self, key: Hashable):
+        value, _ = self._entries.pop(key)
+        if self._name:
+            self._evictions.inc()
+        if self.on_evict is not None:
+            self.on_evict(key, value)
+
+    def _record(self, hit: bool):
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+        if self._name:
+            (self._hits if hit else self._misses).inc()
+            self._hit_rate.set(round(self.hit_rate, 4))
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def get(self, key: Hashable, default: Any = None, record: bool = True) -> Any:
+        """Return the cached value (marking it most recently used) or default"""
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is not _MISSING and entry[1] is not None and entry[1] <= time.time():
+                self._evict(key)
+                entry = _MISSING
+            if entry is _MISSING:
+                if record:
+                    self._record(False)
+                return default
+            self._entries.move_to_end(key)
+            if record:
+                self._record(True)
+            return entry[0]
+
+    def peek(self, key: Hashable, default: Any = None) -> Any:
+        """Return a live cached value without updating recency or hit statistics"""
+        with self._lock:
+            value, expires_at = self._entries.get(key, (default, None))
+            return default if expires_at is not None and expires_at <= time.time() else value
+
+    def put(self, key: Hashable, value: Any, ttl_s: Optional[float] = None):
+        """Insert or replace a value; ttl_s overrides the cache-wide TTL"""
+        ttl_s = self.ttl_s if ttl_s is None else ttl_s
+        expires_at = time.time() + ttl_s if ttl_s else None
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.max_entries:
+                self.purge_expired()
+            while len(self._entries) > self.max_entries:
+                self._evict(next(iter(self._entries)))
+            if self._name:
+                self._size.set(len(self._entries))
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.pop(key, _MISSING)
+            if self._name:
+                self._size.set(len(self._entries))
+            return default if entry is _MISSING else entry[0]
+
+    def purge_expired(self):
+        with self._lock:
+            now = time.time()
+            for key in [key for key, (_, expires_at) in self._entries.items() if expires_at is not None and expires_at <= now]:
+                self._evict(key)
+            if self._name:
+                self._size.set(len(self._entries))
+
+    def items(self) -> List[Tuple[Hashable, Any, Optional[float]]]:
+        """Live entries as (key, value, expires_at), least recently used first"""
+        with self._lock:
+            self.purge_expired()
+            return [(key, value, expires_at) for key, (value, expires_at) in self._entries.items()]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            if self._name:
+                self._size.set(0)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.peek(key, _MISSING) is not _MISSING
@@ -0,0 +1,141 @@
+import json
+import os
+import threading
+from typing import List, Dict, Any, Optional, Set
+
+import config
+from services.fuzzy_matcher import FuzzyMatcher
+
+# How quantities are presented, matching the historic parser output ("2 bunches");
+# an amount of one reads in the singular ("1 bunch")
+_QUANTITY_FORMATS = {
+    "kg": ("{qty} kg", "{qty} kg"),
+    "g": ("{qty} g", "{qty} g"),
+    "piece": ("{qty} piece", "{qty} pieces"),
+    "bunch": ("{qty} bunch", "{qty} bunches"),
+    "dozen": ("{qty} dozen", "{qty} dozen"),
+    "pack": ("{qty} pack", "{qty} packs"),
+}
+DEFAULT_UNIT = "kg"
+
+
+def normalize_item_name(name: str) -> str:
+    """Canonical form used for item lookups: lowercase, single spaces, no underscores"""
+    return " ".join(str(name).lower().replace("_", " ").split())
+
+
+def plural_forms(name: str) -> Set[str]:
+    """Surface forms of an item name: the name itself plus regular plurals of its last word"""
+    words = name.split()
+    last = words[-1]
+    forms = {last, last + "s", last + "es"}
+    if last.endswith("y") and len(last) > 1 and last[-2] not in "aeiou":
+        forms.add(last[:-1] + "ies")
+    if last.endswith("s"):
+        # Catalog names already in plural ("grapes") also match the singular
+        forms.add(last[:-1])
+        if last.endswith("es"):
+            forms.add(last[:-2])
+    return {" ".join(words[:-1] + [form]) for form in forms if form}
+
+
+def format_quantity(amount: float, unit: str) -> str:
+    """Display form of an amount in a unit, e.g. 2 bunches or 1 bunch"""
+    qty = str(int(amount)) if float(amount).is_integer() else f"{amount:g}"
+    singular, plural = _QUANTITY_FORMATS.get(unit, ("{qty} " + unit, "{qty} " + unit))
+    return (singular if amount == 1 else plural).format(qty=qty)
+
+
+class Catalog:
+    """
+    Product vocabulary shared by the request parsers and the item index: canonical
+    items (id, name, category, default unit, aliases such as Hindi/Hinglish names),
+    unit surface forms and intent keywords, read from data/catalog.json.
+    Every name, alias and their plurals resolve to the item's canonical name; a
+    symmetric-delete index over those forms also resolves misspellings.
+    """
+
+    def __init__(self, data: Dict[str, Any]):
+        self.data = data
+        self.items: List[Dict[str, Any]] = []
+        self.items_by_id: Dict[str, Dict[str, Any]] = {}
+        self.items_by_name: Dict[str, Dict[str, Any]] = {}
+        self.units: Dict[str, List[str]] = data.get("units", {})
+        self.intents: Dict[str, List[str]] = data.get("intents", {})
+        self._canonical: Dict[str, str] = {}
+        for raw in data.get("items", []):
+            name = normalize_item_name(raw["name"])
+            item = {
+                "id": raw.get("id") or name.replace(" ", "_"),
+                "name": name,
+                "category": raw.get("category"),
+                "unit": raw.get("unit", DEFAULT_UNIT),
+                "aliases": [normalize_item_name(alias) for alias in raw.get("aliases", [])],
+            }
+            # What a request without a quantity ("need kela") asks for
+            item["default_quantity"] = format_quantity(raw.get("default_amount", 1), item["unit"])
+            self.items.append(item)
+            self.items_by_id[item["id"]] = item
+            self.items_by_name[name] = item
+        # Exact names first, so an alias never shadows another item's own name
+        for item in self.items:
+            self._canonical[item["name"]] = item["name"]
+        for item in self.items:
+            for form in self.surface_forms(item):
+                self._canonical.setdefault(form, item["name"])
+        self.fuzzy = FuzzyMatcher(self._canonical)
+
+    def surface_forms(self, item: Dict[str, Any]) -> Set[str]:
+        """All spellings of an item: name, aliases and their plurals"""
+        forms: Set[str] = set()
+        for phrase in [item["name"]] + item["aliases"]:
+            forms |= plural_forms(phrase)
+        return forms
+
+    def lookup(self, name: str) -> Optional[Dict[str, Any]]:
+        """The catalog item a name or alias refers to, if any"""
+        canonical = self._canonical.get(normalize_item_name(name))
+        return self.items_by_name.get(canonical) if canonical else None
+
+    def match_name(self, name: str) -> Optional[str]:
+        """
+        Canonical name of the item a name, alias or misspelling ("bananna") refers to
+        Returns: None when nothing in the catalog is close enough
+        """
+        normalized = normalize_item_name(name)
+        canonical = self._canonical.get(normalized)
+        if canonical is None and config.FUZZY_MATCH_ENABLED:
+            form = self.fuzzy.best(normalized)
+            canonical = self._canonical[form] if form else None
+        return canonical
+
+    def canonical_name(self, name: str) -> str:
+        """The catalog name for a known name or alias, otherwise the normalized name"""
+        normalized = normalize_item_name(name)
+        return self._canonical.get(normalized, normalized)
+
+
+def load_catalog(path: str = None) -> Dict[str, Any]:
+    """Read the product catalog (items, units and intent keywords) from the data directory"""
+    path = path or os.path.join(config.DATA_DIR, "catalog.json")
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+_catalog: Optional[Catalog] = None
+_catalog_lock = threading.Lock()
+
+
+def get_catalog() -> Catalog:
+    """Return the shared catalog, read from disk on first use"""
+    global _catalog
+    if _catalog is None:
+        with _catalog_lock:
+            if _catalog is None:
+                _catalog = Catalog(load_catalog())
+    return _catalog
+
+
+def canonical_item_name(name: str) -> str:
+    """Shorthand for get_catalog().canonical_name()"""
+    return get_catalog().canonical_name(name)
@@ -0,0 +1,385 @@
+import json
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import List, Dict, Any, Optional, Tuple, Set, Iterable
+
+import config
+from services.geo_index import GeoGridIndex
+from services.item_index import ItemIndex
+from services.inventory_rollup import InventoryRollup
+
+
+class _JSONCollection:
+    """
+    A JSON list file cached in memory.
+    Reloads itself when the file's mtime/size on disk no longer match the cached copy.
+    """
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        self.records: List[Dict] = []
+        self._signature: Optional[Tuple[int, int]] = None
+        self._loaded = False
+
+    def _stat_signature(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(self.file_path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def is_stale(self) -> bool:
+        """True if the file on disk changed since it was last loaded or written"""
+        return not self._loaded or self._stat_signature() != self._signature
+
+    def load(self):
+        """Load the file from disk, replacing the cached records"""
+        try:
+            with open(self.file_path, 'r', encoding='utf-8') as f:
+                self.records = json.load(f)
+        except FileNotFoundError:
+            self.records = []
+        self._signature = self._stat_signature()
+        self._loaded = True
+
+    def save(self):
+        """Write the cached records back to disk atomically"""
+        os.makedirs(os.path.dirname(self.file_path) or ".", exist_ok=True)
+        tmp_path = f"{self.file_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.records, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, self.file_path)
+        self._signature = self._stat_signature()
+
+
+class BaseDataStore(ABC):
+    """
+    Process-wide repository for vendor, inventory, request and unmet demand data.
+    Keeps vendors and inventories in memory indexed by vendor_id and refreshes
+    them when the underlying storage is changed by another process.
+    Subclasses provide the persistence (JSON files or SQLite).
+
+    Returned records are shared with the store; mutate them only through the
+    write methods so storage and indexes stay in sync.
+    """
+
+    def __init__(self, refresh_interval: float = None):
+        self.refresh_interval = config.STORE_REFRESH_INTERVAL_S if refresh_interval is None else refresh_interval
+        self._vendors: List[Dict] = []
+        self._inventories: List[Dict] = []
+        self._vendors_by_id: Dict[str, Dict] = {}
+        self._inventories_by_id: Dict[str, Dict] = {}
+        self.geo_index = GeoGridIndex(config.GEO_INDEX_CELL_KM)
+        self.item_index = ItemIndex()
+        self._rollups: Dict[str, InventoryRollup] = {}
+        self._last_check = 0.0
+        self._lock = threading.RLock()
+
+    # ------------------------------------------------------------------
+    # Persistence hooks
+    # ------------------------------------------------------------------
+
+    @abstractmethod
+    def _sync_from_storage(self):
+        """Reload vendors/inventories if the storage changed since the last sync"""
+
+    @contextmanager
+    def _write_transaction(self):
+        """Scope of a single atomic write"""
+        yield
+
+    @abstractmethod
+    def _invalidate(self):
+        """Drop the in-memory copy so the next read reloads it from storage"""
+
+    @abstractmethod
+    def _persist_vendor(self, vendor: Dict):
+        """Write a vendor that was just added or updated in memory"""
+
+    @abstractmethod
+    def _persist_inventory(self, inventory: Dict):
+        """Write an inventory that was just added or updated in memory"""
+
+    @abstractmethod
+    def add_request(self, request_data: Dict[str, Any]) -> Dict:
+        """Store a customer request and return it"""
+
+    @abstractmethod
+    def get_unmet_demand(self) -> List[Dict]:
+        """Current unmet demand records"""
+
+    @abstractmethod
+    def save_unmet_demand(self, unmet_demand: List[Dict]):
+        """Replace the unmet demand records"""
+
+    # ------------------------------------------------------------------
+    # Loading / refresh
+    # ------------------------------------------------------------------
+
+    def _set_vendors(self, vendors: List[Dict]):
+        self._vendors = vendors
+        self._vendors_by_id = {v["vendor_id"]: v for v in vendors}
+        self.geo_index.rebuild(
+            (v["vendor_id"], v["location"]["latitude"], v["location"]["longitude"])
+            for v in vendors if v.get("location")
+        )
+
+    def _index_vendor_location(self, vendor: Dict):
+        location = vendor.get("location")
+        if location:
+            self.geo_index.upsert(vendor["vendor_id"], location["latitude"], location["longitude"])
+        else:
+            self.geo_index.remove(vendor["vendor_id"])
+
+    def _set_inventories(self, inventories: List[Dict]):
+        self._inventories = inventories
+        self._inventories_by_id = {inv["vendor_id"]: inv for inv in inventories}
+        self.item_index.rebuild(inventories)
+        self._rollups = {inv["vendor_id"]: InventoryRollup(inv.get("items", [])) for inv in inventories}
+
+    def _refresh_if_changed(self, force: bool = False):
+        now = time.monotonic()
+        if not force and now - self._last_check < self.refresh_interval:
+            return
+        self._last_check = now
+        self._sync_from_storage()
+
+    def _persist(self, persist_fn, record: Dict):
+        try:
+            persist_fn(record)
+        except Exception:
+            # Memory is ahead of storage now; resync on the next read
+            self._invalidate()
+            self._last_check = 0.0
+            raise
+
+    def refresh(self):
+        """Force a check of the storage, bypassing the refresh interval"""
+        with self._lock:
+            self._refresh_if_changed(force=True)
+
+    # ------------------------------------------------------------------
+    # Vendors
+    # ------------------------------------------------------------------
+
+    def get_vendors(self) -> List[Dict]:
+        """All vendors, in insertion order"""
+        with self._lock:
+            self._refresh_if_changed()
+            return self._vendors
+
+    def get_vendor(self, vendor_id: str) -> Optional[Dict]:
+        with self._lock:
+            self._refresh_if_changed()
+            return self._vendors_by_id.get(vendor_id)
+
+    def add_vendor(self, vendor_data: Dict[str, Any]) -> Dict:
+        """
+        Add a new vendor. A vendor_id is generated when not supplied.
+        Returns: the stored vendor record
+        """
+        with self._lock, self._write_transaction():
+            self._refresh_if_changed(force=True)
+            vendor_id = vendor_data.get("vendor_id") or f"V{str(len(self._vendors) + 1).zfill(3)}"
+            vendor = {"vendor_id": vendor_id, **vendor_data}
+            vendor["vendor_id"] = vendor_id
+            self._vendors.append(vendor)
+            self._vendors_by_id[vendor_id] = vendor
+            self._persist(self._persist_vendor, vendor)
+            self._index_vendor_location(vendor)
+            return vendor
+
+    def update_vendor(self, vendor_id: str, updates: Dict[str, Any]) -> Optional[Dict]:
+        """
+        Apply field updates to a vendor.
+        Returns: the updated vendor record, or None if the vendor does not exist
+        """
+        with self._lock, self._write_transaction():
+            self._refresh_if_changed(force=True)
+            vendor = self._vendors_by_id.get(vendor_id)
+            if vendor is None:
+                return None
+            vendor.update(updates)
+            self._persist(self._persist_vendor, vendor)
+            if "location" in updates:
+                self._index_vendor_location(vendor)
+            return vendor
+
+    def add_vendor_rating(self, vendor_id: str, rating: float) -> Optional[Dict]:
+        """
+        Fold one customer rating into a vendor's average, as a single atomic write.
+        Returns: the updated vendor record, or None if the vendor does not exist
+        """
+        with self._lock, self._write_transaction():
+            self._refresh_if_changed(force=True)
+            vendor = self._vendors_by_id.get(vendor_id)
+            if vendor is None:
+                return None
+            current_count = vendor.get("total_ratings", 0)
+            new_count = current_count + 1
+            new_rating = ((vendor.get("rating", 0) * current_count) + rating) / new_count
+            vendor.update({"rating": round(new_rating, 1), "total_ratings": new_count})
+            self._persist(self._persist_vendor, vendor)
+            return vendor
+
+    def find_vendors_within(self, latitude: float, longitude: float, radius_km: float,
+                            distance_mode: str = None, limit: int = None,
+                            vendor_ids: Iterable[str] = None) -> List[Tuple[Dict, float]]:
+        """
+        Vendors within radius_km of a point, found through the spatial index.
+        distance_mode is "exact" (geodesic) or "fast" (vectorized haversine),
+        defaulting to config.DISTANCE_MODE. When vendor_ids is given only those
+        vendors are considered.
+        Returns: (vendor, distance in km) pairs sorted by distance
+        """
+        mode = distance_mode or config.DISTANCE_MODE
+        with self._lock:
+            self._refresh_if_changed()
+            if vendor_ids is None:
+                matches = self.geo_index.query_radius(latitude, longitude, radius_km, mode=mode, limit=limit)
+            else:
+                matches = self.geo_index.query_keys(latitude, longitude, vendor_ids, radius_km, mode=mode, limit=limit)
+            return [(self._vendors_by_id[vendor_id], distance)
+                    for vendor_id, distance in matches if vendor_id in self._vendors_by_id]
+
+    # ------------------------------------------------------------------
+    # Inventories
+    # ------------------------------------------------------------------
+
+    def get_inventories(self) -> List[Dict]:
+        with self._lock:
+            self._refresh_if_changed()
+            return self._inventories
+
+    def get_inventory(self, vendor_id: str) -> Optional[Dict]:
+        with self._lock:
+            self._refresh_if_changed()
+            return self._inventories_by_id.get(vendor_id)
+
+    def upsert_inventory(self, vendor_id: str, inventory_data: Dict[str, Any]) -> Dict:
+        """
+        Create or update the inventory of a vendor.
+        Returns: the stored inventory record
+        """
+        with self._lock, self._write_transaction():
+            self._refresh_if_changed(force=True)
+            inventory = self._inventories_by_id.get(vendor_id)
+            if inventory is None:
+                inventory = {"vendor_id": vendor_id, **inventory_data}
+                self._inventories.append(inventory)
+                self._inventories_by_id[vendor_id] = inventory
+            else:
+                inventory.update(inventory_data)
+            # Derived totals are recomputed on every write so they never go stale
+            rollup = InventoryRollup(inventory.get("items", []))
+            inventory["total_items"] = rollup.item_count
+            inventory["estimated_value"] = rollup.total_value
+            self._persist(self._persist_inventory, inventory)
+            self.item_index.set_vendor_items(vendor_id, (item.get("name", "") for item in inventory.get("items", [])))
+            self._rollups[vendor_id] = rollup
+            return inventory
+
+    def get_inventory_rollup(self, vendor_id: str) -> Optional[InventoryRollup]:
+        """Price/availability summary of a vendor's inventory, kept in step with its writes"""
+        with self._lock:
+            self._refresh_if_changed()
+            return self._rollups.get(vendor_id)
+
+    def find_vendors_with_items(self, item_names: Iterable[str]) -> Set[str]:
+        """Vendor ids stocking at least one of the named items, from the item index"""
+        with self._lock:
+            self._refresh_if_changed()
+            vendor_ids: Set[str] = set()
+            for name in item_names:
+                vendor_ids |= self.item_index.vendors_with_item(name)
+            return vendor_ids
+
+    def search_items(self, query: str) -> Dict[str, Set[str]]:
+        """
+        Substring search over stocked item names, from the item index.
+        Returns: normalized item name -> vendor ids stocking it
+        """
+        with self._lock:
+            self._refresh_if_changed()
+            return self.item_index.search(query)
+
+
+class JSONDataStore(BaseDataStore):
+    """
+    Data store persisted to the JSON files in the data directory.
+    Notices changes to the files on disk through an mtime/size check.
+    """
+
+    def __init__(self, data_dir: str = None, refresh_interval: float = None):
+        super().__init__(refresh_interval)
+        self.data_dir = data_dir or config.DATA_DIR
+        self._vendors_file = _JSONCollection(os.path.join(self.data_dir, "vendors.json"))
+        self._inventories_file = _JSONCollection(os.path.join(self.data_dir, "inventories.json"))
+        self._requests_file = _JSONCollection(os.path.join(self.data_dir, "requests.json"))
+        self._unmet_demand_file = _JSONCollection(os.path.join(self.data_dir, "unmet_demand.json"))
+
+    def _sync_from_storage(self):
+        if self._vendors_file.is_stale():
+            self._vendors_file.load()
+            self._set_vendors(self._vendors_file.records)
+        if self._inventories_file.is_stale():
+            self._inventories_file.load()
+            self._set_inventories(self._inventories_file.records)
+
+    def _invalidate(self):
+        self._vendors_file = _JSONCollection(self._vendors_file.file_path)
+        self._inventories_file = _JSONCollection(self._inventories_file.file_path)
+
+    def _persist_vendor(self, vendor: Dict):
+        # The file's cached records are the in-memory vendor list itself
+        self._vendors_file.save()
+
+    def _persist_inventory(self, inventory: Dict):
+        self._inventories_file.save()
+
+    def add_request(self, request_data: Dict[str, Any]) -> Dict:
+        with self._lock:
+            if self._requests_file.is_stale():
+                self._requests_file.load()
+            self._requests_file.records.append(request_data)
+            self._requests_file.save()
+            return request_data
+
+    def get_unmet_demand(self) -> List[Dict]:
+        with self._lock:
+            if self._unmet_demand_file.is_stale():
+                self._unmet_demand_file.load()
+            return self._unmet_demand_file.records
+
+    def save_unmet_demand(self, unmet_demand: List[Dict]):
+        with self._lock:
+            self._unmet_demand_file.records = unmet_demand
+            self._unmet_demand_file.save()
+
+
+_store: Optional[BaseDataStore] = None
+_store_lock = threading.Lock()
+
+
+def create_data_store(backend: str = None) -> BaseDataStore:
+    """Create a data store for the configured storage backend ("json" or "sqlite")"""
+    backend = (backend or config.STORAGE_BACKEND).lower()
+    if backend == "sqlite":
+        from services.sqlite_store import SQLiteDataStore
+        return SQLiteDataStore(config.SQLITE_PATH)
+    if backend == "json":
+        return JSONDataStore()
+    raise ValueError(f"Unknown storage backend: {backend}. Expected 'json' or 'sqlite'")
+
+
+def get_data_store() -> BaseDataStore:
+    """Return the shared process-wide data store"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = create_data_store()
+    return _store
@@ -0,0 +1,234 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from typing import List, Dict, Optional, Set, Tuple
+
+import numpy as np
+from PIL import Image
+
+import config
+from services.cache import LRUCache
+from services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# The 64-bit dHash is split into bands; two hashes within _BANDS - 1 bits of each
+# other must agree on at least one whole band, so candidates come from band lookups
+_BANDS = 8
+_BAND_BITS = 64 // _BANDS
+_BAND_MASK = (1 << _BAND_BITS) - 1
+
+
+def content_hash(image: Image.Image) -> str:
+    """Hash of the decoded pixels, so re-encoded copies of the same photo match"""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{image.mode}:{image.size[0]}x{image.size[1]}:".encode())
+    digest.update(image.tobytes())
+    return digest.hexdigest()
+
+
+def dhash(image: Image.Image) -> int:
+    """64-bit difference hash: brightness gradients of a 9x8 grayscale thumbnail"""
+    pixels = np.asarray(image.convert("L").resize((9, 8), Image.BILINEAR), dtype=np.int16)
+    bits = (pixels[:, 1:] > pixels[:, :-1]).flatten()
+    return int("".join("1" if bit else "0" for bit in bits), 2)
+
+
+def _bands(key: str, value: int) -> List[Tuple[str, int, int]]:
+    # Bands are scoped to the key's variant, so near-duplicates only match within it
+    variant = key.rpartition(":")[0]
+    return [(variant, band, (value >> (band * _BAND_BITS)) & _BAND_MASK) for band in range(_BANDS)]
+
+
+class DetectionCache:
+    """
+    Cache of classifier results for cart images.
+    Exact lookups use a hash of the decoded pixels; on a miss, and only when perceptual
+    matching is enabled, near-duplicate photos are found through their perceptual hash
+    (Hamming distance <= max_distance).
+    Keys may carry a variant (e.g. the tile layout), which separates both kinds of match.
+    Entries are evicted by LRU size and TTL and optionally persisted to a JSON file:
+    writes mark the cache dirty and a background timer rewrites the file at most once
+    per flush_interval_s (and flush() on shutdown), not on every put.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        max_entries: int = None,
+        ttl_s: float = None,
+        perceptual: bool = None,
+        max_distance: int = None,
+        path: str = None,
+        flush_interval_s: float = None,
+    ):
+        self.namespace = namespace
+        self.perceptual = config.DETECTION_CACHE_PERCEPTUAL if perceptual is None else perceptual
+        self.max_distance = min(_BANDS - 1, config.DETECTION_CACHE_MAX_DISTANCE if max_distance is None else max_distance)
+        self.path = config.DETECTION_CACHE_PATH if path is None else path
+        self.flush_interval_s = config.DETECTION_CACHE_FLUSH_INTERVAL_S if flush_interval_s is None else flush_interval_s
+        self._dirty = False
+        self._flush_timer: Optional[threading.Timer] = None
+        self._cache = LRUCache(
+            max_entries or config.DETECTION_CACHE_MAX_ENTRIES,
+            ttl_s=config.DETECTION_CACHE_TTL_S if ttl_s is None else ttl_s,
+            on_evict=self._on_evict,
+        )
+        self._keys_by_band: Dict[Tuple[str, int, int], Set[str]] = {}
+        self._lock = threading.RLock()
+        self._hits = metrics.counter("detection_cache_hits_total")
+        self._near_hits = metrics.counter("detection_cache_near_hits_total")
+        self._misses = metrics.counter("detection_cache_misses_total")
+        self._evictions = metrics.counter("detection_cache_evictions_total")
+        self._size = metrics.gauge("detection_cache_size")
+        self._hit_rate = metrics.gauge("detection_cache_hit_rate")
+        self._lookups = 0
+        self._hit_count = 0
+        if self.path:
+            self._load()
+
+    def _on_evict(self, key: str, entry: Dict):
+        self._evictions.inc()
+        self._unindex(key, entry["dhash"])
+
+    def _index(self, key: str, value: int):
+        for band in _bands(key, value):
+            self._keys_by_band.setdefault(band, set()).add(key)
+
+    def _unindex(self, key: str, value: int):
+        for band in _bands(key, value):
+            keys = self._keys_by_band.get(band)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_band[band]
+
+    def _nearest_key(self, key: str, value: int) -> Optional[str]:
+        best_key, best_distance = None, self.max_distance + 1
+        candidates = set()
+        for band in _bands(key, value):
+            candidates |= self._keys_by_band.get(band, set())
+        for candidate in candidates:
+            entry = self._cache.peek(candidate)
+            if entry is None:
+                continue
+            distance = bin(entry["dhash"] ^ value).count("1")
+            if distance < best_distance:
+                best_key, best_distance = candidate, distance
+        return best_key
+
+    def keys_for(self, image: Image.Image, variant: str = "") -> Tuple[str, Optional[int]]:
+        """Cache keys for an RGB image: (content hash prefixed by variant, perceptual hash or None)"""
+        key = f"{variant}:{content_hash(image)}" if variant else content_hash(image)
+        return key, dhash(image) if self.perceptual else None
+
+    def get(self, keys: Tuple[str, Optional[int]], top_k: int) -> Optional[List[Dict]]:
+        """
+        Cached classifier results computed with at least top_k classes.
+        Returns: the first top_k {"label", "score"} results, or None on a miss
+        """
+        key, perceptual_hash = keys
+        with self._lock:
+            entry = self._cache.get(key, record=False)
+            near = False
+            if entry is None and perceptual_hash is not None:
+                near_key = self._nearest_key(key, perceptual_hash)
+                entry = self._cache.get(near_key, record=False) if near_key else None
+                near = entry is not None
+            if entry is not None and entry["top_k"] < top_k:
+                entry = None
+            self._lookups += 1
+            if entry is None:
+                self._misses.inc()
+            else:
+                self._hit_count += 1
+                (self._near_hits if near else self._hits).inc()
+            self._hit_rate.set(round(self._hit_count / self._lookups, 4))
+            return None if entry is None else [dict(res) for res in entry["results"][:top_k]]
+
+    def put(self, keys: Tuple[str, Optional[int]], top_k: int, results: List[Dict]):
+        key, perceptual_hash = keys
+        entry = {
+            "dhash": perceptual_hash if perceptual_hash is not None else 0,
+            "top_k": top_k,
+            "results": [{"label": str(res.get("label", "")), "score": float(res.get("score", 0.0))} for res in results],
+        }
+        with self._lock:
+            old = self._cache.pop(key)
+            if old is not None:
+                self._unindex(key, old["dhash"])
+            self._cache.put(key, entry)
+            if perceptual_hash is not None:
+                self._index(key, perceptual_hash)
+            self._size.set(len(self._cache))
+            if self.path:
+                self._mark_dirty()
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+            self._keys_by_band = {}
+            self._size.set(0)
+            if self.path:
+                self._mark_dirty()
+
+    def _mark_dirty(self):
+        """Schedule a write of the file unless one is already pending"""
+        self._dirty = True
+        if self._flush_timer is None:
+            self._flush_timer = threading.Timer(self.flush_interval_s, self.flush)
+            self._flush_timer.daemon = True
+            self._flush_timer.start()
+
+    def flush(self):
+        """Write pending changes to the file (called by the timer and on shutdown)"""
+        with self._lock:
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+            if not self.path or not self._dirty:
+                return
+            self._dirty = False
+            entries = [
+                {"key": key, "expires_at": expires_at, **entry}
+                for key, entry, expires_at in self._cache.items()
+            ]
+        # Serialize and write outside the lock so lookups are not blocked
+        self._save(entries)
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.warning("Ignoring unreadable detection cache %s: %s", self.path, e)
+            return
+        # Results from another model or engine are not reusable
+        if data.get("namespace") != self.namespace:
+            return
+        now = time.time()
+        for record in data.get("entries", []):
+            expires_at = record.get("expires_at")
+            if expires_at is not None and expires_at <= now:
+                continue
+            entry = {"dhash": record["dhash"], "top_k": record["top_k"], "results": record["results"]}
+            self._cache.put(record["key"], entry, ttl_s=expires_at - now if expires_at is not None else None)
+            if self.perceptual:
+                self._index(record["key"], record["dhash"])
+        self._size.set(len(self._cache))
+
+    def _save(self, entries: List[Dict]):
+        tmp_path = f"{self.path}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"namespace": self.namespace, "entries": entries}, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            # The in-memory cache stays valid; persistence is best effort
+            logger.warning("Could not persist detection cache to %s: %s", self.path, e)
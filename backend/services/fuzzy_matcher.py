@@ -0,0 +1,129 @@
+import threading
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import config
+
+
+def _deletes(word: str, max_distance: int) -> Set[str]:
+    """The word plus every string obtained by deleting up to max_distance characters"""
+    variants = {word}
+    frontier = {word}
+    for _ in range(max_distance):
+        frontier = {w[:i] + w[i + 1:] for w in frontier if len(w) > 1 for i in range(len(w))}
+        variants |= frontier
+    return variants
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """
+    Optimal string alignment distance (insertions, deletions, substitutions and
+    adjacent transpositions), or limit + 1 once it is known to exceed limit
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous_previous: List[int] = []
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous_previous[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous_previous, previous = previous, current
+    return previous[-1]
+
+
+def allowed_distance(word: str) -> int:
+    """
+    Typos tolerated for a word of this length: none below FUZZY_MIN_LENGTH (short
+    words like "like"/"lime" are too close to each other), then one, then two
+    from FUZZY_TWO_EDIT_LENGTH characters on
+    """
+    if len(word) < config.FUZZY_MIN_LENGTH:
+        return 0
+    if len(word) < config.FUZZY_TWO_EDIT_LENGTH:
+        return 1
+    return 2
+
+
+class FuzzyMatcher:
+    """
+    Typo-tolerant lookup over a changing set of terms (symmetric delete, as in
+    SymSpell): every term is indexed under all of its variants with up to
+    max_distance characters deleted, so a lookup only generates the deletes of the
+    query and verifies the few terms sharing one, instead of computing the edit
+    distance against every term. Terms can be added and removed incrementally.
+    Matches must start with the same letter as the query: typos rarely hit the first
+    letter, and it keeps ordinary words from matching items ("price" vs "rice").
+    """
+
+    def __init__(self, terms: Iterable[str] = (), max_distance: int = 2):
+        self.max_distance = max_distance
+        self._terms_by_delete: Dict[str, Set[str]] = {}
+        self._terms: Set[str] = set()
+        self._lock = threading.RLock()
+        for term in terms:
+            self.add(term)
+
+    def __len__(self) -> int:
+        return len(self._terms)
+
+    def __contains__(self, term: str) -> bool:
+        return term in self._terms
+
+    def add(self, term: str):
+        with self._lock:
+            if not term or term in self._terms:
+                return
+            self._terms.add(term)
+            for variant in _deletes(term, self.max_distance):
+                self._terms_by_delete.setdefault(variant, set()).add(term)
+
+    def remove(self, term: str):
+        with self._lock:
+            if term not in self._terms:
+                return
+            self._terms.discard(term)
+            for variant in _deletes(term, self.max_distance):
+                terms = self._terms_by_delete.get(variant)
+                if terms is not None:
+                    terms.discard(term)
+                    if not terms:
+                        del self._terms_by_delete[variant]
+
+    def lookup(self, word: str, max_distance: int = None) -> List[Tuple[str, int]]:
+        """
+        Terms within max_distance edits of word (default: allowed_distance(word)).
+        Returns: [(term, distance)], closest first
+        """
+        if max_distance is None:
+            max_distance = allowed_distance(word)
+        max_distance = min(max_distance, self.max_distance)
+        with self._lock:
+            if word in self._terms:
+                return [(word, 0)]
+            if max_distance <= 0:
+                return []
+            candidates: Set[str] = set()
+            for variant in _deletes(word, max_distance):
+                terms = self._terms_by_delete.get(variant)
+                if terms:
+                    candidates |= terms
+        matches = []
+        for term in candidates:
+            if term[0] != word[0]:
+                continue
+            distance = edit_distance(word, term, max_distance)
+            if distance <= max_distance:
+                matches.append((term, distance))
+        # Ties prefer the term closest in length, then alphabetical for stable results
+        matches.sort(key=lambda match: (match[1], abs(len(match[0]) - len(word)), match[0]))
+        return matches
+
+    def best(self, word: str, max_distance: int = None) -> Optional[str]:
+        """The closest term to word, or None"""
+        matches = self.lookup(word, max_distance)
+        return matches[0][0] if matches else None
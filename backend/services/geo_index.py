@@ -0,0 +1,230 @@
+import math
+import threading
+from typing import List, Dict, Tuple, Optional, Iterable, Sequence
+
+import numpy as np
+from geopy.distance import geodesic
+
+# Mean Earth radius (IUGG) used by the spherical haversine approximation
+EARTH_RADIUS_KM = 6371.0088
+
+# Haversine differs from the WGS-84 geodesic by at most ~0.56% of the distance
+# (about 0.33% at Delhi's latitude, i.e. ~35 m over 10 km). "fast" distances are
+# accurate to this tolerance; the prefilter keeps everything within
+# radius * (1 + margin) so the "exact" mode never drops a true match.
+HAVERSINE_MARGIN = 0.006
+
+# Distance modes: "exact" runs geodesic on the haversine survivors, "fast" returns haversine
+DISTANCE_MODES = ("exact", "fast")
+
+# Shortest length of one degree of latitude on the WGS-84 ellipsoid (at the equator)
+_MIN_KM_PER_DEG_LAT = 110.57
+
+
+def haversine_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """Great-circle distance on a sphere, in kilometers"""
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    dphi = phi2 - phi1
+    dlmb = math.radians(lng2 - lng1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlmb / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def haversine_km_many(lat: float, lng: float, lats: np.ndarray, lngs: np.ndarray) -> np.ndarray:
+    """Vectorized great-circle distances from one point to arrays of points, in kilometers"""
+    phi1 = math.radians(lat)
+    phi2 = np.radians(lats)
+    dphi = phi2 - phi1
+    dlmb = np.radians(lngs - lng)
+    a = np.sin(dphi / 2) ** 2 + math.cos(phi1) * np.cos(phi2) * np.sin(dlmb / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def top_k_indices(values: Sequence[float], k: int, descending: bool = False) -> List[int]:
+    """
+    Indices of the k smallest (or largest) values, in sorted order; equal values
+    keep their original order, as with a stable full sort.
+    Uses argpartition so only the selected k values are fully sorted.
+    """
+    arr = np.asarray(values, dtype=np.float64)
+    if descending:
+        arr = -arr
+    n = arr.shape[0]
+    if k <= 0 or n == 0:
+        return []
+    if k < n:
+        # argpartition picks arbitrarily among values tied with the k-th one: keep
+        # everything below it, then the earliest of the tied values
+        kth = arr[np.argpartition(arr, k - 1)[k - 1]]
+        below = np.flatnonzero(arr < kth)
+        tied = np.flatnonzero(arr == kth)[:k - below.shape[0]]
+        selected = np.concatenate([below, tied])
+    else:
+        selected = np.arange(n)
+    order = selected[np.lexsort((selected, arr[selected]))]
+    return order.tolist()
+
+
+class GeoGridIndex:
+    """
+    Uniform lat/lng grid over vendor locations.
+    Coordinates live in contiguous float64 arrays addressed by slot; grid cells hold slots.
+    A radius query only visits the cells overlapping the search circle's bounding box,
+    computes haversine for all candidates in one NumPy call and, in "exact" mode,
+    runs the geodesic on the survivors only.
+    """
+
+    def __init__(self, cell_km: float = 1.0, initial_capacity: int = 1024):
+        self.cell_deg = cell_km / _MIN_KM_PER_DEG_LAT
+        self._lng_cells = int(math.ceil(360.0 / self.cell_deg))
+        # Longitude columns tile the circle exactly, so column indices wrap at the antimeridian
+        self.lng_cell_deg = 360.0 / self._lng_cells
+        self._lock = threading.RLock()
+        self._reset(initial_capacity)
+
+    def _reset(self, capacity: int):
+        self._lat = np.zeros(max(capacity, 1), dtype=np.float64)
+        self._lng = np.zeros(max(capacity, 1), dtype=np.float64)
+        self._keys: List[Optional[str]] = [None] * self._lat.shape[0]
+        self._slot_of: Dict[str, int] = {}
+        self._free_slots: List[int] = list(range(self._lat.shape[0] - 1, -1, -1))
+        self._cells: Dict[Tuple[int, int], set] = {}
+
+    def __len__(self) -> int:
+        return len(self._slot_of)
+
+    def _cell_of(self, lat: float, lng: float) -> Tuple[int, int]:
+        return (int(math.floor(lat / self.cell_deg)),
+                int(math.floor(((lng + 180.0) % 360.0) / self.lng_cell_deg)) % self._lng_cells)
+
+    def _grow(self):
+        old = self._lat.shape[0]
+        self._lat = np.concatenate([self._lat, np.zeros(old, dtype=np.float64)])
+        self._lng = np.concatenate([self._lng, np.zeros(old, dtype=np.float64)])
+        self._keys.extend([None] * old)
+        self._free_slots.extend(range(2 * old - 1, old - 1, -1))
+
+    def upsert(self, key: str, lat: float, lng: float):
+        """Insert or move a point"""
+        with self._lock:
+            self.remove(key)
+            if not self._free_slots:
+                self._grow()
+            slot = self._free_slots.pop()
+            self._lat[slot] = lat
+            self._lng[slot] = lng
+            self._keys[slot] = key
+            self._slot_of[key] = slot
+            self._cells.setdefault(self._cell_of(lat, lng), set()).add(slot)
+
+    def remove(self, key: str):
+        with self._lock:
+            slot = self._slot_of.pop(key, None)
+            if slot is None:
+                return
+            cell_key = self._cell_of(self._lat[slot], self._lng[slot])
+            cell = self._cells.get(cell_key)
+            if cell is not None:
+                cell.discard(slot)
+                if not cell:
+                    del self._cells[cell_key]
+            self._keys[slot] = None
+            self._free_slots.append(slot)
+
+    def rebuild(self, points: Iterable[Tuple[str, float, float]]):
+        """Replace the whole index with (key, lat, lng) points"""
+        points = list(points)
+        with self._lock:
+            self._reset(max(1024, len(points)))
+            for key, lat, lng in points:
+                self.upsert(key, lat, lng)
+
+    def get(self, key: str) -> Optional[Tuple[float, float]]:
+        slot = self._slot_of.get(key)
+        if slot is None:
+            return None
+        return (float(self._lat[slot]), float(self._lng[slot]))
+
+    def _candidate_slots(self, lat: float, lng: float, radius_km: float) -> np.ndarray:
+        """Slots in the grid cells overlapping the bounding box of the search circle"""
+        if not math.isfinite(radius_km):
+            # Unbounded search: every point
+            return np.fromiter(self._slot_of.values(), dtype=np.intp, count=len(self._slot_of))
+        dlat = radius_km / _MIN_KM_PER_DEG_LAT
+        lat_lo, lat_hi = lat - dlat, lat + dlat
+        max_abs_lat = min(90.0, max(abs(lat_lo), abs(lat_hi)))
+        cos_lat = math.cos(math.radians(max_abs_lat))
+        dlng = 180.0 if cos_lat < 1e-9 else min(180.0, dlat / cos_lat)
+
+        y_lo = int(math.floor(lat_lo / self.cell_deg))
+        y_hi = int(math.floor(lat_hi / self.cell_deg))
+        if dlng >= 180.0:
+            x_range = range(self._lng_cells)
+        else:
+            x_lo = int(math.floor((lng - dlng + 180.0) / self.lng_cell_deg))
+            x_hi = int(math.floor((lng + dlng + 180.0) / self.lng_cell_deg))
+            x_range = range(x_lo, min(x_hi, x_lo + self._lng_cells - 1) + 1)
+
+        # Scanning every point is cheaper than visiting more cells than there are points
+        if (y_hi - y_lo + 1) * len(x_range) >= len(self._slot_of):
+            return np.fromiter(self._slot_of.values(), dtype=np.intp, count=len(self._slot_of))
+
+        slots: List[int] = []
+        for y in range(y_lo, y_hi + 1):
+            for x in x_range:
+                cell = self._cells.get((y, x % self._lng_cells))
+                if cell:
+                    slots.extend(cell)
+        return np.array(slots, dtype=np.intp)
+
+    def query_radius(self, lat: float, lng: float, radius_km: float,
+                     mode: str = "exact", limit: int = None) -> List[Tuple[str, float]]:
+        """
+        Find points within radius_km of (lat, lng).
+        mode "exact" uses geodesic distances, "fast" uses haversine (see HAVERSINE_MARGIN).
+        Returns: (key, distance in km) pairs sorted by distance, at most `limit` of them
+        """
+        with self._lock:
+            slots = self._candidate_slots(lat, lng, radius_km * (1 + HAVERSINE_MARGIN))
+            points = self._gather(slots)
+        return self._within(lat, lng, points, radius_km, mode, limit)
+
+    def query_keys(self, lat: float, lng: float, keys: Iterable[str], radius_km: float,
+                   mode: str = "exact", limit: int = None) -> List[Tuple[str, float]]:
+        """
+        Like query_radius, but only considers the given keys.
+        Cheaper than a grid query when the keys are already a small candidate set.
+        """
+        with self._lock:
+            slots = [self._slot_of[key] for key in keys if key in self._slot_of]
+            points = self._gather(np.array(slots, dtype=np.intp))
+        return self._within(lat, lng, points, radius_km, mode, limit)
+
+    def _gather(self, slots: np.ndarray) -> Tuple[np.ndarray, np.ndarray, List[str]]:
+        """Copy out the coordinates and keys of slots so distances can be computed unlocked"""
+        return self._lat[slots], self._lng[slots], [self._keys[slot] for slot in slots.tolist()]
+
+    def _within(self, lat: float, lng: float, points: Tuple[np.ndarray, np.ndarray, List[str]],
+                radius_km: float, mode: str, limit: Optional[int]) -> List[Tuple[str, float]]:
+        if mode not in DISTANCE_MODES:
+            raise ValueError(f"Unknown distance mode: {mode}. Expected one of {DISTANCE_MODES}")
+        lats, lngs, keys = points
+        if not keys:
+            return []
+
+        distances = haversine_km_many(lat, lng, lats, lngs)
+        if mode == "exact":
+            survivors = np.flatnonzero(distances <= radius_km * (1 + HAVERSINE_MARGIN))
+            exact = np.fromiter(
+                (geodesic((lat, lng), (lats[i], lngs[i])).kilometers for i in survivors.tolist()),
+                dtype=np.float64, count=survivors.size,
+            )
+            inside = exact <= radius_km
+            positions, distances = survivors[inside], exact[inside]
+        else:
+            positions = np.flatnonzero(distances <= radius_km)
+            distances = distances[positions]
+
+        order = top_k_indices(distances, limit if limit is not None else distances.shape[0])
+        return [(keys[positions[i]], float(distances[i])) for i in order]
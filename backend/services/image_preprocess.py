@@ -0,0 +1,60 @@
+import time
+from typing import BinaryIO, Tuple, Union
+
+from PIL import Image
+
+import config
+
+
+class PreparedImage:
+    """Reduced-resolution copies of an upload: one for the model, one for storage"""
+
+    __slots__ = ("model_image", "storage_image", "original_size", "decode_ms")
+
+    def __init__(self, model_image: Image.Image, storage_image: Image.Image, original_size: Tuple[int, int], decode_ms: float):
+        self.model_image = model_image
+        self.storage_image = storage_image
+        self.original_size = original_size
+        self.decode_ms = decode_ms
+
+
+def _fit_longest(size: Tuple[int, int], max_side: int) -> Tuple[int, int]:
+    width, height = size
+    scale = min(1.0, max_side / max(width, height))
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def _fit_shortest(image: Image.Image, min_side: int) -> Image.Image:
+    width, height = image.size
+    scale = min_side / min(width, height)
+    if scale >= 1.0:
+        return image
+    return image.resize((max(1, round(width * scale)), max(1, round(height * scale))), Image.BILINEAR)
+
+
+def prepare_image(source: Union[BinaryIO, Image.Image], model_size: int = None, storage_max_side: int = None) -> PreparedImage:
+    """
+    Decode an upload at reduced resolution.
+    JPEGs are decoded with draft(), which lets libjpeg scale by 1/2, 1/4 or 1/8 while
+    decoding, so a 12 MP photo never exists in memory at full size.
+    Returns: a PreparedImage with an RGB storage copy (longest side <= storage_max_side)
+    and an RGB model image (shortest side <= model_size)
+    """
+    model_size = model_size or config.PREPROCESS_MODEL_SIZE
+    storage_max_side = storage_max_side or config.PREPROCESS_STORAGE_MAX_SIDE
+    started_at = time.perf_counter()
+
+    image = source if isinstance(source, Image.Image) else Image.open(source)
+    original_size = image.size
+    storage_size = _fit_longest(original_size, storage_max_side)
+    if image.format == "JPEG":
+        # draft() only ever picks a scale that keeps both sides >= the requested size
+        image.draft("RGB", storage_size)
+    image.load()
+
+    storage_image = image if image.mode == "RGB" else image.convert("RGB")
+    if storage_image.size != storage_size:
+        storage_image = storage_image.resize(storage_size, Image.BILINEAR)
+    model_image = _fit_shortest(storage_image, model_size)
+
+    return PreparedImage(model_image, storage_image, original_size, (time.perf_counter() - started_at) * 1000)
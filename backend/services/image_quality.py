@@ -0,0 +1,68 @@
+import time
+from typing import Dict, Any, Tuple
+
+import numpy as np
+from PIL import Image
+
+import config
+
+QUALITY_MESSAGES = {
+    "too_small": "Image is too small. Please upload a photo of at least {min_side}px.",
+    "blurry": "Image is blurry. Please upload a clear image.",
+    "too_dark": "Image is too dark. Please take the photo in better light.",
+    "overexposed": "Image is overexposed. Please avoid direct glare or flash.",
+}
+
+
+def laplacian_variance(gray: np.ndarray) -> float:
+    """Variance of the 4-neighbour Laplacian; low values mean few sharp edges"""
+    gray = gray.astype(np.float32)
+    laplacian = (
+        gray[:-2, 1:-1] + gray[2:, 1:-1] + gray[1:-1, :-2] + gray[1:-1, 2:]
+        - 4.0 * gray[1:-1, 1:-1]
+    )
+    return float(laplacian.var())
+
+
+def assess_image_quality(image: Image.Image, original_size: Tuple[int, int] = None) -> Dict[str, Any]:
+    """
+    Blur, exposure and size checks on a small grayscale thumbnail.
+    original_size is the size of the upload before any downscaling.
+    Returns: {"ok", "issue", "message", "metrics"}; issue is None when the image passes
+    """
+    started_at = time.perf_counter()
+    width, height = original_size or image.size
+
+    gray = image.convert("L")
+    gray.thumbnail((config.QUALITY_THUMBNAIL_SIZE, config.QUALITY_THUMBNAIL_SIZE), Image.BILINEAR)
+    pixels = np.asarray(gray)
+
+    blur_variance = laplacian_variance(pixels) if min(pixels.shape) >= 3 else 0.0
+    mean_brightness = float(pixels.mean())
+    dark_fraction = float((pixels <= 16).mean())
+    bright_fraction = float((pixels >= 240).mean())
+
+    issue = None
+    if min(width, height) < config.QUALITY_MIN_SIDE:
+        issue = "too_small"
+    elif mean_brightness < config.QUALITY_MIN_BRIGHTNESS or dark_fraction > config.QUALITY_MAX_CLIPPED_FRACTION:
+        issue = "too_dark"
+    elif mean_brightness > config.QUALITY_MAX_BRIGHTNESS or bright_fraction > config.QUALITY_MAX_CLIPPED_FRACTION:
+        issue = "overexposed"
+    elif blur_variance < config.QUALITY_BLUR_THRESHOLD:
+        issue = "blurry"
+
+    return {
+        "ok": issue is None,
+        "issue": issue,
+        "message": QUALITY_MESSAGES[issue].format(min_side=config.QUALITY_MIN_SIDE) if issue else None,
+        "metrics": {
+            "blur_variance": round(blur_variance, 2),
+            "mean_brightness": round(mean_brightness, 2),
+            "dark_fraction": round(dark_fraction, 4),
+            "bright_fraction": round(bright_fraction, 4),
+            "width": width,
+            "height": height,
+            "check_ms": round((time.perf_counter() - started_at) * 1000, 3),
+        },
+    }
@@ -0,0 +1,85 @@
+import asyncio
+import functools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+import config
+from services.metrics import metrics
+
+
+class InferenceQueueFull(Exception):
+    """Raised when the inference executor has no free worker or queue slot"""
+
+    def __init__(self, retry_after: float):
+        super().__init__("Inference queue is full")
+        self.retry_after = retry_after
+
+
+class InferenceExecutor:
+    """
+    Bounded executor that runs blocking image inference off the event loop.
+    At most max_workers jobs run concurrently and at most max_queue more wait;
+    further submissions are rejected immediately with InferenceQueueFull.
+
+    Uses threads rather than processes: the model is loaded once per process
+    and PyTorch releases the GIL during the forward pass.
+    """
+
+    def __init__(self, max_workers: int = None, max_queue: int = None, retry_after: float = None):
+        self.max_workers = max_workers or config.INFERENCE_WORKERS
+        self.max_queue = config.INFERENCE_QUEUE_DEPTH if max_queue is None else max_queue
+        self.retry_after = config.INFERENCE_RETRY_AFTER_S if retry_after is None else retry_after
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="inference")
+        self._slots = threading.BoundedSemaphore(self.max_workers + self.max_queue)
+        self._pending = metrics.gauge("inference_pending")
+        self._rejected = metrics.counter("inference_rejected_total")
+        self._queue_wait_ms = metrics.histogram("inference_queue_wait_ms")
+        self._run_ms = metrics.histogram("inference_run_ms")
+
+    def _timed(self, fn: Callable, submitted_at: float) -> Any:
+        started_at = time.perf_counter()
+        self._queue_wait_ms.observe((started_at - submitted_at) * 1000)
+        try:
+            return fn()
+        finally:
+            self._run_ms.observe((time.perf_counter() - started_at) * 1000)
+
+    def _release(self, _future):
+        self._pending.dec()
+        self._slots.release()
+
+    async def run(self, fn: Callable, *args, **kwargs) -> Any:
+        """
+        Run fn(*args, **kwargs) on an inference worker and await its result.
+        Raises InferenceQueueFull when the queue is at capacity.
+        """
+        if not self._slots.acquire(blocking=False):
+            self._rejected.inc()
+            raise InferenceQueueFull(self.retry_after)
+        self._pending.inc()
+        try:
+            future = self._executor.submit(self._timed, functools.partial(fn, *args, **kwargs), time.perf_counter())
+        except BaseException:
+            self._release(None)
+            raise
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
+
+
+_executor: Optional[InferenceExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_inference_executor() -> InferenceExecutor:
+    """Return the shared process-wide inference executor"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = InferenceExecutor()
+    return _executor
@@ -0,0 +1,62 @@
+from typing import List, Dict, Any, Iterable, Tuple
+
+from services.catalog import canonical_item_name
+
+
+class InventoryRollup:
+    """
+    Compact summary of one vendor's inventory, rebuilt by the data store whenever
+    the inventory is written: per canonical item name the first inventory entry and
+    its price (what SmartBuy offers), the min/max and summed price over all entries
+    for that item (search lists every entry), plus the item count and total value. Lookups for a request cost
+    O(requested items) instead of a scan of the inventory.
+    """
+
+    __slots__ = ("items", "prices", "min_prices", "max_prices", "price_sums", "item_count", "total_value")
+
+    def __init__(self, items: Iterable[Dict[str, Any]]):
+        self.items: Dict[str, Dict[str, Any]] = {}
+        self.prices: Dict[str, float] = {}
+        self.min_prices: Dict[str, float] = {}
+        self.max_prices: Dict[str, float] = {}
+        self.price_sums: Dict[str, float] = {}
+        self.item_count = 0
+        self.total_value = 0
+        for item in items:
+            self.item_count += 1
+            price = item.get("price_per_unit", 0) or 0
+            self.total_value += price
+            name = canonical_item_name(item.get("name", ""))
+            if not name:
+                continue
+            if name not in self.items:
+                # First inventory entry per item name wins
+                self.items[name] = item
+                self.prices[name] = price
+                self.min_prices[name] = self.max_prices[name] = self.price_sums[name] = price
+            else:
+                self.price_sums[name] += price
+                self.min_prices[name] = min(self.min_prices[name], price)
+                self.max_prices[name] = max(self.max_prices[name], price)
+
+    def available(self, item_names: Iterable[str]) -> Tuple[List[Dict[str, Any]], float]:
+        """
+        Inventory entries for the requested canonical item names that the vendor stocks
+        Returns: (entries in request order, sum of their prices)
+        """
+        available_items = []
+        total_price = 0
+        for name in item_names:
+            item = self.items.get(name)
+            if item is not None:
+                available_items.append(item)
+                total_price += self.prices[name]
+        return available_items, total_price
+
+    def total_price(self, item_names: Iterable[str]) -> float:
+        """Sum of the prices of every inventory entry for the given canonical item names"""
+        return sum(self.price_sums.get(name, 0) for name in item_names)
+
+    def price_range(self, name: str) -> Tuple[float, float]:
+        """(min, max) price of an item, or (0, 0) when not stocked"""
+        return self.min_prices.get(name, 0), self.max_prices.get(name, 0)
@@ -0,0 +1,129 @@
+import threading
+from typing import List, Dict, Set, Iterable
+
+import config
+from services.catalog import canonical_item_name, get_catalog, normalize_item_name
+from services.fuzzy_matcher import FuzzyMatcher
+from services.metrics import metrics
+
+# Names are indexed by all of their 1-, 2- and 3-grams so substring queries of any
+# length can be answered from the postings without scanning every name
+_MAX_GRAM = 3
+
+
+def _grams(text: str, n: int) -> Set[str]:
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+class ItemIndex:
+    """
+    Inverted index from canonical item name to the vendor_ids stocking it, so stock
+    listed as "Tomatoes" or "tamatar" is found under "tomato".
+    Item names are additionally indexed by n-grams to answer substring searches, and
+    by symmetric deletes to answer misspelled ones.
+    Maintained incrementally whenever a vendor's inventory changes.
+    """
+
+    def __init__(self):
+        self._vendors_by_name: Dict[str, Set[str]] = {}
+        self._names_by_vendor: Dict[str, Set[str]] = {}
+        self._names_by_gram: Dict[str, Set[str]] = {}
+        self._fuzzy = FuzzyMatcher()
+        self._lock = threading.RLock()
+        self._corrected = metrics.counter("item_search_corrections_total")
+
+    def _add_name(self, name: str, vendor_id: str):
+        vendors = self._vendors_by_name.get(name)
+        if vendors is None:
+            vendors = self._vendors_by_name[name] = set()
+            for n in range(1, _MAX_GRAM + 1):
+                for gram in _grams(name, n):
+                    self._names_by_gram.setdefault(gram, set()).add(name)
+            self._fuzzy.add(name)
+        vendors.add(vendor_id)
+
+    def _remove_name(self, name: str, vendor_id: str):
+        vendors = self._vendors_by_name.get(name)
+        if vendors is None:
+            return
+        vendors.discard(vendor_id)
+        if not vendors:
+            del self._vendors_by_name[name]
+            self._fuzzy.remove(name)
+            for n in range(1, _MAX_GRAM + 1):
+                for gram in _grams(name, n):
+                    names = self._names_by_gram.get(gram)
+                    if names is not None:
+                        names.discard(name)
+                        if not names:
+                            del self._names_by_gram[gram]
+
+    def set_vendor_items(self, vendor_id: str, item_names: Iterable[str]):
+        """Replace the indexed items of a vendor"""
+        new_names = {canonical_item_name(name) for name in item_names if name}
+        new_names.discard("")
+        with self._lock:
+            old_names = self._names_by_vendor.get(vendor_id, set())
+            for name in old_names - new_names:
+                self._remove_name(name, vendor_id)
+            for name in new_names - old_names:
+                self._add_name(name, vendor_id)
+            if new_names:
+                self._names_by_vendor[vendor_id] = new_names
+            else:
+                self._names_by_vendor.pop(vendor_id, None)
+
+    def remove_vendor(self, vendor_id: str):
+        self.set_vendor_items(vendor_id, [])
+
+    def rebuild(self, inventories: Iterable[Dict]):
+        """Replace the whole index from inventory records"""
+        with self._lock:
+            self._vendors_by_name = {}
+            self._names_by_vendor = {}
+            self._names_by_gram = {}
+            self._fuzzy = FuzzyMatcher()
+            for inventory in inventories:
+                self.set_vendor_items(inventory["vendor_id"], (item.get("name", "") for item in inventory.get("items", [])))
+
+    def vendors_with_item(self, name: str) -> Set[str]:
+        """Vendor ids stocking an item with exactly this name or one of its aliases"""
+        with self._lock:
+            return set(self._vendors_by_name.get(canonical_item_name(name), ()))
+
+    def names_containing(self, query: str) -> List[str]:
+        """Indexed item names that contain the query as a substring"""
+        query = normalize_item_name(query)
+        if not query:
+            return []
+        with self._lock:
+            n = min(len(query), _MAX_GRAM)
+            postings = [self._names_by_gram.get(gram) for gram in _grams(query, n)]
+            if not all(postings):
+                return []
+            # Intersect starting from the rarest gram, then verify the full substring
+            postings.sort(key=len)
+            candidates = set(postings[0]).intersection(*postings[1:])
+            return [name for name in candidates if query in name]
+
+    def search(self, query: str) -> Dict[str, Set[str]]:
+        """
+        Substring search over item names; a query that is a catalog alias ("pyaaz")
+        also matches the canonical name. When nothing matches, the query is treated as
+        a misspelling of a stocked or catalog item name ("tomatos").
+        Returns: matching canonical item name -> vendor ids stocking it
+        """
+        normalized = normalize_item_name(query)
+        canonical = canonical_item_name(normalized)
+        with self._lock:
+            names = set(self.names_containing(normalized))
+            if canonical != normalized:
+                names.update(self.names_containing(canonical))
+            if not names and config.FUZZY_MATCH_ENABLED:
+                names.update(name for name, _ in self._fuzzy.lookup(normalized))
+                corrected = get_catalog().match_name(normalized)
+                if corrected in self._vendors_by_name:
+                    names.add(corrected)
+                if names:
+                    self._corrected.inc()
+            return {name: set(self._vendors_by_name[name]) for name in names}
@@ -0,0 +1,134 @@
+import bisect
+import threading
+from typing import List, Dict, Any, Sequence
+
+# Default histogram buckets, in milliseconds
+DEFAULT_MS_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class Counter:
+    """Monotonically increasing value"""
+
+    def __init__(self):
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self._value += amount
+
+    @property
+    def value(self) -> float:
+        return self._value
+
+    def snapshot(self) -> Any:
+        return self._value
+
+
+class Gauge:
+    """Value that can go up and down, or be set directly"""
+
+    def __init__(self):
+        self._value: Any = 0
+        self._lock = threading.Lock()
+
+    def set(self, value: Any):
+        with self._lock:
+            self._value = value
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount: float = 1.0):
+        with self._lock:
+            self._value -= amount
+
+    @property
+    def value(self) -> Any:
+        return self._value
+
+    def snapshot(self) -> Any:
+        return self._value
+
+
+class Histogram:
+    """Bucketed distribution of observations with count, sum, min and max"""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_MS_BUCKETS):
+        self.buckets: List[float] = sorted(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._count = 0
+        self._sum = 0.0
+        self._min = None
+        self._max = None
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        with self._lock:
+            self._counts[bisect.bisect_left(self.buckets, value)] += 1
+            self._count += 1
+            self._sum += value
+            self._min = value if self._min is None else min(self._min, value)
+            self._max = value if self._max is None else max(self._max, value)
+
+    def quantile(self, q: float) -> float:
+        """Approximate quantile: upper bound of the bucket containing it"""
+        with self._lock:
+            if not self._count:
+                return 0.0
+            target = q * self._count
+            seen = 0
+            for bound, count in zip(self.buckets + [self._max], self._counts):
+                seen += count
+                if seen >= target:
+                    return min(bound, self._max)
+            return self._max
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            count = self._count
+            data = {
+                "count": count,
+                "sum": round(self._sum, 3),
+                "avg": round(self._sum / count, 3) if count else 0.0,
+                "min": self._min,
+                "max": self._max,
+                "buckets": {f"le_{bound:g}": c for bound, c in zip(self.buckets, self._counts)},
+            }
+            data["buckets"]["le_inf"] = self._counts[-1]
+        data["p50"] = self.quantile(0.5)
+        data["p99"] = self.quantile(0.99)
+        return data
+
+
+class MetricsRegistry:
+    """Named process-wide metrics, exported as a JSON-friendly snapshot"""
+
+    def __init__(self):
+        self._metrics: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, name: str, factory):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = factory()
+            return metric
+
+    def counter(self, name: str) -> Counter:
+        return self._get_or_create(name, Counter)
+
+    def gauge(self, name: str) -> Gauge:
+        return self._get_or_create(name, Gauge)
+
+    def histogram(self, name: str, buckets: Sequence[float] = DEFAULT_MS_BUCKETS) -> Histogram:
+        return self._get_or_create(name, lambda: Histogram(buckets))
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            metrics = dict(self._metrics)
+        return {name: metric.snapshot() for name, metric in sorted(metrics.items())}
+
+
+metrics = MetricsRegistry()
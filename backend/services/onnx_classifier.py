@@ -0,0 +1,88 @@
+import os
+from typing import List, Dict
+
+import numpy as np
+from PIL import Image
+
+import config
+
+
+def export_onnx(model_name: str, output_path: str, opset: int = 17):
+    """Export a Hugging Face image classifier to an ONNX file with a dynamic batch axis"""
+    import torch
+    from transformers import AutoModelForImageClassification, AutoImageProcessor
+
+    model = AutoModelForImageClassification.from_pretrained(model_name).eval()
+    processor = AutoImageProcessor.from_pretrained(model_name)
+
+    class _LogitsOnly(torch.nn.Module):
+        def __init__(self, wrapped):
+            super().__init__()
+            self.wrapped = wrapped
+
+        def forward(self, pixel_values):
+            return self.wrapped(pixel_values=pixel_values).logits
+
+    dummy = processor(images=[Image.new("RGB", (224, 224))], return_tensors="pt")["pixel_values"]
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    tmp_path = f"{output_path}.tmp"
+    with torch.no_grad():
+        torch.onnx.export(
+            _LogitsOnly(model),
+            (dummy,),
+            tmp_path,
+            input_names=["pixel_values"],
+            output_names=["logits"],
+            dynamic_axes={"pixel_values": {0: "batch"}, "logits": {0: "batch"}},
+            opset_version=opset,
+        )
+    os.replace(tmp_path, output_path)
+
+
+class OnnxImageClassifier:
+    """
+    ONNX Runtime replacement for the transformers image-classification pipeline.
+    Exports the model on first use, runs it on CPU and returns results in the
+    pipeline's format: one list of {"label", "score"} dicts per image.
+    """
+
+    def __init__(self, model_name: str, onnx_path: str = None, num_threads: int = None):
+        try:
+            import onnxruntime as ort
+        except ImportError as e:
+            raise ImportError("The 'onnx' detector engine needs onnxruntime and onnx: pip install onnxruntime onnx") from e
+        from transformers import AutoConfig, AutoImageProcessor
+
+        onnx_path = onnx_path or config.DETECTOR_ONNX_PATH
+        if not os.path.exists(onnx_path):
+            export_onnx(model_name, onnx_path)
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        num_threads = config.DETECTOR_ONNX_THREADS if num_threads is None else num_threads
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+
+        self.session = ort.InferenceSession(onnx_path, sess_options=options, providers=["CPUExecutionProvider"])
+        self.processor = AutoImageProcessor.from_pretrained(model_name)
+        id2label = AutoConfig.from_pretrained(model_name).id2label
+        self.labels = [id2label[i] for i in range(len(id2label))]
+
+    def __call__(self, images: List[Image.Image], top_k: int = 5, batch_size: int = None) -> List[List[Dict]]:
+        if isinstance(images, Image.Image):
+            images = [images]
+        batch_size = batch_size or len(images)
+        results: List[List[Dict]] = []
+        for start in range(0, len(images), batch_size):
+            chunk = images[start:start + batch_size]
+            pixel_values = self.processor(images=chunk, return_tensors="np")["pixel_values"].astype(np.float32)
+            logits = self.session.run(["logits"], {"pixel_values": pixel_values})[0]
+            # Softmax, as the pipeline applies for single-label classifiers
+            logits = logits - logits.max(axis=1, keepdims=True)
+            probs = np.exp(logits)
+            probs /= probs.sum(axis=1, keepdims=True)
+            k = min(top_k, probs.shape[1])
+            for row in probs:
+                top = np.argsort(-row)[:k]
+                results.append([{"label": self.labels[i], "score": float(row[i])} for i in top])
+        return results
@@ -0,0 +1,245 @@
+import re
+import threading
+from typing import List, Dict, Any, Optional, Set, Tuple
+
+import config
+from services.catalog import Catalog, format_quantity, get_catalog
+from services.metrics import metrics
+
+# Numbers (including decimals), words and clause separators; "2kg" tokenizes as "2", "kg"
+_TOKEN_RE = re.compile(r"\d+(?:\.\d+)?|[a-z]+|[,;.!?]")
+_SEPARATORS = {",", ";", ".", "!", "?"}
+# A quantity is only paired across a separator when nothing closer is left
+_SEPARATOR_PENALTY = 1000
+
+_NUMBER_WORDS = {
+    "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6,
+    "seven": 7, "eight": 8, "nine": 9, "ten": 10, "eleven": 11, "twelve": 12,
+    "half": 0.5,
+    # Hinglish ("ek kilo pyaaz"); "do" (two) is left out as it is also an English word
+    "ek": 1, "teen": 3, "chaar": 4, "char": 4, "paanch": 5, "aadha": 0.5,
+}
+# Articles count as one only when directly followed by a unit ("a dozen bananas")
+_ARTICLES = {"a", "an"}
+
+_TERMINAL = ""
+# Misspelling lookups remembered per parser; unknown words repeat a lot ("need", "please")
+_MAX_CORRECTIONS = 4096
+
+
+class RequestParser:
+    """
+    Single-pass SmartBuy request parser.
+    The catalog vocabulary (item names and aliases, units and intent keywords) is
+    compiled once into a token trie in which every alias maps to its canonical item;
+    parse() tokenizes the text with one precompiled regex and walks it once, taking
+    the longest phrase match at each position. Each quantity is bound to the nearest
+    item mention.
+    """
+
+    def __init__(self, catalog: Catalog):
+        self.catalog = catalog
+        self._trie: Dict[str, Any] = {}
+        self._max_phrase = 1
+        self.items: Dict[str, Dict[str, Any]] = catalog.items_by_name
+        self._corrections: Dict[str, Optional[str]] = {}
+        self._corrected = metrics.counter("request_parser_corrections_total")
+        for item in catalog.items:
+            for form in catalog.surface_forms(item):
+                self._add_phrase(form, ("item", item["name"]))
+        for unit, surface_forms in catalog.units.items():
+            for form in surface_forms:
+                self._add_phrase(form.lower(), ("unit", unit))
+        for intent, keywords in catalog.intents.items():
+            for keyword in keywords:
+                self._add_phrase(keyword.lower(), ("intent", intent))
+        self._compile(self._trie)
+
+    def _compile(self, node: Dict[str, Any]):
+        """Turn each phrase's payload set into an (item, unit, intents) tuple for the hot loop"""
+        for token, child in node.items():
+            if token == _TERMINAL:
+                payloads = child
+                item = next((value for kind, value in payloads if kind == "item"), None)
+                unit = next((value for kind, value in payloads if kind == "unit"), None)
+                intents = tuple(sorted(value for kind, value in payloads if kind == "intent"))
+                node[_TERMINAL] = (item, unit, intents)
+            else:
+                self._compile(child)
+
+    def _add_phrase(self, phrase: str, payload: Tuple[str, str]):
+        tokens = _TOKEN_RE.findall(phrase)
+        if not tokens:
+            return
+        node = self._trie
+        for token in tokens:
+            node = node.setdefault(token, {})
+        node.setdefault(_TERMINAL, set()).add(payload)
+        self._max_phrase = max(self._max_phrase, len(tokens))
+
+    def parse(self, request_text: str) -> Dict[str, Any]:
+        """
+        Extract items, quantities and intent flags from a request.
+        Returns: {"items": [{"name", "category", "quantity", "unit", "position"}],
+                  "intents": set of intent names, "original_request": str}
+        """
+        text = request_text.lower().strip()
+        tokens = _TOKEN_RE.findall(text)
+        trie = self._trie
+        max_phrase = self._max_phrase
+
+        mentions: List[Tuple[int, str]] = []                # (token position, item name)
+        quantities: List[Tuple[int, int, float, str]] = []  # (first token, last token, amount, unit)
+        intents: Set[str] = set()
+        pending_number: Optional[Tuple[int, float]] = None
+
+        i = 0
+        n = len(tokens)
+        while i < n:
+            token = tokens[i]
+            node = trie.get(token)
+            if node is None:
+                # Not the start of any phrase: only numbers and misspelled items matter here
+                if token[0].isdigit():
+                    pending_number = (i, float(token))
+                    i += 1
+                    continue
+                if token in _NUMBER_WORDS:
+                    pending_number = (i, _NUMBER_WORDS[token])
+                    i += 1
+                    continue
+                if token in _ARTICLES:
+                    pending_number = (i, 1)
+                    i += 1
+                    continue
+                match = self._correct(token)
+                if match is None:
+                    pending_number = None
+                    i += 1
+                    continue
+                end = i + 1
+            else:
+                # Longest phrase match starting at i
+                match = node.get(_TERMINAL)
+                end = j = i + 1
+                while j < n and j - i < max_phrase:
+                    node = node.get(tokens[j])
+                    if node is None:
+                        break
+                    j += 1
+                    if _TERMINAL in node:
+                        match, end = node[_TERMINAL], j
+                if match is None:
+                    pending_number = None
+                    i += 1
+                    continue
+
+            item, unit, phrase_intents = match
+            if unit is not None and pending_number is not None:
+                quantities.append((pending_number[0], end - 1, pending_number[1], unit))
+                pending_number = None
+            elif item is not None:
+                if pending_number is not None:
+                    # A bare count right before an item ("3 mangoes") means pieces
+                    quantities.append((pending_number[0], pending_number[0], pending_number[1], "piece"))
+                    pending_number = None
+                mentions.append((i, item))
+            if phrase_intents:
+                intents.update(phrase_intents)
+            i = end
+
+        return {
+            "items": self._bind_quantities(tokens, mentions, quantities),
+            "intents": intents,
+            "original_request": text,
+        }
+
+    def _correct(self, token: str) -> Optional[Tuple[str, None, Tuple[str, ...]]]:
+        """Trie payload for a misspelled item name ("bananna"), or None"""
+        if len(token) < config.FUZZY_MIN_LENGTH or not config.FUZZY_MATCH_ENABLED:
+            return None
+        try:
+            name = self._corrections[token]
+        except KeyError:
+            form = self.catalog.fuzzy.best(token)
+            name = self.catalog.lookup(form)["name"] if form else None
+            if len(self._corrections) >= _MAX_CORRECTIONS:
+                self._corrections.clear()
+            self._corrections[token] = name
+        if name is None:
+            return None
+        self._corrected.inc()
+        return (name, None, ())
+
+    def _new_item(self, name: str, position: int) -> Dict[str, Any]:
+        item = self.items[name]
+        return {
+            "name": name,
+            "category": item["category"],
+            "quantity": item["default_quantity"],
+            "unit": item["unit"],
+            "position": position,
+        }
+
+    def _bind_quantities(
+        self,
+        tokens: List[str],
+        mentions: List[Tuple[int, str]],
+        quantities: List[Tuple[int, int, float, str]],
+    ) -> List[Dict[str, Any]]:
+        # Pair quantities and item mentions one-to-one, closest pairs first, avoiding
+        # pairs split by a separator; on equal distance the item after the quantity
+        # wins ("2 kg tomatoes and 1 kg onions")
+        if not quantities:
+            items: Dict[str, Dict[str, Any]] = {}
+            for position, name in mentions:
+                if name not in items:
+                    items[name] = self._new_item(name, position)
+            return list(items.values())
+
+        separators_before = [0]
+        for token in tokens:
+            separators_before.append(separators_before[-1] + (token in _SEPARATORS))
+        pairs = []
+        for q, (first, last, _, _) in enumerate(quantities):
+            for m, (position, _) in enumerate(mentions):
+                following = position > last
+                distance = position - last if following else first - position
+                low, high = (last, position) if following else (position, first)
+                if separators_before[high] != separators_before[low]:
+                    distance += _SEPARATOR_PENALTY
+                pairs.append((distance, not following, q, m))
+        pairs.sort()
+        bound: Dict[int, int] = {}
+        used: Set[int] = set()
+        for _, _, q, m in pairs:
+            if q not in used and m not in bound:
+                bound[m] = q
+                used.add(q)
+
+        items = {}
+        has_quantity: Set[str] = set()
+        for index, (position, name) in enumerate(mentions):
+            if name not in items:
+                items[name] = self._new_item(name, position)
+            # A repeated mention only contributes its quantity if the item has none yet
+            if index in bound and name not in has_quantity:
+                _, _, amount, unit = quantities[bound[index]]
+                items[name]["quantity"] = format_quantity(amount, unit)
+                items[name]["unit"] = unit
+                has_quantity.add(name)
+        return list(items.values())
+
+
+_parser: Optional[RequestParser] = None
+_parser_lock = threading.Lock()
+
+
+def get_request_parser() -> RequestParser:
+    """Return the shared parser, compiled from the shared catalog on first use"""
+    global _parser
+    if _parser is None:
+        with _parser_lock:
+            if _parser is None:
+                _parser = RequestParser(get_catalog())
+    return _parser
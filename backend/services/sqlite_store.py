@@ -0,0 +1,316 @@
+import argparse
+import json
+import logging
+import os
+import sqlite3
+from contextlib import contextmanager
+from typing import List, Dict, Any, Optional, Iterable, Set
+
+import config
+from services.catalog import canonical_item_name
+from services.data_store import BaseDataStore
+
+logger = logging.getLogger(__name__)
+
+# Bumped when a table's layout or contents change; _connect migrates older databases
+_SCHEMA_VERSION = 1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS vendors (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    vendor_id TEXT NOT NULL UNIQUE,
+    name TEXT,
+    phone TEXT,
+    status TEXT,
+    type TEXT,
+    latitude REAL,
+    longitude REAL,
+    rating REAL,
+    total_ratings INTEGER,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_vendors_status ON vendors(status);
+CREATE INDEX IF NOT EXISTS idx_vendors_type ON vendors(type);
+
+CREATE TABLE IF NOT EXISTS inventories (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    vendor_id TEXT NOT NULL UNIQUE,
+    last_updated TEXT,
+    image_url TEXT,
+    data TEXT NOT NULL
+);
+
+-- One row per inventory entry, under its canonical item name, for item lookups
+CREATE TABLE IF NOT EXISTS inventory_items (
+    vendor_id TEXT NOT NULL,
+    name TEXT NOT NULL,
+    quantity TEXT,
+    unit TEXT,
+    price_per_unit REAL
+);
+CREATE INDEX IF NOT EXISTS idx_inventory_items_vendor_id ON inventory_items(vendor_id);
+CREATE INDEX IF NOT EXISTS idx_inventory_items_name ON inventory_items(name);
+
+CREATE TABLE IF NOT EXISTS requests (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    request_id TEXT,
+    customer_id TEXT,
+    status TEXT,
+    created_at TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_requests_status ON requests(status);
+
+CREATE TABLE IF NOT EXISTS unmet_demand (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    demand_id TEXT NOT NULL UNIQUE,
+    item_name TEXT,
+    priority TEXT,
+    total_requests INTEGER,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_unmet_demand_item_name ON unmet_demand(item_name);
+"""
+
+
+def _connect(db_path: str) -> sqlite3.Connection:
+    """Open a connection in WAL mode with manual transaction control"""
+    os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+    conn = sqlite3.connect(db_path, isolation_level=None, check_same_thread=False, timeout=10.0)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA foreign_keys=ON")
+    conn.executescript(_SCHEMA)
+    if conn.execute("PRAGMA user_version").fetchone()[0] < _SCHEMA_VERSION:
+        _migrate(conn)
+    return conn
+
+
+def _migrate(conn: sqlite3.Connection):
+    """Rebuild inventory_items under canonical item names (older versions stored the raw names)"""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute("DELETE FROM inventory_items")
+        for (data,) in conn.execute("SELECT data FROM inventories").fetchall():
+            _replace_inventory_items(conn, json.loads(data))
+        conn.execute(f"PRAGMA user_version = {_SCHEMA_VERSION}")
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+
+
+def _upsert_vendor(conn: sqlite3.Connection, vendor: Dict):
+    location = vendor.get("location") or {}
+    conn.execute(
+        """
+        INSERT INTO vendors (vendor_id, name, phone, status, type, latitude, longitude, rating, total_ratings, data)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(vendor_id) DO UPDATE SET
+            name = excluded.name, phone = excluded.phone, status = excluded.status, type = excluded.type,
+            latitude = excluded.latitude, longitude = excluded.longitude, rating = excluded.rating,
+            total_ratings = excluded.total_ratings, data = excluded.data
+        """,
+        (
+            vendor["vendor_id"], vendor.get("name"), vendor.get("phone"), vendor.get("status"),
+            vendor.get("type"), location.get("latitude"), location.get("longitude"),
+            vendor.get("rating"), vendor.get("total_ratings"),
+            json.dumps(vendor, ensure_ascii=False),
+        ),
+    )
+
+
+def _upsert_inventory(conn: sqlite3.Connection, inventory: Dict):
+    vendor_id = inventory["vendor_id"]
+    conn.execute(
+        """
+        INSERT INTO inventories (vendor_id, last_updated, image_url, data)
+        VALUES (?, ?, ?, ?)
+        ON CONFLICT(vendor_id) DO UPDATE SET
+            last_updated = excluded.last_updated, image_url = excluded.image_url, data = excluded.data
+        """,
+        (vendor_id, inventory.get("last_updated"), inventory.get("image_url"), json.dumps(inventory, ensure_ascii=False)),
+    )
+    _replace_inventory_items(conn, inventory)
+
+
+def _replace_inventory_items(conn: sqlite3.Connection, inventory: Dict):
+    vendor_id = inventory["vendor_id"]
+    conn.execute("DELETE FROM inventory_items WHERE vendor_id = ?", (vendor_id,))
+    conn.executemany(
+        "INSERT INTO inventory_items (vendor_id, name, quantity, unit, price_per_unit) VALUES (?, ?, ?, ?, ?)",
+        [
+            (vendor_id, canonical_item_name(item.get("name", "")), item.get("quantity"), item.get("unit"),
+             item.get("price_per_unit"))
+            for item in inventory.get("items", [])
+            if canonical_item_name(item.get("name", ""))
+        ],
+    )
+
+
+def _insert_request(conn: sqlite3.Connection, request_data: Dict):
+    conn.execute(
+        "INSERT INTO requests (request_id, customer_id, status, created_at, data) VALUES (?, ?, ?, ?, ?)",
+        (
+            request_data.get("request_id"), request_data.get("customer_id"), request_data.get("status"),
+            request_data.get("created_at"), json.dumps(request_data, ensure_ascii=False),
+        ),
+    )
+
+
+def _upsert_unmet_demand(conn: sqlite3.Connection, demand: Dict):
+    conn.execute(
+        """
+        INSERT INTO unmet_demand (demand_id, item_name, priority, total_requests, data)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT(demand_id) DO UPDATE SET
+            item_name = excluded.item_name, priority = excluded.priority,
+            total_requests = excluded.total_requests, data = excluded.data
+        """,
+        (
+            demand["demand_id"], demand.get("item_name"), demand.get("priority"),
+            demand.get("total_requests"), json.dumps(demand, ensure_ascii=False),
+        ),
+    )
+
+
+class SQLiteDataStore(BaseDataStore):
+    """
+    Data store persisted to a local SQLite database in WAL mode.
+    Every write is a single-row transaction instead of a full file rewrite;
+    changes committed by other processes are detected through PRAGMA data_version.
+    """
+
+    def __init__(self, db_path: str = None, refresh_interval: float = None):
+        super().__init__(refresh_interval)
+        self.db_path = db_path or config.SQLITE_PATH
+        self._conn = _connect(self.db_path)
+        self._data_version: Optional[int] = None
+
+    def _current_data_version(self) -> int:
+        return self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def _sync_from_storage(self):
+        data_version = self._current_data_version()
+        if data_version == self._data_version:
+            return
+        vendors = [json.loads(row[0]) for row in self._conn.execute("SELECT data FROM vendors ORDER BY seq")]
+        inventories = [json.loads(row[0]) for row in self._conn.execute("SELECT data FROM inventories ORDER BY seq")]
+        self._set_vendors(vendors)
+        self._set_inventories(inventories)
+        self._data_version = data_version
+
+    def _invalidate(self):
+        self._data_version = None
+
+    @contextmanager
+    def _write_transaction(self):
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        else:
+            self._conn.execute("COMMIT")
+
+    def _persist_vendor(self, vendor: Dict):
+        _upsert_vendor(self._conn, vendor)
+
+    def _persist_inventory(self, inventory: Dict):
+        _upsert_inventory(self._conn, inventory)
+
+    def find_vendors_with_items(self, item_names: Iterable[str]) -> Set[str]:
+        """Vendor ids stocking at least one of the named items, from the indexed inventory_items table"""
+        names = list({canonical_item_name(name) for name in item_names if name})
+        if not names:
+            return set()
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT DISTINCT vendor_id FROM inventory_items WHERE name IN ({', '.join('?' * len(names))})",
+                names,
+            )
+            return {row[0] for row in rows}
+
+    def add_request(self, request_data: Dict[str, Any]) -> Dict:
+        with self._lock, self._write_transaction():
+            _insert_request(self._conn, request_data)
+            return request_data
+
+    def get_unmet_demand(self) -> List[Dict]:
+        with self._lock:
+            return [json.loads(row[0]) for row in self._conn.execute("SELECT data FROM unmet_demand ORDER BY seq")]
+
+    def save_unmet_demand(self, unmet_demand: List[Dict]):
+        with self._lock, self._write_transaction():
+            # Replace the whole set, like the JSON backend: records no longer present are deleted
+            self._conn.execute("CREATE TEMP TABLE IF NOT EXISTS kept_demand (demand_id TEXT PRIMARY KEY)")
+            self._conn.execute("DELETE FROM kept_demand")
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO kept_demand (demand_id) VALUES (?)",
+                [(demand["demand_id"],) for demand in unmet_demand],
+            )
+            self._conn.execute("DELETE FROM unmet_demand WHERE demand_id NOT IN (SELECT demand_id FROM kept_demand)")
+            for demand in unmet_demand:
+                _upsert_unmet_demand(self._conn, demand)
+
+
+def import_json_data(data_dir: str, db_path: str) -> Dict[str, int]:
+    """
+    One-shot import of the JSON data files into a SQLite database.
+    Existing rows with the same ids are overwritten. Files that are missing or
+    not valid JSON (e.g. truncated by a racing write) are skipped with a warning.
+    Returns: number of imported records per table
+    """
+    def load(name: str) -> List[Dict]:
+        try:
+            with open(os.path.join(data_dir, name), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return []
+        except json.JSONDecodeError as e:
+            logger.warning("Skipping %s, invalid JSON: %s", name, e)
+            return []
+
+    vendors = load("vendors.json")
+    inventories = load("inventories.json")
+    requests = load("requests.json")
+    unmet_demand = load("unmet_demand.json")
+
+    conn = _connect(db_path)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        for vendor in vendors:
+            _upsert_vendor(conn, vendor)
+        for inventory in inventories:
+            _upsert_inventory(conn, inventory)
+        if requests:
+            conn.execute("DELETE FROM requests")
+        for request_data in requests:
+            _insert_request(conn, request_data)
+        for demand in unmet_demand:
+            _upsert_unmet_demand(conn, demand)
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+    return {
+        "vendors": len(vendors),
+        "inventories": len(inventories),
+        "requests": len(requests),
+        "unmet_demand": len(unmet_demand),
+    }
+
+
+if __name__ == "__main__":
+    # Usage (from backend/): python -m services.sqlite_store --data-dir data --db data/vendee.db
+    parser = argparse.ArgumentParser(description="Import Vendee JSON data files into SQLite")
+    parser.add_argument("--data-dir", default=config.DATA_DIR)
+    parser.add_argument("--db", default=config.SQLITE_PATH)
+    args = parser.parse_args()
+
+    counts = import_json_data(args.data_dir, args.db)
+    print(f"Imported into {args.db}: {counts}")
@@ -0,0 +1,210 @@
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Optional, Set
+
+from PIL import Image
+
+import config
+from services.data_store import get_data_store
+from services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+FSYNC_POLICIES = ("none", "always")
+
+
+class _ArchiveJob:
+    __slots__ = ("image", "filename", "enqueued_at")
+
+    def __init__(self, image: Image.Image, filename: str):
+        self.image = image
+        self.filename = filename
+        self.enqueued_at = time.perf_counter()
+
+
+class UploadArchiver:
+    """
+    Background writer for uploaded cart photos.
+    submit() returns the future /uploads URL immediately; a worker thread encodes the
+    JPEG (plus optional WebP and thumbnail variants) and writes each file atomically,
+    so the static mount never serves a partial image. When the backlog is full the
+    caller writes the image itself, which slows uploads down instead of dropping them.
+    The same thread periodically deletes files older than the retention period, except
+    photos (and their variants) still referenced by an inventory's image_url.
+    """
+
+    def __init__(
+        self,
+        directory: str = None,
+        max_backlog: int = None,
+        fsync: str = None,
+        retention_days: float = None,
+        cleanup_interval_s: float = None,
+    ):
+        self.directory = directory or config.UPLOADS_DIR
+        self.fsync = fsync or config.UPLOAD_FSYNC
+        if self.fsync not in FSYNC_POLICIES:
+            raise ValueError(f"Unknown fsync policy '{self.fsync}', expected one of {FSYNC_POLICIES}")
+        self.retention_days = config.UPLOAD_RETENTION_DAYS if retention_days is None else retention_days
+        self.cleanup_interval_s = config.UPLOAD_CLEANUP_INTERVAL_S if cleanup_interval_s is None else cleanup_interval_s
+        self._queue: "queue.Queue[_ArchiveJob]" = queue.Queue(maxsize=max(1, max_backlog or config.UPLOAD_MAX_BACKLOG))
+        self._thread: Optional[threading.Thread] = None
+        self._thread_lock = threading.Lock()
+        self._last_cleanup = float("-inf")
+        self._backlog = metrics.gauge("upload_archive_backlog")
+        self._written = metrics.counter("upload_archive_written_total")
+        self._failed = metrics.counter("upload_archive_failed_total")
+        self._inline = metrics.counter("upload_archive_inline_writes_total")
+        self._deleted = metrics.counter("upload_archive_deleted_total")
+        self._queue_wait_ms = metrics.histogram("upload_archive_queue_wait_ms")
+        self._write_ms = metrics.histogram("upload_archive_write_ms")
+        os.makedirs(self.directory, exist_ok=True)
+
+    def start(self):
+        """Start the writer thread (also started by the first submit)"""
+        if self._thread is None:
+            with self._thread_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._worker, name="upload-archiver", daemon=True)
+                    self._thread.start()
+
+    def submit(self, image: Image.Image, prefix: str) -> str:
+        """
+        Queue an RGB image for storage as <prefix>_<timestamp>_<id>.jpg.
+        Returns: the /uploads URL the image will be served from once written
+        """
+        self.start()
+        filename = f"{prefix}_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}.jpg"
+        job = _ArchiveJob(image, filename)
+        try:
+            self._queue.put_nowait(job)
+            self._backlog.set(self._queue.qsize())
+        except queue.Full:
+            # Backpressure: never hand out a URL for an image that will not be written
+            self._inline.inc()
+            self._write(job)
+        return f"/uploads/{filename}"
+
+    def flush(self, timeout: float = None) -> bool:
+        """Wait until queued images are written. Returns: False on timeout"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def _write_file(self, image: Image.Image, path: str, **save_kwargs):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            image.save(f, **save_kwargs)
+            if self.fsync == "always":
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def _write(self, job: _ArchiveJob):
+        started_at = time.perf_counter()
+        path = os.path.join(self.directory, job.filename)
+        stem = os.path.splitext(path)[0]
+        try:
+            self._write_file(job.image, path, format="JPEG", quality=config.UPLOAD_JPEG_QUALITY)
+            if config.UPLOAD_WEBP:
+                self._write_file(job.image, f"{stem}.webp", format="WEBP", quality=config.UPLOAD_JPEG_QUALITY)
+            if config.UPLOAD_THUMBNAIL_SIZE:
+                thumbnail = job.image.copy()
+                thumbnail.thumbnail((config.UPLOAD_THUMBNAIL_SIZE, config.UPLOAD_THUMBNAIL_SIZE))
+                self._write_file(thumbnail, f"{stem}_thumb.jpg", format="JPEG", quality=config.UPLOAD_JPEG_QUALITY)
+            if self.fsync == "always":
+                # Persist the renames as well as the file contents
+                dir_fd = os.open(self.directory, os.O_RDONLY)
+                try:
+                    os.fsync(dir_fd)
+                finally:
+                    os.close(dir_fd)
+            self._written.inc()
+        except Exception as e:
+            self._failed.inc()
+            logger.warning("Could not archive upload %s: %s", job.filename, e)
+        finally:
+            self._write_ms.observe((time.perf_counter() - started_at) * 1000)
+
+    def _referenced_stems(self) -> Set[str]:
+        """Stems of the stored photos inventories still point to"""
+        stems = set()
+        for inventory in get_data_store().get_inventories():
+            image_url = inventory.get("image_url") or ""
+            if image_url.startswith("/uploads/"):
+                stems.add(os.path.splitext(os.path.basename(image_url))[0])
+        return stems
+
+    @staticmethod
+    def _stem_of(filename: str) -> str:
+        """Photo stem of a stored file or variant (<stem>.jpg, <stem>.webp, <stem>_thumb.jpg, *.tmp)"""
+        if filename.endswith(".tmp"):
+            filename = filename[:-len(".tmp")]
+        stem = os.path.splitext(filename)[0]
+        if stem.endswith("_thumb"):
+            stem = stem[:-len("_thumb")]
+        return stem
+
+    def cleanup(self) -> int:
+        """
+        Delete uploads older than the retention period, keeping the ones an inventory
+        still references
+        Returns: number of files deleted
+        """
+        deleted = 0
+        if self.retention_days and self.retention_days > 0:
+            cutoff = time.time() - self.retention_days * 86400
+            referenced = self._referenced_stems()
+            with os.scandir(self.directory) as entries:
+                for entry in entries:
+                    try:
+                        if (entry.is_file() and entry.stat().st_mtime < cutoff
+                                and self._stem_of(entry.name) not in referenced):
+                            os.remove(entry.path)
+                            deleted += 1
+                    except FileNotFoundError:
+                        pass
+        self._deleted.inc(deleted)
+        self._last_cleanup = time.monotonic()
+        return deleted
+
+    def _worker(self):
+        while True:
+            if self.cleanup_interval_s and time.monotonic() - self._last_cleanup >= self.cleanup_interval_s:
+                try:
+                    self.cleanup()
+                except Exception as e:
+                    # Also covers an unreadable data store: nothing is deleted then
+                    logger.warning("Upload cleanup failed: %s", e)
+            try:
+                job = self._queue.get(timeout=self.cleanup_interval_s or None)
+            except queue.Empty:
+                continue
+            self._queue_wait_ms.observe((time.perf_counter() - job.enqueued_at) * 1000)
+            try:
+                self._write(job)
+            finally:
+                self._queue.task_done()
+                self._backlog.set(self._queue.qsize())
+
+
+_archiver: Optional[UploadArchiver] = None
+_archiver_lock = threading.Lock()
+
+
+def get_upload_archiver() -> UploadArchiver:
+    """Return the shared process-wide upload archiver"""
+    global _archiver
+    if _archiver is None:
+        with _archiver_lock:
+            if _archiver is None:
+                _archiver = UploadArchiver()
+    return _archiver
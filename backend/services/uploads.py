@@ -0,0 +1,65 @@
+from fastapi import HTTPException
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+import config
+
+# Allowance for multipart boundaries, part headers and small form fields around the file bytes
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+
+class UploadTooLarge(Exception):
+    """Raised when an uploaded file exceeds the configured size limit"""
+
+    def __init__(self, max_bytes: int):
+        super().__init__(f"Upload exceeds the {max_bytes / (1024 * 1024):g} MB limit")
+        self.max_bytes = max_bytes
+
+
+class UploadLimitMiddleware:
+    """
+    Caps multipart/form-data request bodies at max_bytes plus the multipart overhead
+    while they stream in, before any form parsing: a declared Content-Length over the
+    limit gets 413 without reading the body, and a body (chunked or not) passing it
+    stops being read and gets 413.
+    """
+
+    def __init__(self, app: ASGIApp, max_bytes: int = None):
+        self.app = app
+        self.max_bytes = max_bytes or config.UPLOAD_MAX_BYTES
+        self.limit_bytes = self.max_bytes + MULTIPART_OVERHEAD_BYTES
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not self._is_multipart(scope):
+            await self.app(scope, receive, send)
+            return
+
+        content_length = self._header(scope, b"content-length")
+        if content_length.isdigit() and int(content_length) > self.limit_bytes:
+            response = JSONResponse({"detail": str(UploadTooLarge(self.max_bytes))}, status_code=413)
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.limit_bytes:
+                    # Raised inside body parsing, so the app's exception handling answers 413
+                    raise HTTPException(status_code=413, detail=str(UploadTooLarge(self.max_bytes)))
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+    @staticmethod
+    def _header(scope: Scope, name: bytes) -> str:
+        for key, value in scope.get("headers", ()):
+            if key.lower() == name:
+                return value.decode("latin-1")
+        return ""
+
+    def _is_multipart(self, scope: Scope) -> bool:
+        return self._header(scope, b"content-type").lower().startswith("multipart/form-data")
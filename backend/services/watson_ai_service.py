@@ -1,9 +1,49 @@
 import os
+import re
 import json
-from typing import Dict, Any, List
+import logging
+import time
+import heapq
+import asyncio
+from typing import Dict, Any, List, Optional
 import requests
 from datetime import datetime
 
+import config
+from services.cache import LRUCache
+from services.catalog import get_catalog
+from services.metrics import metrics
+from services.request_parser import get_request_parser
+from services.watson_client import WatsonUnavailable, get_watson_client
+
+logger = logging.getLogger(__name__)
+
+# Parsed requests by normalized text; repeat phrasings ("2 kg tomatoes") skip parsing
+_parse_cache = (
+    LRUCache(
+        config.SMARTBUY_PARSE_CACHE_MAX_ENTRIES,
+        ttl_s=config.SMARTBUY_PARSE_CACHE_TTL_S,
+        name="smartbuy_parse_cache",
+    )
+    if config.SMARTBUY_PARSE_CACHE_ENABLED
+    else None
+)
+
+
+WATSON_MODES = ("fallback", "hedged")
+
+# The local parse takes microseconds; remote calls use the default millisecond buckets
+_LOCAL_PARSE_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 25, 50, 100)
+
+
+def _cache_key(request_text: str) -> str:
+    return " ".join(request_text.lower().split())
+
+
+def _copy_parsed(parsed: Dict[str, Any]) -> Dict[str, Any]:
+    return {**parsed, "items": [dict(item) for item in parsed["items"]]}
+
+
 class WatsonAIService:
     """
     Watson AI Service for enhanced SmartBuy request processing
@@ -11,137 +51,223 @@ class WatsonAIService:
     """
     
     def __init__(self):
-        self.service_url = "https://api.ap-south-1.dl.watson-orchestrate.ibm.com/instances/20250808-1247-0789-30cc-fbe921fd0899"
-        self.api_key = ""
+        self.service_url = config.WATSON_URL
+        self.api_key = config.WATSON_API_KEY
         self.headers = {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json"
         }
+        self._fallbacks = metrics.counter("watson_fallbacks_total")
+        self._local_ms = metrics.histogram("smartbuy_parse_local_ms", _LOCAL_PARSE_BUCKETS)
+        self._remote_ms = metrics.histogram("smartbuy_parse_remote_ms")
+        self._answered_by = {
+            source: metrics.counter(f"smartbuy_parse_source_{source}_total") for source in ("local", "watson")
+        }
+        self._compared = metrics.counter("smartbuy_parse_compared_total")
+        self._agreed = metrics.counter("smartbuy_parse_agreed_total")
+        self._agreement_rate = metrics.gauge("smartbuy_parse_agreement_rate")
     
     def process_smart_buy_request(self, request_text: str, customer_location: Dict[str, float]) -> Dict[str, Any]:
         """
         Process SmartBuy request using Watson AI for better understanding
         """
         try:
-            # For now, use enhanced rule-based parsing (can be upgraded to Watson AI calls)
-            enhanced_parsing = self._enhanced_parsing(request_text)
-            
-            if not enhanced_parsing["parsed_successfully"]:
-                return {
-                    "success": False,
-                    "error": "Could not understand your request. Please try rephrasing.",
-                    "suggestions": [
-                        "Try: 'I want 2 kg bananas'", 
-                        "Try: 'Need tomatoes and onions delivered'",
-                        "Try: 'Looking for fresh vegetables'"
-                    ]
-                }
-            
-            return {
-                "success": True,
-                "parsed_request": enhanced_parsing,
-                "ai_confidence": enhanced_parsing.get("confidence", 0.8),
-                "processed_at": datetime.now().isoformat()
-            }
+            # Local rule-based parsing; process_smart_buy_request_async can ask Watson
+            return self._smart_buy_result(self.parse_request(request_text))
             
         except Exception as e:
             # Fallback to basic parsing
             return self._fallback_parsing(request_text, customer_location)
     
-    def _enhanced_parsing(self, request_text: str) -> Dict[str, Any]:
+    async def process_smart_buy_request_async(self, request_text: str, customer_location: Dict[str, float]) -> Dict[str, Any]:
         """
-        Enhanced rule-based parsing with better item recognition
+        Process SmartBuy request, asking Watson Orchestrate when enabled without
+        blocking the event loop
         """
-        request_text = request_text.lower().strip()
+        try:
+            return self._smart_buy_result(await self.parse_request_async(request_text))
+            
+        except Exception as e:
+            # Fallback to basic parsing
+            return self._fallback_parsing(request_text, customer_location)
+    
+    def _smart_buy_result(self, enhanced_parsing: Dict[str, Any]) -> Dict[str, Any]:
+        if not enhanced_parsing["parsed_successfully"]:
+            return {
+                "success": False,
+                "error": "Could not understand your request. Please try rephrasing.",
+                "suggestions": [
+                    "Try: 'I want 2 kg bananas'", 
+                    "Try: 'Need tomatoes and onions delivered'",
+                    "Try: 'Looking for fresh vegetables'"
+                ]
+            }
         
-        # Enhanced item recognition
-        item_patterns = {
-            "fruits": ["banana", "apple", "orange", "mango", "grapes", "strawberry", "pineapple"],
-            "vegetables": ["tomato", "onion", "potato", "carrot", "cucumber", "cauliflower", "broccoli"],
-            "herbs": ["coriander", "mint", "basil", "parsley", "rosemary"],
-            "flowers": ["rose", "marigold", "sunflower", "lily", "tulip"],
-            "nuts": ["almonds", "cashews", "walnuts", "pistachios"],
-            "grains": ["rice", "wheat", "pulses", "lentils"]
+        return {
+            "success": True,
+            "parsed_request": enhanced_parsing,
+            "ai_confidence": enhanced_parsing.get("confidence", 0.8),
+            "processed_at": datetime.now().isoformat()
         }
+    
+    def parse_request(self, request_text: str) -> Dict[str, Any]:
+        """
+        Parse a request, reusing the result for a previously seen phrasing.
+        Returns: a private copy of the parse result, safe to modify
+        """
+        parsed = self._cached(request_text)
+        if parsed is None:
+            parsed = self._enhanced_parsing(request_text)
+            self._remember(request_text, parsed)
+        return _copy_parsed(parsed)
+    
+    async def parse_request_async(self, request_text: str) -> Dict[str, Any]:
+        """
+        Parse a request with Watson Orchestrate when enabled (see WATSON_MODE), using the
+        local parser when the remote call fails or misses its deadline or budget.
+        Cached like parse_request. The result's "source" tells which parser answered.
+        Returns: a private copy of the parse result, safe to modify
+        """
+        if not config.WATSON_ENABLED:
+            return self.parse_request(request_text)
+        parsed = self._cached(request_text)
+        if parsed is None:
+            if config.WATSON_MODE == "hedged":
+                parsed = await self._hedged_parse(request_text)
+            else:
+                try:
+                    parsed = self._from_watson(await get_watson_client().parse(request_text), request_text)
+                    self._remember(request_text, parsed)
+                except WatsonUnavailable as e:
+                    # Not cached, so the next identical request tries Watson again
+                    self._fallbacks.inc()
+                    logger.warning("Watson parse unavailable, using local parser: %s", e)
+                    parsed = self._enhanced_parsing(request_text)
+            self._answered_by[parsed["source"]].inc()
+        return _copy_parsed(parsed)
+    
+    async def _hedged_parse(self, request_text: str) -> Dict[str, Any]:
+        """
+        Start the Watson call, parse locally meanwhile, and wait for Watson only until
+        the latency budget is spent. A Watson answer, also one arriving after the budget,
+        is compared with the local one and cached for the next identical request.
+        """
+        started_at = time.perf_counter()
+        remote = asyncio.ensure_future(self._timed_remote_parse(request_text, started_at))
         
-        # Extract quantities and units
-        import re
-        quantity_pattern = r'(\d+)\s*(kg|g|pieces?|bunches?|dozens?|packs?)'
-        quantities = re.findall(quantity_pattern, request_text)
-        
-        # Extract items
-        items = []
-        total_confidence = 0
-        item_count = 0
+        local_started_at = time.perf_counter()
+        local = self._enhanced_parsing(request_text)
+        self._local_ms.observe((time.perf_counter() - local_started_at) * 1000)
         
-        for category, category_items in item_patterns.items():
-            for item in category_items:
-                if item in request_text:
-                    # Find matching quantity
-                    quantity = "1 kg"  # Default
-                    unit = "kg"
-                    
-                    for qty, unit_type in quantities:
-                        if unit_type in ["kg", "g"]:
-                            quantity = f"{qty} {unit_type}"
-                            unit = unit_type
-                        elif unit_type in ["pieces", "piece"]:
-                            quantity = f"{qty} pieces"
-                            unit = "piece"
-                        elif unit_type in ["bunches", "bunch"]:
-                            quantity = f"{qty} bunches"
-                            unit = "bunch"
-                        elif unit_type in ["dozens", "dozen"]:
-                            quantity = f"{qty} dozen"
-                            unit = "dozen"
-                        elif unit_type in ["packs", "pack"]:
-                            quantity = f"{qty} packs"
-                            unit = "pack"
-                    
-                    # Calculate confidence based on context
-                    confidence = 0.9
-                    if any(word in request_text for word in ["fresh", "organic", "local"]):
-                        confidence += 0.1
-                    if any(word in request_text for word in ["cheap", "expensive", "budget"]):
-                        confidence += 0.05
-                    
-                    items.append({
-                        "name": item,
-                        "quantity": quantity,
-                        "unit": unit,
-                        "category": category,
-                        "confidence": min(confidence, 1.0)
-                    })
-                    
-                    total_confidence += confidence
-                    item_count += 1
+        remaining_s = config.SMARTBUY_PARSE_BUDGET_MS / 1000 - (time.perf_counter() - started_at)
+        done, _ = await asyncio.wait({remote}, timeout=max(0.0, remaining_s))
+        if remote in done and remote.exception() is None:
+            self._compare(local, remote.result())
+            self._remember(request_text, remote.result())
+            return remote.result()
         
-        # Check delivery preferences
-        delivery_keywords = ["deliver", "delivery", "home", "house", "doorstep", "bring"]
-        delivery_requested = any(word in request_text for word in delivery_keywords)
+        if remote not in done:
+            remote.add_done_callback(lambda late: self._late_remote(request_text, local, late))
+        else:
+            self._fallbacks.inc()
+        return local
+    
+    async def _timed_remote_parse(self, request_text: str, started_at: float) -> Dict[str, Any]:
+        parsed = self._from_watson(await get_watson_client().parse(request_text), request_text)
+        self._remote_ms.observe((time.perf_counter() - started_at) * 1000)
+        return parsed
+    
+    def _late_remote(self, request_text: str, local: Dict[str, Any], remote: asyncio.Future):
+        if remote.cancelled() or remote.exception() is not None:
+            self._fallbacks.inc()
+            return
+        self._compare(local, remote.result())
+        self._remember(request_text, remote.result())
+    
+    def _compare(self, local: Dict[str, Any], remote: Dict[str, Any]):
+        """Agreement: both parsers found the same items with the same quantities"""
+        self._compared.inc()
+        if {(item["name"], item["quantity"]) for item in local["items"]} == {(item["name"], item["quantity"]) for item in remote["items"]}:
+            self._agreed.inc()
+        self._agreement_rate.set(round(self._agreed.value / self._compared.value, 4))
+    
+    def _cached(self, request_text: str) -> Optional[Dict[str, Any]]:
+        return _parse_cache.get(_cache_key(request_text)) if _parse_cache is not None else None
+    
+    def _remember(self, request_text: str, parsed: Dict[str, Any]):
+        if _parse_cache is not None:
+            _parse_cache.put(_cache_key(request_text), parsed)
+    
+    def _from_watson(self, payload: Dict[str, Any], request_text: str) -> Dict[str, Any]:
+        """
+        Convert a Watson parse response into the _enhanced_parsing format. Item names
+        are mapped onto the catalog so vendor matching sees canonical names.
+        """
+        catalog = get_catalog()
+        confidence = float(payload.get("confidence", 0.9))
+        items = []
+        for remote_item in payload["items"]:
+            remote_name = str(remote_item.get("name", ""))
+            name = catalog.match_name(remote_name) or catalog.canonical_name(remote_name)
+            if not name:
+                continue
+            catalog_item = catalog.items_by_name.get(name, {})
+            items.append({
+                "name": name,
+                "quantity": remote_item.get("quantity") or catalog_item.get("default_quantity", "1 kg"),
+                "unit": remote_item.get("unit") or catalog_item.get("unit", "kg"),
+                "category": remote_item.get("category") or catalog_item.get("category"),
+                "confidence": float(remote_item.get("confidence", confidence))
+            })
         
-        # Check urgency
-        urgency_keywords = ["urgent", "asap", "quick", "fast", "immediate"]
-        is_urgent = any(word in request_text for word in urgency_keywords)
+        return {
+            "items": items,
+            "delivery_requested": bool(payload.get("delivery_requested")),
+            "is_urgent": bool(payload.get("is_urgent")),
+            "budget_constraint": bool(payload.get("budget_constraint")),
+            "original_request": request_text.lower().strip(),
+            "parsed_successfully": len(items) > 0,
+            "confidence": confidence if items else 0,
+            "total_items": len(items),
+            "source": "watson"
+        }
+    
+    def _enhanced_parsing(self, request_text: str) -> Dict[str, Any]:
+        """
+        Enhanced rule-based parsing with better item recognition
+        """
+        parsed = get_request_parser().parse(request_text)
+        intents = parsed["intents"]
         
-        # Check budget constraints
-        budget_keywords = ["cheap", "affordable", "budget", "economical", "low price"]
-        budget_constraint = any(word in request_text for word in budget_keywords)
+        # Confidence based on context
+        confidence = 0.9
+        if "quality" in intents:
+            confidence += 0.1
+        if "price_mention" in intents:
+            confidence += 0.05
+        confidence = min(confidence, 1.0)
         
-        if item_count > 0:
-            avg_confidence = total_confidence / item_count
-        else:
-            avg_confidence = 0
+        items = [
+            {
+                "name": item["name"],
+                "quantity": item["quantity"],
+                "unit": item["unit"],
+                "category": item["category"],
+                "confidence": confidence
+            }
+            for item in parsed["items"]
+        ]
         
         return {
             "items": items,
-            "delivery_requested": delivery_requested,
-            "is_urgent": is_urgent,
-            "budget_constraint": budget_constraint,
-            "original_request": request_text,
+            "delivery_requested": "delivery" in intents,
+            "is_urgent": "urgent" in intents,
+            "budget_constraint": "budget" in intents,
+            "original_request": parsed["original_request"],
             "parsed_successfully": len(items) > 0,
-            "confidence": avg_confidence,
-            "total_items": len(items)
+            "confidence": confidence if items else 0,
+            "total_items": len(items),
+            "source": "local"
         }
     
     def _fallback_parsing(self, request_text: str, customer_location: Dict[str, float]) -> Dict[str, Any]:
@@ -149,20 +275,26 @@ class WatsonAIService:
         Fallback parsing when enhanced parsing fails
         """
         request_text = request_text.lower()
+        catalog = get_catalog()
         
-        # Basic item extraction
-        basic_items = [
-            "banana", "apple", "tomato", "onion", "potato", "carrot", 
-            "coriander", "mint", "orange", "rose", "marigold", "mango"
-        ]
+        # Basic item extraction: multi-word names and aliases first ("shimla mirch"),
+        # then single words, which may also be misspellings of a catalog name
+        matched_names = set()
+        remaining_text = request_text
+        for item in catalog.items:
+            for form in catalog.surface_forms(item):
+                if " " in form and form in remaining_text:
+                    matched_names.add(item["name"])
+                    remaining_text = remaining_text.replace(form, " ")
+        matched_names.update(catalog.match_name(word) for word in re.findall(r"[a-z]+", remaining_text))
         
         items = []
-        for item in basic_items:
-            if item in request_text:
+        for item in catalog.items:
+            if item["name"] in matched_names:
                 items.append({
-                    "name": item,
-                    "quantity": "1 kg",
-                    "unit": "kg",
+                    "name": item["name"],
+                    "quantity": item["default_quantity"],
+                    "unit": item["unit"],
                     "confidence": 0.7
                 })
         
@@ -181,50 +313,47 @@ class WatsonAIService:
         if not available_vendors:
             return []
         
-        # Score vendors based on multiple factors
-        scored_vendors = []
+        # Top 5 recommendations by AI score
+        scored_vendors = ({**vendor, "ai_score": self.score_vendor(parsed_request, vendor)} for vendor in available_vendors)
+        return heapq.nlargest(5, scored_vendors, key=lambda x: x["ai_score"])
+    
+    def score_vendor(self, parsed_request: Dict, vendor: Dict) -> float:
+        """
+        AI score of a vendor for a request (higher is better), from distance, rating,
+        vendor type against the delivery/urgency preferences, and budget
+        """
+        score = 0
+        
+        # Distance score (closer is better)
+        distance = vendor.get("distance", 10)
+        if distance <= 1:
+            score += 30
+        elif distance <= 2:
+            score += 20
+        elif distance <= 5:
+            score += 10
         
-        for vendor in available_vendors:
-            score = 0
-            
-            # Distance score (closer is better)
-            distance = vendor.get("distance", 10)
-            if distance <= 1:
-                score += 30
-            elif distance <= 2:
-                score += 20
-            elif distance <= 5:
+        # Rating score
+        rating = vendor.get("rating", 0)
+        score += rating * 10
+        
+        # Type preference (moving for delivery, stationary for pickup)
+        if parsed_request.get("delivery_requested") and vendor.get("type") == "moving":
+            score += 15
+        elif not parsed_request.get("delivery_requested") and vendor.get("type") == "stationary":
+            score += 15
+        
+        # Urgency bonus
+        if parsed_request.get("is_urgent"):
+            if vendor.get("type") == "moving":
                 score += 10
-            
-            # Rating score
-            rating = vendor.get("rating", 0)
-            score += rating * 10
-            
-            # Type preference (moving for delivery, stationary for pickup)
-            if parsed_request.get("delivery_requested") and vendor.get("type") == "moving":
-                score += 15
-            elif not parsed_request.get("delivery_requested") and vendor.get("type") == "stationary":
-                score += 15
-            
-            # Urgency bonus
-            if parsed_request.get("is_urgent"):
-                if vendor.get("type") == "moving":
-                    score += 10
-            
-            # Budget consideration
-            if parsed_request.get("budget_constraint"):
-                # Prefer vendors with lower prices (this would need price data)
-                score += 5
-            
-            scored_vendors.append({
-                **vendor,
-                "ai_score": score
-            })
         
-        # Sort by AI score
-        scored_vendors.sort(key=lambda x: x["ai_score"], reverse=True)
+        # Budget consideration
+        if parsed_request.get("budget_constraint"):
+            # Prefer vendors with lower prices (this would need price data)
+            score += 5
         
-        return scored_vendors[:5]  # Top 5 recommendations
+        return score
     
     def generate_ai_response(self, parsed_request: Dict, recommendations: List[Dict]) -> str:
         """
@@ -0,0 +1,169 @@
+import asyncio
+import logging
+import threading
+import time
+from typing import Any, Dict, Optional, Set
+
+import httpx
+
+import config
+from services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class WatsonUnavailable(Exception):
+    """The remote parse did not produce a usable answer (timeout, HTTP or payload error)"""
+
+
+class WatsonClient:
+    """
+    Non-blocking client for the Watson Orchestrate SmartBuy parse endpoint.
+    One httpx.AsyncClient (keep-alive connection pool) is shared by all calls; a
+    semaphore caps concurrent calls; identical prompts already in flight await the
+    same call instead of starting another (single-flight). Every call is bounded by
+    a deadline that also covers waiting for the semaphore.
+    """
+
+    def __init__(
+        self,
+        base_url: str = None,
+        api_key: str = None,
+        parse_path: str = None,
+        timeout_s: float = None,
+        max_connections: int = None,
+        max_concurrency: int = None,
+    ):
+        self.base_url = base_url or config.WATSON_URL
+        self.api_key = config.WATSON_API_KEY if api_key is None else api_key
+        self.parse_path = parse_path or config.WATSON_PARSE_PATH
+        self.timeout_s = timeout_s or config.WATSON_TIMEOUT_S
+        self.max_connections = max_connections or config.WATSON_MAX_CONNECTIONS
+        self.max_concurrency = max_concurrency or config.WATSON_MAX_CONCURRENCY
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._in_flight: Dict[str, asyncio.Task] = {}
+        self._closing: Set[asyncio.Future] = set()
+        self._requests = metrics.counter("watson_requests_total")
+        self._timeouts = metrics.counter("watson_timeouts_total")
+        self._errors = metrics.counter("watson_errors_total")
+        self._coalesced = metrics.counter("watson_coalesced_total")
+        self._active = metrics.gauge("watson_in_flight")
+        self._latency_ms = metrics.histogram("watson_request_ms")
+        self._pool_close_errors = metrics.counter("watson_pool_close_errors_total")
+
+    def _bind(self):
+        """Create the pool and semaphore on the running loop (again if the loop changed)"""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            if self._client is not None:
+                self._discard(self._client, self._loop)
+            self._loop = loop
+            self._in_flight = {}
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers={"Authorization": f"Bearer {self.api_key}"} if self.api_key else {},
+                timeout=httpx.Timeout(self.timeout_s, connect=config.WATSON_CONNECT_TIMEOUT_S),
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                    keepalive_expiry=config.WATSON_KEEPALIVE_S,
+                ),
+            )
+
+    def _discard(self, client: httpx.AsyncClient, loop: Optional[asyncio.AbstractEventLoop]):
+        """Close a pool left on a previous loop: on that loop while it still runs, otherwise on this one"""
+        if loop is not None and loop.is_running():
+            closing = asyncio.wrap_future(asyncio.run_coroutine_threadsafe(self._close_quietly(client), loop))
+        else:
+            closing = asyncio.ensure_future(self._close_quietly(client))
+        # Keep a reference until the close finishes
+        self._closing.add(closing)
+        closing.add_done_callback(self._closing.discard)
+
+    async def _close_quietly(self, client: httpx.AsyncClient):
+        try:
+            await client.aclose()
+        except Exception as e:
+            # Connections of a closed loop cannot be shut down cleanly; they are dropped anyway
+            self._pool_close_errors.inc()
+            logger.warning("Could not close stale Watson connection pool: %s", e)
+
+    async def parse(self, request_text: str, timeout_s: float = None) -> Dict[str, Any]:
+        """
+        Ask the remote service to parse a SmartBuy request.
+        Returns: the JSON payload of the response
+        Raises: WatsonUnavailable when no answer arrives within the deadline
+        """
+        self._bind()
+        key = " ".join(request_text.lower().split())
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._call(request_text))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda done, key=key: self._finish(key, done))
+        else:
+            self._coalesced.inc()
+        try:
+            # shield: one caller giving up must not cancel the call others are awaiting
+            return await asyncio.wait_for(asyncio.shield(task), timeout_s or self.timeout_s)
+        except asyncio.TimeoutError:
+            raise WatsonUnavailable(f"No answer within {timeout_s or self.timeout_s:g}s")
+
+    def _finish(self, key: str, task: asyncio.Task):
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        if not task.cancelled():
+            # Mark the exception as retrieved even when every caller already timed out
+            task.exception()
+
+    async def _post(self, request_text: str) -> httpx.Response:
+        async with self._semaphore:
+            self._requests.inc()
+            self._active.inc()
+            try:
+                return await self._client.post(self.parse_path, json={"input": request_text})
+            finally:
+                self._active.dec()
+
+    async def _call(self, request_text: str) -> Dict[str, Any]:
+        started_at = time.perf_counter()
+        try:
+            # The deadline includes the wait for a free slot
+            response = await asyncio.wait_for(self._post(request_text), self.timeout_s)
+            response.raise_for_status()
+            payload = response.json()
+            if not isinstance(payload, dict) or not isinstance(payload.get("items"), list):
+                raise ValueError("Unexpected response payload")
+            return payload
+        except (asyncio.TimeoutError, httpx.TimeoutException) as e:
+            self._timeouts.inc()
+            raise WatsonUnavailable(f"Timed out: {e!r}") from e
+        except (httpx.HTTPError, ValueError) as e:
+            self._errors.inc()
+            raise WatsonUnavailable(str(e)) from e
+        finally:
+            self._latency_ms.observe((time.perf_counter() - started_at) * 1000)
+
+    async def aclose(self):
+        """Close the connection pool (on shutdown)"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            self._loop = None
+
+
+_client: Optional[WatsonClient] = None
+_client_lock = threading.Lock()
+
+
+def get_watson_client() -> WatsonClient:
+    """Return the shared process-wide Watson client"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = WatsonClient()
+    return _client
@@ -1,40 +1,337 @@
-from transformers import pipeline
 import requests
 from PIL import Image
 from io import BytesIO
-from typing import List, Dict, Union
-import torch
+from typing import List, Dict, Union, Optional, Any, Tuple
+import os
+import queue
+import threading
+import time
 
-# Load the fruits & vegetables detector from Hugging Face once at import
-_USE_CUDA: bool = torch.cuda.is_available()
-_DEVICE = 0 if _USE_CUDA else -1
+import config
+from services.detection_cache import DetectionCache
+from services.metrics import metrics
+
+# torch/transformers are imported lazily so that importing this module is cheap;
+# the model is loaded on first use or eagerly through load_model() at startup
+_MODEL_NAME = "jazzmacedo/fruits-and-vegetables-detector-36"
 _DTYPE = None  # keep weights in default dtype to avoid input/weight dtype mismatch
+DETECTOR_ENGINES = ("pytorch", "quantized", "onnx")
 
-_pipe = pipeline(
-    task="image-classification",
-    model="jazzmacedo/fruits-and-vegetables-detector-36",
-    device=_DEVICE,
-    torch_dtype=_DTYPE,
-)
+_pipe = None
+_USE_CUDA: bool = False
+_pipe_lock = threading.Lock()
+_model_state: Dict[str, Any] = {
+    "loaded": False,
+    "warmed_up": False,
+    "device": None,
+    "load_seconds": None,
+    "error": None,
+}
 
-def analyze_vendor_cart(
-    image_input: Union[str, Image.Image],
-    top_k: int = 10,
-    min_confidence: float = 0.000001,
-) -> List[Dict]:
+
+def _build_pipeline(device: int, engine: str = None):
     """
-    Analyze a vendor cart image to detect fruits and vegetables using a Hugging Face model.
+    Build the classifier for an inference engine (config.DETECTOR_ENGINE by default).
+    "pytorch" is the stock pipeline; "quantized" and "onnx" are CPU-only engines.
+    Returns: a callable with the pipeline's (images, top_k, batch_size) signature
+    """
+    engine = engine or config.DETECTOR_ENGINE
+    if engine not in DETECTOR_ENGINES:
+        raise ValueError(f"Unknown detector engine '{engine}', expected one of {DETECTOR_ENGINES}")
 
-    Args:
-        image_path_or_url: Local file path or HTTP(S) URL to the image.
-        top_k: Number of top classes to return.
-        min_confidence: Minimum confidence threshold for including a class.
+    if engine == "onnx":
+        from services.onnx_classifier import OnnxImageClassifier
 
-    Returns:
-        List of dicts: [{"name": str, "confidence": float}] sorted by confidence desc.
+        return OnnxImageClassifier(_MODEL_NAME)
+
+    from transformers import pipeline
+
+    pipe = pipeline(
+        task="image-classification",
+        model=_MODEL_NAME,
+        device=-1 if engine == "quantized" else device,
+        torch_dtype=_DTYPE,
+    )
+    if engine == "quantized":
+        import torch
+
+        # Dynamic int8: Linear weights are quantized ahead of time, activations per batch
+        pipe.model = torch.quantization.quantize_dynamic(pipe.model, {torch.nn.Linear}, dtype=torch.qint8)
+    return pipe
+
+
+def get_pipeline():
+    """Return the classifier pipeline, loading the model on first use"""
+    global _pipe, _USE_CUDA
+    if _pipe is None:
+        with _pipe_lock:
+            if _pipe is None:
+                import torch
+
+                started_at = time.perf_counter()
+                try:
+                    use_cuda = config.DETECTOR_ENGINE == "pytorch" and torch.cuda.is_available()
+                    pipe = _build_pipeline(0 if use_cuda else -1)
+                except Exception as e:
+                    _model_state["error"] = str(e)
+                    raise
+                _USE_CUDA = use_cuda
+                _model_state.update({
+                    "loaded": True,
+                    "device": "cuda" if use_cuda else "cpu",
+                    "load_seconds": round(time.perf_counter() - started_at, 3),
+                    "error": None,
+                })
+                _pipe = pipe
+    return _pipe
+
+
+def warmup():
+    """Run one forward pass on a dummy image so the first real request is not slowed by lazy init"""
+    _classify([Image.new("RGB", (224, 224), (127, 127, 127))], top_k=1)
+
+
+def load_model(run_warmup: bool = True):
+    """Load the model (and optionally warm it up); safe to call more than once"""
+    get_pipeline()
+    if run_warmup and not _model_state["warmed_up"]:
+        warmup()
+
+
+def is_model_ready() -> bool:
+    """True once the model is loaded and has completed a forward pass"""
+    return _model_state["loaded"] and _model_state["warmed_up"]
+
+
+def model_status() -> Dict[str, Any]:
+    """Model lifecycle state for health checks"""
+    return {**_model_state, "engine": config.DETECTOR_ENGINE, "ready": is_model_ready(), "device_breaker": _breaker.state}
+
+
+def _normalize_batch_results(results, batch_len: int) -> List[List[Dict]]:
+    """The pipeline returns a flat list for a single image; always return one list per image"""
+    if batch_len == 1 and results and isinstance(results[0], dict):
+        return [results]
+    return list(results)
+
+
+class DeviceCircuitBreaker:
+    """
+    Circuit breaker around the primary (GPU) device.
+    After failure_threshold consecutive failures the breaker opens and traffic goes
+    to the CPU pipeline; after cooldown_s a single probe request tries the primary
+    device again and closes the breaker on success.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = None, cooldown_s: float = None):
+        self.failure_threshold = max(1, failure_threshold or config.DETECTOR_BREAKER_FAILURE_THRESHOLD)
+        self.cooldown_s = config.DETECTOR_BREAKER_COOLDOWN_S if cooldown_s is None else cooldown_s
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+        self._state_gauge = metrics.gauge("detector_breaker_state")
+        self._state_gauge.set(self.state)
+        self._failures = metrics.counter("detector_device_failures_total")
+        self._opened = metrics.counter("detector_breaker_opened_total")
+
+    def _set_state(self, state: str):
+        self.state = state
+        self._state_gauge.set(state)
+
+    def allow_primary(self) -> bool:
+        """Whether this request may use the primary device"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.cooldown_s:
+                # Let exactly one probe through
+                self._set_state(self.HALF_OPEN)
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.consecutive_failures = 0
+            self._set_state(self.CLOSED)
+
+    def record_failure(self):
+        with self._lock:
+            self._failures.inc()
+            self.consecutive_failures += 1
+            if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self._opened.inc()
+                self._set_state(self.OPEN)
+                self._opened_at = time.monotonic()
+
+
+_breaker = DeviceCircuitBreaker()
+_cpu_pipe = None
+_cpu_pipe_lock = threading.Lock()
+
+
+def get_cpu_pipeline():
+    """Return the CPU pipeline used as fallback, created once on first need"""
+    global _cpu_pipe
+    pipe = get_pipeline()
+    if not _USE_CUDA:
+        return pipe
+    if _cpu_pipe is None:
+        with _cpu_pipe_lock:
+            if _cpu_pipe is None:
+                _cpu_pipe = _build_pipeline(-1)
+    return _cpu_pipe
+
+
+def _run_primary(pipe, images: List[Image.Image], top_k: int):
+    import torch
+
+    # Inference with autocast on CUDA, retried once without it
+    try:
+        with torch.inference_mode():
+            with torch.autocast(device_type="cuda", dtype=torch.float16):
+                return pipe(images, top_k=top_k, batch_size=len(images))
+    except Exception:
+        with torch.inference_mode():
+            return pipe(images, top_k=top_k, batch_size=len(images))
+
+
+def _classify(images: List[Image.Image], top_k: int) -> List[List[Dict]]:
+    """
+    Run the classifier on a batch of RGB images in one forward pass.
+    Returns: raw pipeline results ({"label", "score"} dicts) for each image
+    """
+    import torch
+
+    pipe = get_pipeline()
+    results = None
+
+    if _USE_CUDA and _breaker.allow_primary():
+        try:
+            results = _run_primary(pipe, images, top_k)
+            _breaker.record_success()
+        except Exception:
+            _breaker.record_failure()
+
+    if results is None:
+        # CPU-only host, breaker open, or the primary device just failed
+        if _USE_CUDA:
+            metrics.counter("detector_cpu_fallback_total").inc()
+        with torch.inference_mode():
+            results = get_cpu_pipeline()(images, top_k=top_k, batch_size=len(images))
+
+    # Any completed forward pass means the model is warm
+    _model_state["warmed_up"] = True
+    return _normalize_batch_results(results, len(images))
+
+
+class _BatchRequest:
+    __slots__ = ("image", "top_k", "enqueued_at", "done", "result", "error")
+
+    def __init__(self, image: Image.Image, top_k: int):
+        self.image = image
+        self.top_k = top_k
+        self.enqueued_at = time.perf_counter()
+        self.done = threading.Event()
+        self.result: Optional[List[Dict]] = None
+        self.error: Optional[BaseException] = None
+
+
+class BatchingClassifier:
+    """
+    Dynamic micro-batching in front of the classifier.
+    Callers block in classify() while a background thread collects concurrent
+    requests for up to max_batch_size images or max_wait_ms, runs them through
+    the pipeline as one batch and hands each caller its own results.
     """
 
-    # Load image from local path/URL or accept already opened PIL image
+    def __init__(self, max_batch_size: int = None, max_wait_ms: float = None):
+        self.max_batch_size = max(1, max_batch_size or config.DETECTOR_MAX_BATCH_SIZE)
+        self.max_wait_s = (config.DETECTOR_MAX_BATCH_WAIT_MS if max_wait_ms is None else max_wait_ms) / 1000.0
+        self._queue: "queue.Queue[_BatchRequest]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._thread_lock = threading.Lock()
+        self._batch_size = metrics.histogram("detector_batch_size", buckets=(1, 2, 4, 8, 16, 32, 64))
+        self._queue_wait_ms = metrics.histogram("detector_batch_queue_wait_ms")
+        self._batch_run_ms = metrics.histogram("detector_batch_run_ms")
+
+    def _ensure_worker(self):
+        if self._thread is None:
+            with self._thread_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._worker, name="detector-batcher", daemon=True)
+                    self._thread.start()
+
+    def classify(self, image: Image.Image, top_k: int) -> List[Dict]:
+        """Classify one RGB image as part of the next batch"""
+        return self.classify_many([image], top_k)[0]
+
+    def classify_many(self, images: List[Image.Image], top_k: int) -> List[List[Dict]]:
+        """Classify several RGB images (e.g. the crops of one photo) as part of the next batches"""
+        self._ensure_worker()
+        requests = [_BatchRequest(image, top_k) for image in images]
+        for request in requests:
+            self._queue.put(request)
+        for request in requests:
+            request.done.wait()
+            if request.error is not None:
+                raise request.error
+        return [request.result for request in requests]
+
+    def _collect_batch(self) -> List[_BatchRequest]:
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait_s
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _worker(self):
+        while True:
+            batch = self._collect_batch()
+            started_at = time.perf_counter()
+            self._batch_size.observe(len(batch))
+            for request in batch:
+                self._queue_wait_ms.observe((started_at - request.enqueued_at) * 1000)
+            try:
+                top_k = max(request.top_k for request in batch)
+                results = _classify([request.image for request in batch], top_k)
+                for request, result in zip(batch, results):
+                    request.result = result[:request.top_k]
+            except BaseException as e:
+                for request in batch:
+                    request.error = e
+            finally:
+                self._batch_run_ms.observe((time.perf_counter() - started_at) * 1000)
+                for request in batch:
+                    request.done.set()
+
+
+_batcher = BatchingClassifier() if config.DETECTOR_BATCHING else None
+_detection_cache = (
+    DetectionCache(namespace=f"{_MODEL_NAME}:{config.DETECTOR_ENGINE}")
+    if config.DETECTION_CACHE_ENABLED else None
+)
+
+
+def flush_detection_cache():
+    """Persist pending detection cache entries (on shutdown)"""
+    if _detection_cache is not None:
+        _detection_cache.flush()
+
+
+def _load_image(image_input: Union[str, Image.Image]) -> Image.Image:
+    """Load an RGB image from a local path/URL or accept an already opened PIL image"""
     if isinstance(image_input, Image.Image):
         image = image_input
     elif isinstance(image_input, str):
@@ -51,31 +348,42 @@ def analyze_vendor_cart(
     # Ensure RGB
     if image.mode != "RGB":
         image = image.convert("RGB")
+    return image
 
-    # Run classification (top_k results)
-    # Inference with optional autocast for CUDA and robust fallbacks
-    try:
-        if _USE_CUDA:
-            with torch.inference_mode():
-                with torch.autocast(device_type="cuda", dtype=torch.float16):
-                    results = _pipe(image, top_k=top_k)
+
+def analyze_vendor_cart(
+    image_input: Union[str, Image.Image],
+    top_k: int = 10,
+    min_confidence: float = 0.000001,
+) -> List[Dict]:
+    """
+    Analyze a vendor cart image to detect fruits and vegetables using a Hugging Face model.
+
+    Args:
+        image_path_or_url: Local file path or HTTP(S) URL to the image.
+        top_k: Number of top classes to return.
+        min_confidence: Minimum confidence threshold for including a class.
+
+    Returns:
+        List of dicts: [{"name": str, "confidence": float}] sorted by confidence desc.
+    """
+
+    image = _load_image(image_input)
+
+    # Repeated (and, with perceptual matching, near-duplicate) uploads are answered from the cache
+    results = None
+    if _detection_cache is not None:
+        cache_keys = _detection_cache.keys_for(image)
+        results = _detection_cache.get(cache_keys, top_k)
+
+    if results is None:
+        # Run classification (top_k results), batched with concurrent callers when enabled
+        if _batcher is not None:
+            results = _batcher.classify(image, top_k)
         else:
-            with torch.inference_mode():
-                results = _pipe(image, top_k=top_k)
-    except Exception:
-        # Retry without autocast on CUDA
-        try:
-            with torch.inference_mode():
-                results = _pipe(image, top_k=top_k)
-        except Exception:
-            # Last resort: fallback to CPU pipeline for this call
-            cpu_pipe = pipeline(
-                task="image-classification",
-                model="jazzmacedo/fruits-and-vegetables-detector-36",
-                device=-1,
-            )
-            with torch.inference_mode():
-                results = cpu_pipe(image, top_k=top_k)
+            results = _classify([image], top_k)[0]
+        if _detection_cache is not None:
+            _detection_cache.put(cache_keys, top_k, results)
 
     # Normalize into expected schema and filter by confidence
     detections: List[Dict] = []
@@ -91,8 +399,130 @@ def analyze_vendor_cart(
     return detections
 
 
+def _tile_boxes(width: int, height: int, grid: int, overlap: float) -> List[Tuple[int, int, int, int]]:
+    """Boxes of a grid x grid layout of overlapping crops covering the whole image"""
+    boxes = []
+    tile_w = width / (grid - (grid - 1) * overlap)
+    tile_h = height / (grid - (grid - 1) * overlap)
+    for row in range(grid):
+        for col in range(grid):
+            left = col * tile_w * (1 - overlap)
+            top = row * tile_h * (1 - overlap)
+            boxes.append((round(left), round(top), min(width, round(left + tile_w)), min(height, round(top + tile_h))))
+    return boxes
+
+
+def _fit_for_model(image: Image.Image) -> Image.Image:
+    """Shrink a crop so its shortest side is the model input size; the processor would resize anyway"""
+    scale = config.PREPROCESS_MODEL_SIZE / min(image.size)
+    if scale >= 1.0:
+        return image
+    return image.resize((max(1, round(image.width * scale)), max(1, round(image.height * scale))), Image.BILINEAR)
+
+
+# Moving average of the per-crop forward pass cost, used to size the tile grid to the budget
+_tile_cost_ms: Optional[float] = None
+_tile_cost_lock = threading.Lock()
+_TILE_COST_SMOOTHING = 0.3
+
+
+def _record_tile_cost(cost_ms: float):
+    global _tile_cost_ms
+    with _tile_cost_lock:
+        if _tile_cost_ms is None:
+            _tile_cost_ms = cost_ms
+        else:
+            _tile_cost_ms = (1 - _TILE_COST_SMOOTHING) * _tile_cost_ms + _TILE_COST_SMOOTHING * cost_ms
+
+
+def _grid_within_budget(max_grid: int, budget_ms: float) -> int:
+    if _tile_cost_ms is None or not budget_ms:
+        return max_grid
+    for grid in range(max_grid, 1, -1):
+        if (grid * grid + 1) * _tile_cost_ms <= budget_ms:
+            return grid
+    return 1
+
+
+def analyze_vendor_cart_tiled(
+    image_input: Union[str, Image.Image],
+    grid: int = None,
+    overlap: float = None,
+    top_k: int = None,
+    min_confidence: float = 0.3,
+    max_items: int = None,
+    budget_ms: float = None,
+) -> List[Dict]:
+    """
+    Multi-label detection for carts with many kinds of produce.
+    The image is split into grid x grid overlapping crops which, together with the
+    whole image, are classified in one batch; per-crop labels are merged by name.
+    Crops are looked up in the detection cache under the tile layout, and the misses
+    go through the micro-batcher when it is enabled.
+    The grid shrinks when the measured cost per crop would exceed budget_ms.
+
+    Returns:
+        List of dicts: [{"name": str, "confidence": float, "tiles": int}] sorted by
+        confidence desc, where confidence is the best crop score and tiles the number
+        of grid tiles (not counting the whole image) that saw the item above min_confidence.
+    """
+    grid = grid or config.DETECTOR_TILE_GRID
+    overlap = config.DETECTOR_TILE_OVERLAP if overlap is None else overlap
+    top_k = top_k or config.DETECTOR_TILE_TOP_K
+    max_items = max_items or config.DETECTOR_TILE_MAX_ITEMS
+    budget_ms = config.DETECTOR_TILE_BUDGET_MS if budget_ms is None else budget_ms
+
+    image = _load_image(image_input)
+    grid = _grid_within_budget(max(1, grid), budget_ms)
+    crops = [_fit_for_model(image)]
+    if grid > 1:
+        crops.extend(_fit_for_model(image.crop(box)) for box in _tile_boxes(image.width, image.height, grid, overlap))
+
+    started_at = time.perf_counter()
+    results: List[Optional[List[Dict]]] = [None] * len(crops)
+    if _detection_cache is not None:
+        # The layout is part of the key: a crop only matches the same crop of the same grid
+        cache_keys = [_detection_cache.keys_for(crop, f"tiled:{grid}x{overlap:g}") for crop in crops]
+        results = [_detection_cache.get(keys, top_k) for keys in cache_keys]
+
+    missing = [index for index, crop_results in enumerate(results) if crop_results is None]
+    if missing:
+        # A pass that loads or warms up the model says nothing about the steady-state cost
+        model_was_ready = is_model_ready()
+        classify_started_at = time.perf_counter()
+        missing_crops = [crops[index] for index in missing]
+        if _batcher is not None:
+            classified = _batcher.classify_many(missing_crops, top_k)
+        else:
+            classified = _classify(missing_crops, top_k)
+        if model_was_ready:
+            _record_tile_cost((time.perf_counter() - classify_started_at) * 1000 / len(missing))
+        for index, crop_results in zip(missing, classified):
+            results[index] = crop_results
+            if _detection_cache is not None:
+                _detection_cache.put(cache_keys[index], top_k, crop_results)
+    metrics.histogram("detector_tiled_ms").observe((time.perf_counter() - started_at) * 1000)
+    metrics.histogram("detector_tiled_crops", buckets=(1, 2, 5, 10, 17, 26, 37, 50)).observe(len(crops))
+
+    merged: Dict[str, Dict] = {}
+    for index, crop_results in enumerate(results):
+        for res in crop_results:
+            label = str(res.get("label", "")).strip().lower()
+            score = float(res.get("score", 0.0))
+            if not label or score < min_confidence:
+                continue
+            item = merged.setdefault(label, {"name": label, "confidence": 0.0, "tiles": 0})
+            item["confidence"] = max(item["confidence"], score)
+            # crops[0] is the whole image, not a tile
+            if index > 0:
+                item["tiles"] += 1
+
+    detections = sorted(merged.values(), key=lambda item: (item["confidence"], item["tiles"]), reverse=True)
+    return detections[:max_items]
+
+
 if __name__ == "__main__":
-    # Local quick test
-    test_path = "backend/services/test_vendor_cart.jpg"
+    # Local quick test (run from backend/: python -m services.yolo_detector)
+    test_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "test_vendor_cart.jpg")
     items = analyze_vendor_cart(test_path)
     print("Detections:", items)